@@ -5,7 +5,7 @@ from app.api.dependencies.database import get_repository
 from app.core.config import API_PREFIX, SECRET_KEY
 from app.db.repositories.users import UsersRepository
 from app.models.user import UserInDB
-from app.services import auth_service
+from app.services import auth_service, principal_cache
 from fastapi import Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
 
@@ -30,7 +30,12 @@ async def get_user_from_token(
         username = auth_service.get_username_from_token(
             token=token, secret_key=str(SECRET_KEY)
         )
-        user = await user_repo.get_user_by_user_name(username=username)
+        user = principal_cache.get(username=username)
+        if user is None:
+            generation = principal_cache.generation(username=username)
+            user = await user_repo.get_user_by_user_name(username=username)
+            if user:
+                principal_cache.set(username=username, user=user, generation=generation)
     except Exception as e:
         raise e
 
@@ -15,7 +15,18 @@ def get_database(request: Request) -> Database:
 
 
 def get_repository(Repo_type: Type[BaseRepository]) -> Callable:
-    def get_repo(db: Database = Depends(get_database)) -> Type[BaseRepository]:
-        return Repo_type(db)
+    """
+    When read replicas are configured the repository gets a RoutedDatabase which sends
+    its reads to a replica and its writes to the primary (see app/db/routing.py).
+    Clients are told apart by their Authorization header for read-your-writes.
+    """
+
+    def get_repo(
+        request: Request, db: Database = Depends(get_database)
+    ) -> Type[BaseRepository]:
+        router = getattr(request.app.state, "_db_router", None)
+        if router is None:
+            return Repo_type(db)
+        return Repo_type(router.for_request(request.headers.get("Authorization")))
 
     return get_repo
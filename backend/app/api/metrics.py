@@ -0,0 +1,60 @@
+import asyncio
+import logging
+from typing import Dict
+
+from app.db.pool import get_pool_stats
+from app.services import auth_service
+from app.services.metrics import (
+    Family,
+    MetricsDirectory,
+    password_hashing_families,
+    pool_families,
+)
+from fastapi import FastAPI
+
+logger = logging.getLogger(__name__)
+
+
+def worker_families(app: FastAPI) -> Dict[str, Family]:
+    """
+    Everything this worker process knows: its requests, its db pool and bcrypt pool.
+    """
+    families = app.state.request_metrics.collect()
+    database = getattr(app.state, "_db", None)
+    if database is not None:
+        families.update(pool_families(get_pool_stats(database)))
+    families.update(
+        password_hashing_families(auth_service.pending, auth_service.max_workers)
+    )
+    return families
+
+
+def write_metrics(app: FastAPI, directory: MetricsDirectory) -> None:
+    # a failing write must neither end the periodic writer nor the worker's shutdown
+    try:
+        directory.write(worker_families(app))
+    except Exception:
+        logger.exception("metrics - could not write to %s", directory.path)
+
+
+async def write_metrics_periodically(app: FastAPI, directory: MetricsDirectory) -> None:
+    while True:
+        await asyncio.sleep(directory.interval)
+        write_metrics(app, directory)
+
+
+def start_metrics_writer(app: FastAPI) -> None:
+    directory = getattr(app.state, "metrics_directory", None)
+    if directory is not None:
+        app.state._metrics_writer = asyncio.ensure_future(
+            write_metrics_periodically(app, directory)
+        )
+
+
+async def stop_metrics_writer(app: FastAPI) -> None:
+    writer = getattr(app.state, "_metrics_writer", None)
+    if writer is None:
+        return
+    writer.cancel()
+    # the requests since the last write would be lost with the process otherwise
+    write_metrics(app, app.state.metrics_directory)
@@ -0,0 +1,32 @@
+from typing import Optional
+
+from starlette.types import Message, Scope, Send
+
+
+def route_name(scope: Scope) -> Optional[str]:
+    """
+    Name of the route that handled the request, the router leaves its endpoint
+    in the scope. None when no route matched.
+    """
+    endpoint = scope.get("endpoint")
+    if endpoint is None:
+        return None
+    for route in scope["app"].routes:
+        if getattr(route, "endpoint", None) is endpoint:
+            return route.name
+    return None
+
+
+class StatusResponder:
+    """
+    Passes the messages on and remembers the status code of the response.
+    """
+
+    def __init__(self, send: Send) -> None:
+        self._send = send
+        self.status_code = 500  # unless a response was started
+
+    async def send(self, message: Message) -> None:
+        if message["type"] == "http.response.start":
+            self.status_code = message["status"]
+        await self._send(message)
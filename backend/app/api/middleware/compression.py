@@ -0,0 +1,200 @@
+import zlib
+from typing import Dict, Optional, Union
+
+import brotli
+from app.services.ttl_cache import TTLCache
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+# content types worth compressing, images etc. are compressed already
+COMPRESSIBLE_TYPES = ("application/json", "application/x-ndjson", "text/")
+
+
+class GzipEncoder:
+    def __init__(self, level: int) -> None:
+        # wbits=31 - zlib stream with a gzip header and trailer
+        self._compressor = zlib.compressobj(level, zlib.DEFLATED, 31)
+
+    def compress(self, data: bytes) -> bytes:
+        return self._compressor.compress(data)
+
+    def flush(self) -> bytes:
+        return self._compressor.flush(zlib.Z_SYNC_FLUSH)
+
+    def finish(self) -> bytes:
+        return self._compressor.flush(zlib.Z_FINISH)
+
+
+class BrotliEncoder:
+    def __init__(self, quality: int) -> None:
+        self._compressor = brotli.Compressor(quality=quality)
+
+    def compress(self, data: bytes) -> bytes:
+        return self._compressor.process(data)
+
+    def flush(self) -> bytes:
+        return self._compressor.flush()
+
+    def finish(self) -> bytes:
+        return self._compressor.finish()
+
+
+def parse_accept_encoding(value: str) -> Dict[str, float]:
+    """
+    "gzip;q=0.5, br" -> {"gzip": 0.5, "br": 1.0}
+    """
+    encodings = {}
+    for part in value.split(","):
+        coding, _, params = part.strip().partition(";")
+        if not coding:
+            continue
+        q = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                q = float(params[2:])
+            except ValueError:
+                q = 0.0
+        encodings[coding.strip().lower()] = q
+    return encodings
+
+
+def negotiate_encoding(accept_encoding: str) -> Optional[str]:
+    """
+    The accepted coding with the highest q, br wins ties. None when neither is accepted.
+    """
+    accepted = parse_accept_encoding(accept_encoding)
+    wildcard = accepted.get("*", 0.0)
+    best, best_q = None, 0.0
+    for coding in ("br", "gzip"):
+        q = accepted.get(coding, wildcard)
+        if q > best_q:
+            best, best_q = coding, q
+    return best
+
+
+class CompressionMiddleware:
+    """
+    Negotiated brotli / gzip compression of the responses.
+
+    Bodies under minimum_size (and everything that is not json or text) are sent
+    untouched, so small responses don't pay any CPU for it. Streaming responses are
+    compressed chunk by chunk and flushed after every chunk, so clients still get
+    the rows as they come. Complete responses that carry an ETag are compressed
+    only once per version, see cache_size.
+    """
+
+    def __init__(
+        self,
+        app: ASGIApp,
+        *,
+        minimum_size: int = 1024,
+        gzip_level: int = 6,
+        brotli_quality: int = 4,
+        cache_size: int = 256,
+    ) -> None:
+        self.app = app
+        self.minimum_size = minimum_size
+        self.gzip_level = gzip_level
+        self.brotli_quality = brotli_quality
+        # etags are per version, so entries can't go stale - the ttl is only a bound
+        self.cache: TTLCache[bytes] = TTLCache(
+            name="compressed response", ttl=3600, max_size=cache_size
+        )
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] == "http":
+            encoding = negotiate_encoding(Headers(scope=scope).get("accept-encoding", ""))
+            if encoding is not None:
+                responder = CompressionResponder(self, scope, encoding, send)
+                await self.app(scope, receive, responder.send)
+                return
+        await self.app(scope, receive, send)
+
+    def encoder(self, encoding: str) -> Union[BrotliEncoder, GzipEncoder]:
+        if encoding == "br":
+            return BrotliEncoder(self.brotli_quality)
+        return GzipEncoder(self.gzip_level)
+
+
+class CompressionResponder:
+    def __init__(
+        self, middleware: CompressionMiddleware, scope: Scope, encoding: str, send: Send
+    ) -> None:
+        self.middleware = middleware
+        self.scope = scope
+        self.encoding = encoding
+        self._send = send
+        self.start_message: Optional[Message] = None
+        self.encoder = None
+        self.passthrough = False
+
+    def is_compressible(self, headers: MutableHeaders) -> bool:
+        if self.start_message["status"] in (204, 304) or "content-encoding" in headers:
+            return False
+        content_type = headers.get("content-type", "")
+        return content_type.startswith(COMPRESSIBLE_TYPES)
+
+    def cache_key(self, headers: MutableHeaders) -> Optional[str]:
+        etag = headers.get("etag")
+        if etag is None:
+            return None
+        query = self.scope.get("query_string", b"").decode("latin-1")
+        return f"{self.encoding} {self.scope['path']}?{query} {etag}"
+
+    async def send(self, message: Message) -> None:
+        if message["type"] == "http.response.start":
+            # held back until the first body tells us whether to compress
+            self.start_message = message
+        elif message["type"] != "http.response.body" or self.passthrough:
+            await self._send(message)
+        elif self.encoder is not None:
+            # the rest of a streaming response
+            await self._send({**message, "body": self.encode_chunk(message)})
+        else:
+            await self.send_first_body(message)
+
+    def encode_chunk(self, message: Message) -> bytes:
+        data = self.encoder.compress(message.get("body", b""))
+        if message.get("more_body", False):
+            return data + self.encoder.flush()
+        return data + self.encoder.finish()
+
+    async def send_first_body(self, message: Message) -> None:
+        """
+        Decide between sending the response as it is, compressing it whole and
+        compressing it as a stream - and fix the held back headers accordingly.
+        """
+        body = message.get("body", b"")
+        more_body = message.get("more_body", False)
+        headers = MutableHeaders(raw=self.start_message["headers"])
+        if not self.is_compressible(headers) or (
+            not more_body and len(body) < self.middleware.minimum_size
+        ):
+            self.passthrough = True
+            await self._send(self.start_message)
+            await self._send(message)
+            return
+
+        headers["Content-Encoding"] = self.encoding
+        headers.add_vary_header("Accept-Encoding")
+        if more_body:
+            del headers["Content-Length"]
+            self.encoder = self.middleware.encoder(self.encoding)
+            data = self.encode_chunk(message)
+        else:
+            data = self.compress_whole(headers, body)
+            headers["Content-Length"] = str(len(data))
+
+        await self._send(self.start_message)
+        await self._send({**message, "body": data})
+
+    def compress_whole(self, headers: MutableHeaders, body: bytes) -> bytes:
+        key = self.cache_key(headers)
+        data = self.middleware.cache.lookup(key) if key else None
+        if data is None:
+            encoder = self.middleware.encoder(self.encoding)
+            data = encoder.compress(body) + encoder.finish()
+            if key:
+                self.middleware.cache.store(key, data)
+        return data
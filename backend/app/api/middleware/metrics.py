@@ -0,0 +1,34 @@
+import time
+
+from app.api.middleware import StatusResponder, route_name
+from app.services.metrics import RequestMetrics
+from starlette.types import ASGIApp, Receive, Scope, Send
+
+
+class MetricsMiddleware:
+    """
+    Counts the requests and their latency by route name into a RequestMetrics,
+    which /metrics exposes (app/api/routes/metrics.py).
+    """
+
+    def __init__(self, app: ASGIApp, *, metrics: RequestMetrics) -> None:
+        self.app = app
+        self.metrics = metrics
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        responder = StatusResponder(send)
+        self.metrics.in_flight += 1
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, responder.send)
+        finally:
+            self.metrics.in_flight -= 1
+            self.metrics.observe(
+                route_name(scope) or "unmatched",
+                scope["method"],
+                responder.status_code,
+                time.perf_counter() - start,
+            )
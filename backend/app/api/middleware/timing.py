@@ -0,0 +1,80 @@
+import logging
+
+import orjson
+from app.api.middleware import StatusResponder, route_name
+from app.core.timing import RequestTimings, current_timings
+from app.db.instrumentation import query_name
+from starlette.datastructures import MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+logger = logging.getLogger(__name__)
+
+
+class ServerTimingMiddleware:
+    """
+    Times the db queries, auth and serialization of every request (app/core/timing.py)
+    and reports them in a Server-Timing header, which browser devtools show next to
+    the request, and / or in one json log line per request.
+    Queries that ran more than repeated_query_limit times are logged as a warning.
+    """
+
+    def __init__(
+        self,
+        app: ASGIApp,
+        *,
+        header: bool = True,
+        log: bool = True,
+        repeated_query_limit: int = 0,
+    ) -> None:
+        self.app = app
+        self.header = header
+        self.log = log
+        self.repeated_query_limit = repeated_query_limit
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        responder = TimingResponder(send, header=self.header)
+        token = current_timings.set(responder.timings)
+        try:
+            await self.app(scope, receive, responder.send)
+        finally:
+            current_timings.reset(token)
+            self.report(scope, responder)
+
+    def report(self, scope: Scope, responder: "TimingResponder") -> None:
+        if self.repeated_query_limit:
+            repeated = responder.timings.repeated_queries(self.repeated_query_limit)
+            for query, count in repeated.items():
+                logger.warning(
+                    "db - %s ran %s times in one request to %s, N+1?",
+                    query_name(query),
+                    count,
+                    route_name(scope) or scope["path"],
+                )
+        if self.log:
+            logger.info(responder.log_line(scope))
+
+
+class TimingResponder(StatusResponder):
+    def __init__(self, send: Send, *, header: bool) -> None:
+        super().__init__(send)
+        self.header = header
+        self.timings = RequestTimings()
+
+    async def send(self, message: Message) -> None:
+        if message["type"] == "http.response.start" and self.header:
+            headers = MutableHeaders(scope=message)
+            headers.append("Server-Timing", self.timings.server_timing())
+        await super().send(message)
+
+    def log_line(self, scope: Scope) -> str:
+        record = {
+            "method": scope["method"],
+            "path": scope["path"],
+            "route": route_name(scope),
+            "status": self.status_code,
+            **self.timings.as_dict(),
+        }
+        return orjson.dumps(record).decode()
@@ -1,17 +1,47 @@
-from typing import List
+from typing import Any, AsyncGenerator, List, Optional
 
+import orjson
 from app.api.dependencies.auth import get_current_active_user
 from app.api.dependencies.database import get_repository
+from app.api.responses import orjson_default, trusted_response
+from app.core.config import DEFAULT_PAGE_SIZE, MAX_BULK_SIZE, MAX_PAGE_SIZE
 from app.db.repositories.cleanings import CleaningsRepository
 from app.models.cleaning import (
+    CleaningBulkCreateResult,
+    CleaningBulkDeleteResult,
+    CleaningBulkItemError,
+    CleaningBulkUpdateResult,
     CleaningCreate,
     CleaningInDB,
     CleaningPublic,
     CleaningUpdate,
 )
 from app.models.user import UserInDB
-from fastapi import APIRouter, Body, Depends, HTTPException, Path
-from starlette.status import HTTP_200_OK, HTTP_201_CREATED, HTTP_404_NOT_FOUND
+from app.utils.conditional import (
+    check_not_modified,
+    has_conditional_headers,
+    make_etag,
+    set_validators,
+)
+from app.utils.pagination import decode_cursor, encode_cursor
+from fastapi import (
+    APIRouter,
+    Body,
+    Depends,
+    HTTPException,
+    Path,
+    Query,
+    Request,
+    Response,
+)
+from fastapi.responses import StreamingResponse
+from pydantic import ValidationError
+from starlette.status import (
+    HTTP_200_OK,
+    HTTP_201_CREATED,
+    HTTP_400_BAD_REQUEST,
+    HTTP_404_NOT_FOUND,
+)
 
 router = APIRouter()
 
@@ -87,6 +117,132 @@ async def create_new_cleaning(
     return created_cleaning
 
 
+@router.post(
+    "/bulk/",
+    response_model=CleaningBulkCreateResult,
+    name="cleanings:bulk-create-cleanings",
+    status_code=HTTP_200_OK,
+)
+async def bulk_create_cleanings(
+    new_cleanings: List[Any] = Body(..., embed=True),
+    current_user: UserInDB = Depends(get_current_active_user),
+    cleanings_repo: CleaningsRepository = Depends(get_repository(CleaningsRepository)),
+) -> CleaningBulkCreateResult:
+    """
+    Every item is validated on its own - invalid ones are reported in `errors`
+    (by their index in the request) and the valid ones are inserted in one round trip.
+    """
+    if len(new_cleanings) > MAX_BULK_SIZE:
+        raise HTTPException(
+            status_code=HTTP_400_BAD_REQUEST,
+            detail=f"At most {MAX_BULK_SIZE} cleanings can be created at once.",
+        )
+
+    valid_cleanings, errors = [], []
+    for index, item in enumerate(new_cleanings):
+        try:
+            # also rejects items that are not objects, by their index like the rest
+            cleaning = CleaningCreate.parse_obj(item)
+        except ValidationError as e:
+            errors.append(CleaningBulkItemError(index=index, errors=e.errors()))
+            continue
+        if cleaning.cleaning_type is None:
+            errors.append(
+                CleaningBulkItemError(
+                    index=index,
+                    errors=[
+                        {
+                            "loc": ["cleaning_type"],
+                            "msg": "Invalid cleaning type. Cannot be None.",
+                            "type": "value_error",
+                        }
+                    ],
+                )
+            )
+            continue
+        valid_cleanings.append(cleaning)
+
+    created = await cleanings_repo.create_cleanings(
+        new_cleanings=valid_cleanings, requesting_user=current_user
+    )
+    return CleaningBulkCreateResult(created=created, errors=errors)
+
+
+def check_bulk_size(ids: List[int]) -> None:
+    if len(ids) > MAX_BULK_SIZE:
+        raise HTTPException(
+            status_code=HTTP_400_BAD_REQUEST,
+            detail=f"At most {MAX_BULK_SIZE} cleanings can be changed at once.",
+        )
+
+
+@router.patch(
+    "/bulk/",
+    response_model=CleaningBulkUpdateResult,
+    name="cleanings:bulk-update-cleanings",
+)
+async def bulk_update_cleanings(
+    ids: List[int] = Body(..., embed=True),
+    cleaning_update: CleaningUpdate = Body(..., embed=True),
+    current_user: UserInDB = Depends(get_current_active_user),
+    cleanings_repo: CleaningsRepository = Depends(get_repository(CleaningsRepository)),
+) -> CleaningBulkUpdateResult:
+    """
+    Apply the same partial update to all listed cleanings owned by the user.
+    Ids that don't exist or belong to other users are reported, not updated.
+    """
+    check_bulk_size(ids)
+    return await cleanings_repo.update_cleanings(
+        ids=ids, cleaning_update=cleaning_update, requesting_user=current_user
+    )
+
+
+@router.post(
+    "/bulk/delete/",
+    response_model=CleaningBulkDeleteResult,
+    name="cleanings:bulk-delete-cleanings",
+)
+async def bulk_delete_cleanings(
+    ids: List[int] = Body(..., embed=True),
+    current_user: UserInDB = Depends(get_current_active_user),
+    cleanings_repo: CleaningsRepository = Depends(get_repository(CleaningsRepository)),
+) -> CleaningBulkDeleteResult:
+    """
+    A POST with the ids in the body - MAX_BULK_SIZE ids in a DELETE query string
+    would come close to the request line limit of the server.
+    """
+    check_bulk_size(ids)
+    return await cleanings_repo.delete_cleanings(ids=ids, requesting_user=current_user)
+
+
+@router.get("/stream/", name="cleanings:stream-all-user-cleanings")
+async def stream_all_user_cleanings(
+    format: str = Query("ndjson", regex="^(ndjson|json)$"),
+    current_user: UserInDB = Depends(get_current_active_user),
+    cleanings_repo: CleaningsRepository = Depends(get_repository(CleaningsRepository)),
+) -> StreamingResponse:
+    """
+    All of the user's cleanings, serialized and sent while they are read from the db.
+    format=ndjson sends one CleaningPublic per line, format=json sends a chunked JSON array.
+    """
+    cleanings = cleanings_repo.iterate_all_user_cleanings(requesting_user=current_user)
+
+    async def ndjson_lines() -> AsyncGenerator[bytes, None]:
+        async for cleaning in cleanings:
+            yield orjson.dumps(cleaning, default=orjson_default) + b"\n"
+
+    async def json_array() -> AsyncGenerator[bytes, None]:
+        separator = b"["
+        async for cleaning in cleanings:
+            yield separator + orjson.dumps(cleaning, default=orjson_default)
+            separator = b","
+        yield b"[]" if separator == b"[" else b"]"
+
+    if format == "ndjson":
+        return StreamingResponse(ndjson_lines(), media_type="application/x-ndjson")
+    return StreamingResponse(json_array(), media_type="application/json")
+
+
 @router.get(
     "/{id}",
     response_model=CleaningPublic,
@@ -94,10 +250,26 @@ async def create_new_cleaning(
     status_code=HTTP_200_OK,
 )
 async def get_cleanings_by_id(
+    request: Request,
+    response: Response,
     id: int = Path(..., ge=1),
     current_user: UserInDB = Depends(get_current_active_user),
     cleanings_repo: CleaningsRepository = Depends(get_repository(CleaningsRepository)),
 ) -> CleaningPublic:
+    """
+    Sends a weak ETag and Last-Modified, conditional requests are answered with
+    304 Not Modified from updated_at alone, without loading the cleaning.
+    """
+    if has_conditional_headers(request):
+        updated_at = await cleanings_repo.get_cleaning_updated_at(id=id)
+        if updated_at is None:
+            raise HTTPException(
+                status_code=HTTP_404_NOT_FOUND, detail="No cleaning found with that id."
+            )
+        not_modified = check_not_modified(request, key=str(id), updated_at=updated_at)
+        if not_modified:
+            return not_modified
+
     cleaning = await cleanings_repo.get_cleaning_by_id(
         id=id, requesting_user=current_user
     )
@@ -107,6 +279,10 @@ async def get_cleanings_by_id(
             status_code=HTTP_404_NOT_FOUND, detail="No cleaning found with that id."
         )
 
+    if cleaning.updated_at:
+        set_validators(
+            response, make_etag(str(id), cleaning.updated_at), cleaning.updated_at
+        )
     return cleaning
 
 
@@ -114,10 +290,38 @@ async def get_cleanings_by_id(
     "/", response_model=List[CleaningPublic], name="cleanings:list-all-user-cleanings"
 )
 async def list_all_user_cleanings(
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = Query(None),
     current_user: UserInDB = Depends(get_current_active_user),
     cleanings_repo: CleaningsRepository = Depends(get_repository(CleaningsRepository)),
-) -> List[CleaningPublic]:
-    return await cleanings_repo.list_all_user_cleanings(requesting_user=current_user)
+) -> Response:
+    """
+    Cleanings are returned newest first, one page at a time.
+    When there are more of them the opaque cursor of the next page is sent
+    in the X-Next-Cursor header - pass it back as ?cursor= to continue.
+    The rows are trusted CleaningInDB models, so response_model is only used for the docs.
+    """
+    after_id = None
+    if cursor:
+        after_id = decode_cursor(cursor).get("id")
+        if not isinstance(after_id, int):
+            raise HTTPException(
+                status_code=HTTP_400_BAD_REQUEST, detail="Invalid pagination cursor."
+            )
+
+    # fetch one extra row to know whether there is a next page
+    cleanings = await cleanings_repo.list_user_cleanings_page(
+        requesting_user=current_user, limit=limit + 1, after_id=after_id
+    )
+    next_cursor = None
+    if len(cleanings) > limit:
+        cleanings = cleanings[:limit]
+        next_cursor = encode_cursor({"id": cleanings[-1].id})
+
+    response = trusted_response(cleanings)
+    if next_cursor:
+        response.headers["X-Next-Cursor"] = next_cursor
+    return response
 
 
 @router.put(
@@ -0,0 +1,21 @@
+from typing import Optional
+
+from app.api.metrics import worker_families
+from app.services.metrics import MetricsDirectory, merge_families, render
+from fastapi import APIRouter
+from starlette.requests import Request
+from starlette.responses import Response
+
+router = APIRouter()
+
+PROMETHEUS_CONTENT_TYPE = "text/plain; version=0.0.4"
+
+
+@router.get("/metrics", name="metrics:get-metrics", include_in_schema=False)
+async def get_metrics(request: Request) -> Response:
+    families = worker_families(request.app)
+    directory: Optional[MetricsDirectory] = request.app.state.metrics_directory
+    if directory is not None:
+        directory.write(families)  # so this worker's numbers are current
+        families = merge_families(directory.read())
+    return Response(render(families), media_type=PROMETHEUS_CONTENT_TYPE)
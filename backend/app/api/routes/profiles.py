@@ -1,9 +1,27 @@
 from app.api.dependencies.auth import get_current_active_user
 from app.api.dependencies.database import get_repository
+from app.api.responses import trusted_response
 from app.db.repositories.profiles import ProfilesRepository
 from app.models.profile import ProfilePublic, ProfileUpdate
 from app.models.user import UserInDB
-from fastapi import APIRouter, Body, Depends, HTTPException, Path, status
+from app.services import profile_cache
+from app.services.profile_cache import CachedProfile
+from app.utils.conditional import (
+    check_not_modified,
+    has_conditional_headers,
+    make_etag,
+    set_validators,
+)
+from fastapi import (
+    APIRouter,
+    Body,
+    Depends,
+    HTTPException,
+    Path,
+    Request,
+    Response,
+    status,
+)
 
 router = APIRouter()
 
@@ -18,18 +36,61 @@ async def get_profile_be_username(
         min_length=3,
         regex="^[a-zA-Z0-9_-]+$",
     ),
+    request: Request,
     current_user: UserInDB = Depends(get_current_active_user),
     profiles_repo: ProfilesRepository = Depends(get_repository(ProfilesRepository)),
-) -> ProfilePublic:
-    profile = await profiles_repo.get_profile_by_username(username=username)
+) -> Response:
+    """
+    Same conditional GET handling as cleanings:get-cleaning-by-id.
+    The rendered profile is kept in profile_cache, cache hits don't touch the db
+    or the models at all.
+    """
+    cached = profile_cache.get(username=username)
+    if cached is not None:
+        not_modified = check_not_modified(
+            request, key=username, updated_at=cached.updated_at
+        )
+        return not_modified or cached_profile_response(cached)
+    return await load_profile_response(request, username, profiles_repo)
+
+
+def profile_not_found() -> HTTPException:
+    return HTTPException(
+        status_code=status.HTTP_404_NOT_FOUND,
+        detail="No profile found with that username.",
+    )
 
+
+def cached_profile_response(cached: CachedProfile) -> Response:
+    response = Response(cached.body, media_type="application/json")
+    set_validators(response, cached.etag, cached.updated_at)
+    return response
+
+
+async def load_profile_response(
+    request: Request, username: str, profiles_repo: ProfilesRepository
+) -> Response:
+    if has_conditional_headers(request):
+        updated_at = await profiles_repo.get_profile_updated_at(username=username)
+        if updated_at is None:
+            raise profile_not_found()
+        not_modified = check_not_modified(request, key=username, updated_at=updated_at)
+        if not_modified:
+            return not_modified
+
+    # a profile update landing during the query must not be undone by the fill
+    generation = profile_cache.generation(username=username)
+    profile = await profiles_repo.get_profile_by_username(username=username)
     if not profile:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="No profile found with that username.",
-        )
+        raise profile_not_found()
 
-    return profile
+    cached = CachedProfile(
+        body=trusted_response(profile).body,
+        etag=make_etag(username, profile.updated_at),
+        updated_at=profile.updated_at,
+    )
+    profile_cache.set(username=username, profile=cached, generation=generation)
+    return cached_profile_response(cached)
 
 
 @router.put("/me/", response_model=ProfilePublic, name="profiles:update-own-profile")
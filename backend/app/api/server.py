@@ -13,15 +13,42 @@ from fastapi.middleware.cors import CORSMiddleware
 But developers from FastAPI created the interface for the most of the starlette interface
 so we can import it directly from fastapi
 """
+from app.api.middleware.compression import CompressionMiddleware
+from app.api.middleware.metrics import MetricsMiddleware
+from app.api.middleware.timing import ServerTimingMiddleware
+from app.api.responses import ORJSONResponse
 from app.api.routes import router as api_router
+from app.api.routes.metrics import router as metrics_router
 from app.core import config, tasks
+from app.core.timing import timing_enabled
+from app.services.metrics import MetricsDirectory, RequestMetrics
+
+
+def install_metrics(app: FastAPI) -> None:
+    """
+    Count the requests (outermost middleware, so the latency covers the others too)
+    and serve the numbers at /metrics in prometheus format.
+    """
+    app.state.request_metrics = RequestMetrics()
+    app.state.metrics_directory = None
+    if config.METRICS_MULTIPROCESS_DIR:
+        app.state.metrics_directory = MetricsDirectory(
+            config.METRICS_MULTIPROCESS_DIR, interval=config.METRICS_WRITE_INTERVAL
+        )
+    app.add_middleware(MetricsMiddleware, metrics=app.state.request_metrics)
+    app.include_router(metrics_router)
 
 
 def get_application():
-    app = FastAPI(title=config.PROJECT_NAME, version=config.VERSION)
+    app = FastAPI(
+        title=config.PROJECT_NAME,
+        version=config.VERSION,
+        default_response_class=ORJSONResponse,
+    )
     """
     This is a factory functions which returns FastAppi app with cors middleware configured
     About cors You can read more here: https://developer.mozilla.org/en-US/docs/Web/HTTP/CORS
+    Responses are rendered with orjson (app/api/responses.py) unless a route says otherwise
     """
 
     # TODO read about middleware and all allows things below
@@ -31,7 +58,27 @@ def get_application():
         allow_credentials=True,
         allow_methods=["*"],
         allow_headers=["*"],
+        # browsers only let scripts read the headers listed here
+        expose_headers=["X-Next-Cursor"],
     )
+    if config.COMPRESSION_ENABLED:
+        app.add_middleware(
+            CompressionMiddleware,
+            minimum_size=config.COMPRESSION_MINIMUM_SIZE,
+            gzip_level=config.COMPRESSION_GZIP_LEVEL,
+            brotli_quality=config.COMPRESSION_BROTLI_QUALITY,
+            cache_size=config.COMPRESSION_CACHE_SIZE,
+        )
+    if timing_enabled():
+        # outside of the compression, so the total includes it
+        app.add_middleware(
+            ServerTimingMiddleware,
+            header=config.SERVER_TIMING_HEADER,
+            log=config.REQUEST_TIMING_LOG,
+            repeated_query_limit=config.REPEATED_QUERY_LIMIT,
+        )
+    if config.METRICS_ENABLED:
+        install_metrics(app)
     # register event handlers for db
     app.add_event_handler(
         "startup", tasks.create_start_app_handlers(app)
@@ -1,6 +1,6 @@
 from databases import DatabaseURL  # should work in docker it's not installed locally
 from starlette.config import Config
-from starlette.datastructures import Secret
+from starlette.datastructures import CommaSeparatedStrings, Secret
 
 config = Config(".env")
 
@@ -23,6 +23,55 @@ JWT_TOKEN_PREFIX = config(
     "JWT_TOKEN_PREFIX", cast=str, default="Bearer"
 )  # TODO what exactly is it?
 
+# in-process cache of users resolved from access tokens, see app/services/principal_cache.py
+PRINCIPAL_CACHE_ENABLED = config("PRINCIPAL_CACHE_ENABLED", cast=bool, default=True)
+PRINCIPAL_CACHE_TTL_SECONDS = config(
+    "PRINCIPAL_CACHE_TTL_SECONDS", cast=float, default=30
+)
+PRINCIPAL_CACHE_MAX_SIZE = config("PRINCIPAL_CACHE_MAX_SIZE", cast=int, default=1024)
+
+# in-process cache of rendered public profiles, see app/services/profile_cache.py
+PROFILE_CACHE_ENABLED = config("PROFILE_CACHE_ENABLED", cast=bool, default=True)
+PROFILE_CACHE_TTL_SECONDS = config("PROFILE_CACHE_TTL_SECONDS", cast=float, default=60)
+PROFILE_CACHE_MAX_SIZE = config("PROFILE_CACHE_MAX_SIZE", cast=int, default=4096)
+
+# bcrypt runs in a bounded thread pool so it doesn't block the event loop
+PASSWORD_HASHING_WORKERS = config("PASSWORD_HASHING_WORKERS", cast=int, default=4)
+
+# keyset pagination of list endpoints
+DEFAULT_PAGE_SIZE = config("DEFAULT_PAGE_SIZE", cast=int, default=50)
+MAX_PAGE_SIZE = config("MAX_PAGE_SIZE", cast=int, default=200)
+
+# maximum number of items accepted by a single bulk request
+MAX_BULK_SIZE = config("MAX_BULK_SIZE", cast=int, default=1000)
+
+# brotli / gzip compression of responses, see app/api/middleware/compression.py
+COMPRESSION_ENABLED = config("COMPRESSION_ENABLED", cast=bool, default=True)
+# smaller bodies are sent as they are (bytes)
+COMPRESSION_MINIMUM_SIZE = config("COMPRESSION_MINIMUM_SIZE", cast=int, default=1024)
+COMPRESSION_GZIP_LEVEL = config("COMPRESSION_GZIP_LEVEL", cast=int, default=6)  # 1-9
+COMPRESSION_BROTLI_QUALITY = config(
+    "COMPRESSION_BROTLI_QUALITY", cast=int, default=4
+)  # 0-11
+# compressed bodies of responses with an ETag are kept, 0 disables
+COMPRESSION_CACHE_SIZE = config("COMPRESSION_CACHE_SIZE", cast=int, default=256)
+
+# per-request db / auth / serialization timings, see app/api/middleware/timing.py
+SERVER_TIMING_HEADER = config("SERVER_TIMING_HEADER", cast=bool, default=False)
+REQUEST_TIMING_LOG = config("REQUEST_TIMING_LOG", cast=bool, default=False)
+# queries slower than this are logged with the name of their constant (ms, 0 disables)
+SLOW_QUERY_MS = config("SLOW_QUERY_MS", cast=float, default=200)
+# the same query running more times than this in one request is logged as a
+# possible N+1 (0 disables)
+REPEATED_QUERY_LIMIT = config("REPEATED_QUERY_LIMIT", cast=int, default=5)
+
+# prometheus metrics at /metrics, see app/services/metrics.py
+METRICS_ENABLED = config("METRICS_ENABLED", cast=bool, default=True)
+# with several worker processes each one writes its metrics to this directory and
+# /metrics adds them up, leave it empty for a single process
+METRICS_MULTIPROCESS_DIR = config("METRICS_MULTIPROCESS_DIR", cast=str, default="")
+METRICS_WRITE_INTERVAL = config("METRICS_WRITE_INTERVAL", cast=float, default=5)
+
 POSTGRES_USER = config("POSTGRES_USER", cast=str)
 POSTGRES_PASSWORD = config("POSTGRES_PASSWORD", cast=Secret)
 POSTGRES_SERVER = config("POSTGRES_SERVER", cast=str, default="db")
@@ -34,3 +83,31 @@ DATABASE_URL = config(
     cast=DatabaseURL,
     default=f"postgresql://{POSTGRES_USER}:{POSTGRES_PASSWORD}@{POSTGRES_SERVER}:{POSTGRES_PORT}/{POSTGRES_DB}",
 )
+
+# optional read replicas, comma separated urls - reads are routed to them (app/db/routing.py)
+DATABASE_REPLICA_URLS = config(
+    "DATABASE_REPLICA_URLS", cast=CommaSeparatedStrings, default=""
+)
+# for how long after a write the reads of the same client still go to the primary
+READ_YOUR_WRITES_SECONDS = config("READ_YOUR_WRITES_SECONDS", cast=float, default=5)
+
+# database connection pool, per worker process (times are in seconds, 0 disables)
+DB_POOL_MIN_SIZE = config("DB_POOL_MIN_SIZE", cast=int, default=2)
+DB_POOL_MAX_SIZE = config("DB_POOL_MAX_SIZE", cast=int, default=10)
+DB_POOL_ACQUIRE_TIMEOUT = config("DB_POOL_ACQUIRE_TIMEOUT", cast=float, default=10)
+DB_POOL_MAX_LIFETIME = config("DB_POOL_MAX_LIFETIME", cast=float, default=3600)
+DB_POOL_IDLE_TIMEOUT = config("DB_POOL_IDLE_TIMEOUT", cast=float, default=300)
+
+# production launcher (python -m app.launcher), number of worker processes, 0 = one per
+# cpu the process may run on (set it explicitly under a container cpu quota)
+WEB_CONCURRENCY = config("WEB_CONCURRENCY", cast=int, default=0)
+# connections all the workers together may open to each database, the launcher splits it
+# into the per-worker pools (0 keeps DB_POOL_MAX_SIZE per worker)
+DB_CONNECTION_BUDGET = config("DB_CONNECTION_BUDGET", cast=int, default=0)
+# a worker is replaced after this many requests (0 disables), plus a random share of
+# the jitter so the workers don't all restart at once
+WORKER_MAX_REQUESTS = config("WORKER_MAX_REQUESTS", cast=int, default=0)
+WORKER_MAX_REQUESTS_JITTER = config("WORKER_MAX_REQUESTS_JITTER", cast=int, default=0)
+
+# run repository queries with asyncpg directly instead of through `databases` (app/db/fast_path.py)
+DB_FAST_PATH = config("DB_FAST_PATH", cast=bool, default=False)
@@ -1,18 +1,23 @@
 from typing import Callable
 
+from app.api.metrics import start_metrics_writer, stop_metrics_writer
 from app.db.tasks import close_db_connection, connect_to_db
+from app.services import auth_service
 from fastapi import FastAPI
 
 
 def create_start_app_handlers(app: FastAPI) -> Callable:
     async def start_app() -> None:
         await connect_to_db(app)
+        start_metrics_writer(app)
 
     return start_app
 
 
 def create_stop_app_handler(app: FastAPI) -> Callable:
     async def stop_app() -> None:
+        await stop_metrics_writer(app)
         await close_db_connection(app)
+        auth_service.shutdown()
 
     return stop_app
@@ -0,0 +1,99 @@
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Dict, Iterator, Optional
+
+from app.core import config
+
+# the parts of a request we time, in the order they are reported
+METRICS = ("db", "auth", "serialize")
+
+
+def timing_enabled() -> bool:
+    return bool(
+        config.SERVER_TIMING_HEADER
+        or config.REQUEST_TIMING_LOG
+        or config.REPEATED_QUERY_LIMIT
+    )
+
+
+def milliseconds(seconds: float) -> float:
+    return round(seconds * 1000, 2)
+
+
+class RequestTimings:
+    """
+    Where the time of one request went - the db queries (see InstrumentedDatabase),
+    auth (bcrypt and jwt, see AuthService) and rendering the response body.
+    FastAPI's response_model validation is only part of the total.
+    """
+
+    def __init__(self) -> None:
+        self.started = time.perf_counter()
+        self.durations: Dict[str, float] = dict.fromkeys(METRICS, 0.0)
+        self.db_queries = 0
+        self.query_counts: Dict[str, int] = {}  # query -> how many times it ran
+
+    def add(self, metric: str, seconds: float) -> None:
+        self.durations[metric] += seconds
+
+    def add_query(self, query: str, seconds: float) -> None:
+        self.db_queries += 1
+        self.durations["db"] += seconds
+        self.query_counts[query] = self.query_counts.get(query, 0) + 1
+
+    def repeated_queries(self, limit: int) -> Dict[str, int]:
+        """
+        The queries that ran more than `limit` times, usually a query per row of
+        another result (N+1) that should be one query.
+        """
+        return {
+            query: count for query, count in self.query_counts.items() if count > limit
+        }
+
+    def total(self) -> float:
+        return time.perf_counter() - self.started
+
+    def server_timing(self) -> str:
+        """
+        db;dur=1.52;desc="3 queries", auth;dur=0.21, serialize;dur=0.08, total;dur=4.3
+        """
+        db = milliseconds(self.durations["db"])
+        metrics = [
+            f'db;dur={db};desc="{self.db_queries} queries"',
+            *(
+                f"{metric};dur={milliseconds(self.durations[metric])}"
+                for metric in METRICS[1:]
+            ),
+            f"total;dur={milliseconds(self.total())}",
+        ]
+        return ", ".join(metrics)
+
+    def as_dict(self) -> Dict[str, Any]:
+        record: Dict[str, Any] = {"total_ms": milliseconds(self.total())}
+        for metric in METRICS:
+            record[f"{metric}_ms"] = milliseconds(self.durations[metric])
+        record["db_queries"] = self.db_queries
+        return record
+
+
+# set by ServerTimingMiddleware for the duration of a request
+current_timings: ContextVar[Optional[RequestTimings]] = ContextVar(
+    "current_timings", default=None
+)
+
+
+@contextmanager
+def timed(metric: str) -> Iterator[None]:
+    """
+    Add the time spent in the block to `metric` of the current request, if any.
+    """
+    timings = current_timings.get()
+    if timings is None:
+        yield
+        return
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        timings.add(metric, time.perf_counter() - start)
@@ -0,0 +1,138 @@
+import re
+from contextlib import asynccontextmanager
+from contextvars import ContextVar
+from typing import Any, AsyncGenerator, Dict, List, Optional, Tuple
+
+from databases import Database
+
+# :name parameters, but not the :: casts
+NAMED_PARAMETER = re.compile(r"(?<![:\w]):(\w+)")
+
+
+def convert_named_parameters(query: str) -> Tuple[str, Tuple[str, ...]]:
+    """
+    Turn a query using :name parameters into the $1, $2... form asyncpg expects,
+    returns the new query and the parameter names in positional order.
+    """
+    names: List[str] = []
+
+    def replace(match: "re.Match[str]") -> str:
+        name = match.group(1)
+        if name not in names:
+            names.append(name)
+        return f"${names.index(name) + 1}"
+
+    return NAMED_PARAMETER.sub(replace, query), tuple(names)
+
+
+class AsyncpgExecutor:
+    """
+    Fast path for the repositories: runs their queries with asyncpg directly, on the same
+    pool that `databases` created, instead of going through `databases`/SQLAlchemy.
+
+    - every query string is converted to asyncpg's positional form once and cached,
+    - asyncpg prepares each statement once per connection (statement cache) and uses
+      its binary codecs,
+    - rows are plain asyncpg Records, which can be used like the `databases` ones
+      (record["column"], Model(**record)).
+
+    It exposes the part of the `databases.Database` api used by the repositories.
+    Enable it with DB_FAST_PATH=True (see BaseRepository).
+    """
+
+    def __init__(self, database: Database) -> None:
+        self.database = database
+        self._queries: Dict[str, Tuple[str, Tuple[str, ...]]] = {}
+        self._connection: ContextVar[Optional[Any]] = ContextVar(
+            f"fast_path_connection_{id(self)}", default=None
+        )
+
+    @property
+    def pool(self) -> Any:
+        return self.database._backend._pool
+
+    def _prepare(self, query: str, values: Optional[dict]) -> Tuple[str, list]:
+        try:
+            sql, names = self._queries[query]
+        except KeyError:
+            sql, names = self._queries[query] = convert_named_parameters(query)
+        values = values or {}
+        return sql, [values[name] for name in names]
+
+    @asynccontextmanager
+    async def _acquire(self) -> AsyncGenerator[Any, None]:
+        connection = self._connection.get()
+        if connection is not None:
+            # inside transaction(), keep using its connection
+            yield connection
+            return
+
+        connection = await self.pool.acquire()
+        try:
+            yield connection
+        finally:
+            await self.pool.release(connection)
+
+    async def fetch_all(self, query: str, values: Optional[dict] = None) -> List[Any]:
+        sql, args = self._prepare(query, values)
+        async with self._acquire() as connection:
+            return await connection.fetch(sql, *args)
+
+    async def fetch_one(self, query: str, values: Optional[dict] = None) -> Any:
+        sql, args = self._prepare(query, values)
+        async with self._acquire() as connection:
+            return await connection.fetchrow(sql, *args)
+
+    async def fetch_val(
+        self, query: str, values: Optional[dict] = None, column: Any = 0
+    ) -> Any:
+        sql, args = self._prepare(query, values)
+        async with self._acquire() as connection:
+            return await connection.fetchval(sql, *args, column=column)
+
+    async def execute(self, query: str, values: Optional[dict] = None) -> Any:
+        # like `databases`, return the first column of the first row (e.g. RETURNING id)
+        return await self.fetch_val(query=query, values=values)
+
+    async def execute_many(self, query: str, values: List[dict]) -> None:
+        sql, _ = self._prepare(query, None)
+        args = [self._prepare(query, v)[1] for v in values]
+        async with self._acquire() as connection:
+            await connection.executemany(sql, args)
+
+    async def iterate(
+        self, query: str, values: Optional[dict] = None
+    ) -> AsyncGenerator[Any, None]:
+        sql, args = self._prepare(query, values)
+        async with self.transaction():  # server-side cursors need a transaction
+            async for record in self._connection.get().cursor(sql, *args):
+                yield record
+
+    @asynccontextmanager
+    async def transaction(self, *, force_rollback: bool = False) -> AsyncGenerator:
+        async with self._acquire() as connection:
+            transaction = connection.transaction()
+            await transaction.start()
+            token = self._connection.set(connection)
+            try:
+                yield transaction
+            except BaseException:
+                await transaction.rollback()
+                raise
+            else:
+                if force_rollback:
+                    await transaction.rollback()
+                else:
+                    await transaction.commit()
+            finally:
+                self._connection.reset(token)
+
+
+def fast_path_for(database: Database) -> AsyncpgExecutor:
+    """
+    One executor per Database, so the converted queries are shared by all repositories.
+    """
+    executor = getattr(database, "_fast_path", None)
+    if executor is None:
+        executor = database._fast_path = AsyncpgExecutor(database)
+    return executor
@@ -0,0 +1,156 @@
+import logging
+import time
+from contextlib import contextmanager
+from functools import lru_cache
+from typing import (
+    Any,
+    AsyncGenerator,
+    Callable,
+    Dict,
+    Iterator,
+    List,
+    Mapping,
+    Optional,
+    Tuple,
+)
+
+from app.core import config
+from app.core.timing import current_timings, timing_enabled
+
+logger = logging.getLogger(__name__)
+
+SQL_STATEMENTS = {"SELECT", "INSERT", "UPDATE", "DELETE", "WITH"}
+
+# called with (query, seconds) after every query, see count_queries()
+query_observers: List[Callable[[str, float], None]] = []
+
+
+def instrumentation_enabled() -> bool:
+    return bool(timing_enabled() or config.SLOW_QUERY_MS or query_observers)
+
+
+def repository_queries() -> Iterator[Tuple[str, str]]:
+    """
+    ("module.CONSTANT", sql) of every query constant of the repositories.
+    """
+    # imported here, the repositories import this module
+    from app.db.repositories import cleanings, profiles, users
+
+    for module in (cleanings, profiles, users):
+        for name, value in vars(module).items():
+            if (
+                name.isupper()
+                and isinstance(value, str)
+                and value.split(None, 1)[0].upper() in SQL_STATEMENTS
+            ):
+                yield f"{module.__name__.rsplit('.', 1)[-1]}.{name}", value
+
+
+@lru_cache(maxsize=None)
+def _query_names() -> Dict[str, str]:
+    return {query: name for name, query in repository_queries()}
+
+
+def query_name(query: str) -> str:
+    """
+    The SQL constant a query comes from, the start of the query itself for the rest.
+    """
+    name = _query_names().get(query)
+    if name is None:
+        name = " ".join(query.split())[:80]
+    return name
+
+
+@contextmanager
+def count_queries() -> Iterator[List[str]]:
+    """
+    Names of the queries run inside the block, whichever request runs them.
+        with count_queries() as queries:
+            ...
+        assert len(queries) <= 2, queries
+    """
+    queries: List[str] = []
+
+    def observe(query: str, seconds: float) -> None:
+        queries.append(query_name(query))
+
+    query_observers.append(observe)
+    try:
+        yield queries
+    finally:
+        query_observers.remove(observe)
+
+
+class InstrumentedDatabase:
+    """
+    Wraps the database handed to a repository (Database, RoutedDatabase or the fast
+    path) and watches its queries:
+    - their count and duration go to the timings of the current request
+      (app/core/timing.py), which also spots the same query repeating (N+1),
+    - the ones slower than SLOW_QUERY_MS are logged with the name of their constant.
+    """
+
+    def __init__(self, database: Any) -> None:
+        self.database = database
+        self.slow_query_seconds = config.SLOW_QUERY_MS / 1000
+
+    async def _timed(self, method: str, **kwargs: Any) -> Any:
+        start = time.perf_counter()
+        try:
+            return await getattr(self.database, method)(**kwargs)
+        finally:
+            self.record(kwargs["query"], time.perf_counter() - start)
+
+    def record(self, query: str, seconds: float) -> None:
+        timings = current_timings.get()
+        if timings is not None:
+            timings.add_query(query, seconds)
+        if self.slow_query_seconds and seconds >= self.slow_query_seconds:
+            logger.warning(
+                "db - slow query %s took %.1f ms", query_name(query), seconds * 1000
+            )
+        for observe in query_observers:
+            observe(query, seconds)
+
+    async def fetch_all(self, query: str, values: Optional[dict] = None) -> List[Mapping]:
+        return await self._timed("fetch_all", query=query, values=values)
+
+    async def fetch_one(
+        self, query: str, values: Optional[dict] = None
+    ) -> Optional[Mapping]:
+        return await self._timed("fetch_one", query=query, values=values)
+
+    async def fetch_val(
+        self, query: str, values: Optional[dict] = None, column: Any = 0
+    ) -> Any:
+        return await self._timed("fetch_val", query=query, values=values, column=column)
+
+    async def execute(self, query: str, values: Optional[dict] = None) -> Any:
+        return await self._timed("execute", query=query, values=values)
+
+    async def execute_many(self, query: str, values: list) -> None:
+        return await self._timed("execute_many", query=query, values=values)
+
+    async def iterate(
+        self, query: str, values: Optional[dict] = None
+    ) -> AsyncGenerator[Mapping, None]:
+        """
+        Counted as one query, the time the consumer spends between rows isn't.
+        """
+        rows = self.database.iterate(query=query, values=values).__aiter__()
+        elapsed = 0.0
+        try:
+            while True:
+                start = time.perf_counter()
+                try:
+                    record = await rows.__anext__()
+                except StopAsyncIteration:
+                    break
+                finally:
+                    elapsed += time.perf_counter() - start
+                yield record
+        finally:
+            self.record(query, elapsed)
+
+    def transaction(self, *, force_rollback: bool = False) -> Any:
+        return self.database.transaction(force_rollback=force_rollback)
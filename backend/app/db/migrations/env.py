@@ -17,7 +17,8 @@ from app.core.config import DATABASE_URL, POSTGRES_DB  # noqa
 config = alembic.context.config
 
 # Interpret the config file for logging
-fileConfig(config.config_file_name)
+# (keeping the app's loggers, the tests run the migrations in the same process)
+fileConfig(config.config_file_name, disable_existing_loggers=False)
 logger = logging.getLogger("alembic.env")
 
 
@@ -0,0 +1,27 @@
+"""add_cleanings_owner_id_index
+
+Revision ID: b3327d2850e6
+Revises: fcf693f61018
+Create Date: 2026-10-18 19:40:12.318274
+
+"""
+from alembic import op
+
+# revision identifiers, used by Alembic
+revision = "b3327d2850e6"
+down_revision = "fcf693f61018"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    """
+    Composite index backing the keyset pagination of a user's cleanings:
+    WHERE owner = :owner AND id < :after ORDER BY id DESC LIMIT :limit
+    is a single index range scan, so deep pages cost the same as the first one.
+    """
+    op.create_index("ix_cleanings_owner_id", "cleanings", ["owner", "id"])
+
+
+def downgrade() -> None:
+    op.drop_index("ix_cleanings_owner_id", table_name="cleanings")
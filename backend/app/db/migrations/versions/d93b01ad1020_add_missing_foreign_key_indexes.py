@@ -0,0 +1,29 @@
+"""add_missing_foreign_key_indexes
+
+Revision ID: d93b01ad1020
+Revises: b3327d2850e6
+Create Date: 2026-10-18 20:05:41.902113
+
+"""
+from alembic import op
+
+# revision identifiers, used by Alembic
+revision = "d93b01ad1020"
+down_revision = "b3327d2850e6"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    """
+    Index audit of the queries in app/db/repositories (guarded by tests/test_query_plans.py):
+        - profiles.user_id is used by every profile lookup and every user+profile join.
+          Each user has exactly one profile, so the index is unique.
+        - cleanings.owner is already covered by ix_cleanings_owner_id (owner, id),
+          a separate single column index would only be redundant.
+    """
+    op.create_index("ix_profiles_user_id", "profiles", ["user_id"], unique=True)
+
+
+def downgrade() -> None:
+    op.drop_index("ix_profiles_user_id", table_name="profiles")
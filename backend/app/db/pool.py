@@ -0,0 +1,152 @@
+import asyncio
+import bisect
+import logging
+import time
+from typing import Any, Dict, List, Optional
+from weakref import WeakKeyDictionary
+
+from databases import Database
+
+logger = logging.getLogger(__name__)
+
+# upper bounds (in seconds) of the acquire wait time histogram buckets
+ACQUIRE_WAIT_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+
+
+def physical_connection(connection: Any) -> Any:
+    """
+    The asyncpg Connection behind the proxy handed out by the pool. Proxies are
+    new for every acquire, the connection lives until it's closed.
+    """
+    return getattr(connection, "_con", None) or connection
+
+
+class InstrumentedPool:
+    """
+    Thin wrapper around the asyncpg pool created by `databases` that keeps live statistics
+    (connections in use, requests waiting for a connection, how long they waited) and
+    enforces the acquire timeout and the maximum lifetime of a connection.
+
+    It's installed by install_instrumented_pool(), `databases` only ever calls
+    acquire(), release() and close() on its pool.
+    """
+
+    def __init__(
+        self,
+        pool: Any,
+        *,
+        acquire_timeout: Optional[float] = None,
+        max_lifetime: Optional[float] = None,
+    ) -> None:
+        self._pool = pool
+        self.acquire_timeout = acquire_timeout or None
+        self.max_lifetime = max_lifetime or None
+        # physical connection -> when it was first seen, entries go away with the
+        # connection, also when asyncpg closes it for being idle
+        self._connected_at: "WeakKeyDictionary[Any, float]" = WeakKeyDictionary()
+
+        self.in_use = 0
+        self.waiters = 0
+        self.acquires = 0
+        self.acquire_timeouts = 0
+        self.recycled = 0
+        self.acquire_wait_sum = 0.0
+        self.acquire_wait_buckets: List[int] = [0] * (len(ACQUIRE_WAIT_BUCKETS) + 1)
+
+    async def acquire(self) -> Any:
+        self.waiters += 1
+        start = time.perf_counter()
+        try:
+            connection = await self._pool.acquire(timeout=self.acquire_timeout)
+        except asyncio.TimeoutError:
+            self.acquire_timeouts += 1
+            logger.warning(
+                "db pool - no connection available after %ss (in use: %s, waiting: %s)",
+                self.acquire_timeout,
+                self.in_use,
+                self.waiters - 1,
+            )
+            raise
+        finally:
+            self.waiters -= 1
+
+        waited = time.perf_counter() - start
+        self.acquires += 1
+        self.acquire_wait_sum += waited
+        self.acquire_wait_buckets[bisect.bisect_left(ACQUIRE_WAIT_BUCKETS, waited)] += 1
+        self.in_use += 1
+        self._connected_at.setdefault(physical_connection(connection), time.monotonic())
+        return connection
+
+    def is_expired(self, connection: Any) -> bool:
+        if self.max_lifetime is None:
+            return False
+        connected_at = self._connected_at.get(physical_connection(connection))
+        return (
+            connected_at is not None
+            and time.monotonic() - connected_at > self.max_lifetime
+        )
+
+    async def release(self, connection: Any) -> None:
+        self.in_use -= 1
+        if self.is_expired(connection):
+            # closing a pooled connection hands it back to the pool,
+            # which opens a fresh one the next time it's needed
+            self.recycled += 1
+            await connection.close()
+            return
+
+        await self._pool.release(connection)
+
+    async def close(self) -> None:
+        await self._pool.close()
+
+    def stats(self) -> Dict[str, Any]:
+        # asyncpg 0.24 has no get_size() / get_idle_size() yet, count what they count
+        # in later versions: holders with an open connection, and those not in use
+        connected = [
+            holder
+            for holder in self._pool._holders
+            if holder._con is not None and not holder._con.is_closed()
+        ]
+        return {
+            "min_size": self._pool._minsize,
+            "max_size": self._pool._maxsize,
+            "size": len(connected),
+            "idle": sum(1 for holder in connected if not holder._in_use),
+            "in_use": self.in_use,
+            "waiters": self.waiters,
+            "acquires": self.acquires,
+            "acquire_timeouts": self.acquire_timeouts,
+            "recycled": self.recycled,
+            "acquire_wait_seconds": {
+                "sum": self.acquire_wait_sum,
+                "count": self.acquires,
+                # cumulative, like prometheus histograms
+                "buckets": {
+                    str(bound): sum(self.acquire_wait_buckets[: i + 1])
+                    for i, bound in enumerate((*ACQUIRE_WAIT_BUCKETS, "+Inf"))
+                },
+            },
+        }
+
+
+def install_instrumented_pool(
+    database: Database, *, acquire_timeout: float, max_lifetime: float
+) -> InstrumentedPool:
+    """
+    Swap the asyncpg pool of a connected `databases.Database` for an InstrumentedPool.
+    """
+    backend = database._backend
+    pool = InstrumentedPool(
+        backend._pool, acquire_timeout=acquire_timeout, max_lifetime=max_lifetime
+    )
+    backend._pool = pool
+    return pool
+
+
+def get_pool_stats(database: Database) -> Optional[Dict[str, Any]]:
+    pool = getattr(database._backend, "_pool", None)
+    if isinstance(pool, InstrumentedPool):
+        return pool.stats()
+    return None
@@ -1,7 +1,35 @@
+from typing import Any, Dict, Iterable
+
+from app.core import config
+from app.db.fast_path import fast_path_for
+from app.db.instrumentation import InstrumentedDatabase, instrumentation_enabled
+from app.models.core import CoreModel
 from databases import Database
 
 
 class BaseRepository:
     def __init__(self, db: Database) -> None:
         # to keep reference to the connection to db
+        # with DB_FAST_PATH the queries skip `databases` and run on asyncpg directly
+        if config.DB_FAST_PATH and isinstance(db, Database):
+            db = fast_path_for(db)
+        # counts and times the queries (Server-Timing, slow queries, N+1)
+        if instrumentation_enabled():
+            db = InstrumentedDatabase(db)
         self.db = db
+
+    def partial_update_values(
+        self, *, update: CoreModel, fields: Iterable[str]
+    ) -> Dict[str, Any]:
+        """
+        Values for single-statement partial updates written as
+            column = CASE WHEN :update_column THEN :column ELSE column END
+        Only the attributes that were explicitly sent are flagged, so the row
+        doesn't have to be read and merged in python before writing it.
+        """
+        update_data = update.dict(exclude_unset=True)
+        values = {}
+        for field in fields:
+            values[f"update_{field}"] = field in update_data
+            values[field] = update_data.get(field)
+        return values
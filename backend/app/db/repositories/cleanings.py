@@ -1,8 +1,11 @@
 import logging
-from typing import List
+from datetime import datetime
+from typing import AsyncGenerator, List, Optional
 
 from app.db.repositories.base import BaseRepository
 from app.models.cleaning import (
+    CleaningBulkDeleteResult,
+    CleaningBulkUpdateResult,
     CleaningCreate,
     CleaningInDB,
     CleaningPublic,
@@ -18,37 +21,136 @@ CREATE_CLEANING_QUERY = """
     RETURNING id, name, description, price, cleaning_type, owner, created_at, updated_at;
 """
 
+# one multi-row insert for a whole batch - every column is sent as an array and unnested
+BULK_CREATE_CLEANINGS_QUERY = """
+    INSERT INTO cleanings (name, description, price, cleaning_type, owner)
+    SELECT name, description, price, cleaning_type, :owner
+    FROM unnest(
+        CAST(:names AS TEXT[]),
+        CAST(:descriptions AS TEXT[]),
+        CAST(:prices AS NUMERIC[]),
+        CAST(:cleaning_types AS TEXT[])
+    ) AS new_cleanings (name, description, price, cleaning_type)
+    RETURNING id, name, description, price, cleaning_type, owner, created_at, updated_at;
+"""
+
 GET_CLEANING_BY_ID = """
 SELECT id, name, description, price, cleaning_type, owner, created_at, updated_at
 FROM cleanings
 WHERE id = :id;
 """
 
+# cheap version check for conditional GETs, see app/utils/conditional.py
+GET_CLEANING_UPDATED_AT_QUERY = """
+SELECT updated_at
+FROM cleanings
+WHERE id = :id;
+"""
+
 LIST_ALL_USER_CLEANINGS_QUERY = """
     SELECT id, name, description, price, cleaning_type, owner, created_at, updated_at
     FROM cleanings
     WHERE owner = :owner;
 """
 
+# keyset pagination over (owner, id), backed by the ix_cleanings_owner_id index
+LIST_USER_CLEANINGS_FIRST_PAGE_QUERY = """
+    SELECT id, name, description, price, cleaning_type, owner, created_at, updated_at
+    FROM cleanings
+    WHERE owner = :owner
+    ORDER BY id DESC
+    LIMIT :limit;
+"""
+
+LIST_USER_CLEANINGS_NEXT_PAGE_QUERY = """
+    SELECT id, name, description, price, cleaning_type, owner, created_at, updated_at
+    FROM cleanings
+    WHERE owner = :owner AND id < :after_id
+    ORDER BY id DESC
+    LIMIT :limit;
+"""
+
 GET_ALL_CLEANINGS = """
 SELECT id, name, description, price, cleaning_type
 FROM cleanings;
 """
 
+# Single-statement mutations: the outer SELECT tells apart a missing cleaning (404)
+# from someone else's cleaning (403) without reading the row beforehand.
 UPDATE_CLEANING_BY_ID = """
-    UPDATE cleanings
-    SET name         = :name,
-        description  = :description,
-        price        = :price,
-        cleaning_type = :cleaning_type
-    WHERE id = :id AND owner = :owner
-    RETURNING id, name, description, price, cleaning_type, owner, created_at, updated_at;
+    WITH updated AS (
+        UPDATE cleanings
+        SET name          = CASE WHEN CAST(:update_name AS BOOLEAN)
+                                 THEN CAST(:name AS TEXT) ELSE name END,
+            description   = CASE WHEN CAST(:update_description AS BOOLEAN)
+                                 THEN CAST(:description AS TEXT) ELSE description END,
+            price         = CASE WHEN CAST(:update_price AS BOOLEAN)
+                                 THEN CAST(:price AS NUMERIC) ELSE price END,
+            cleaning_type = CASE WHEN CAST(:update_cleaning_type AS BOOLEAN)
+                                 THEN CAST(:cleaning_type AS TEXT) ELSE cleaning_type END
+        WHERE id = :id AND owner = :owner
+        RETURNING id, name, description, price, cleaning_type, owner, created_at, updated_at
+    )
+    SELECT c.id IS NOT NULL AS found, u.*
+    FROM (SELECT CAST(:id AS INTEGER) AS id) r
+        LEFT JOIN cleanings c ON c.id = r.id
+        LEFT JOIN updated u ON u.id = r.id;
 """
 
+# Bulk mutations touch every requested id with a single statement. The outer SELECT still
+# sees the rows as they were before the UPDATE/DELETE in the CTE, which is what tells
+# apart ids that don't exist (no cleanings row) from the ones owned by someone else.
+# A column is only changed when its update_<column> flag is set (partial update).
+BULK_UPDATE_CLEANINGS_QUERY = """
+    WITH requested AS (
+        SELECT DISTINCT unnest(CAST(:ids AS INTEGER[])) AS id
+    ), updated AS (
+        UPDATE cleanings
+        SET name          = CASE WHEN CAST(:update_name AS BOOLEAN)
+                                 THEN CAST(:name AS TEXT) ELSE name END,
+            description   = CASE WHEN CAST(:update_description AS BOOLEAN)
+                                 THEN CAST(:description AS TEXT) ELSE description END,
+            price         = CASE WHEN CAST(:update_price AS BOOLEAN)
+                                 THEN CAST(:price AS NUMERIC) ELSE price END,
+            cleaning_type = CASE WHEN CAST(:update_cleaning_type AS BOOLEAN)
+                                 THEN CAST(:cleaning_type AS TEXT) ELSE cleaning_type END
+        WHERE id = ANY(CAST(:ids AS INTEGER[])) AND owner = :owner
+        RETURNING id, name, description, price, cleaning_type, owner, created_at, updated_at
+    )
+    SELECT r.id AS requested_id, c.id IS NOT NULL AS found, u.*
+    FROM requested r
+        LEFT JOIN cleanings c ON c.id = r.id
+        LEFT JOIN updated u ON u.id = r.id
+    ORDER BY r.id;
+"""
+
+BULK_DELETE_CLEANINGS_QUERY = """
+    WITH requested AS (
+        SELECT DISTINCT unnest(CAST(:ids AS INTEGER[])) AS id
+    ), deleted AS (
+        DELETE FROM cleanings
+        WHERE id = ANY(CAST(:ids AS INTEGER[])) AND owner = :owner
+        RETURNING id
+    )
+    SELECT r.id AS requested_id, c.id IS NOT NULL AS found, d.id IS NOT NULL AS deleted
+    FROM requested r
+        LEFT JOIN cleanings c ON c.id = r.id
+        LEFT JOIN deleted d ON d.id = r.id
+    ORDER BY r.id;
+"""
+
+UPDATABLE_CLEANING_FIELDS = ("name", "description", "price", "cleaning_type")
+
 DELETE_CLEANING_BY_ID_QUERY = """
-    DELETE FROM cleanings
-    WHERE id = :id AND owner = :owner
-    RETURNING id;
+    WITH deleted AS (
+        DELETE FROM cleanings
+        WHERE id = :id AND owner = :owner
+        RETURNING id
+    )
+    SELECT c.id IS NOT NULL AS found, d.id AS deleted_id
+    FROM (SELECT CAST(:id AS INTEGER) AS id) r
+        LEFT JOIN cleanings c ON c.id = r.id
+        LEFT JOIN deleted d ON d.id = r.id;
 """
 
 
@@ -65,7 +167,30 @@ class CleaningsRepository(BaseRepository):
             query=CREATE_CLEANING_QUERY,
             values={**query_values, "owner": requesting_user.id},
         )
-        return CleaningInDB(**cleaning)
+        return CleaningInDB.from_record(cleaning)
+
+    async def create_cleanings(
+        self, *, new_cleanings: List[CleaningCreate], requesting_user: UserInDB
+    ) -> List[CleaningInDB]:
+        """
+        Insert the whole batch with a single statement, either all of the cleanings
+        are created or none of them (no explicit transaction needed, which would only
+        add a BEGIN and a COMMIT round trip).
+        """
+        if not new_cleanings:
+            return []
+
+        cleaning_records = await self.db.fetch_all(
+            query=BULK_CREATE_CLEANINGS_QUERY,
+            values={
+                "names": [c.name for c in new_cleanings],
+                "descriptions": [c.description for c in new_cleanings],
+                "prices": [c.price for c in new_cleanings],
+                "cleaning_types": [c.cleaning_type for c in new_cleanings],
+                "owner": requesting_user.id,
+            },
+        )
+        return [CleaningInDB.from_record(l) for l in cleaning_records]
 
     async def get_cleaning_by_id(
         self, *, id: int, requesting_user: UserInDB
@@ -75,7 +200,15 @@ class CleaningsRepository(BaseRepository):
         if not cleaning:
             return None
 
-        return CleaningInDB(**cleaning)
+        return CleaningInDB.from_record(cleaning)
+
+    async def get_cleaning_updated_at(self, *, id: int) -> Optional[datetime]:
+        # not fetch_val: databases 0.3 reads a raw query's record by position, which
+        # its postgres records don't support
+        record = await self.db.fetch_one(
+            query=GET_CLEANING_UPDATED_AT_QUERY, values={"id": id}
+        )
+        return record["updated_at"] if record else None
 
     async def list_all_user_cleanings(
         self, *, requesting_user: UserInDB
@@ -84,59 +217,143 @@ class CleaningsRepository(BaseRepository):
             query=LIST_ALL_USER_CLEANINGS_QUERY, values={"owner": requesting_user.id}
         )
 
-        return [CleaningInDB(**l) for l in cleaning_records]
+        return [CleaningInDB.from_record(l) for l in cleaning_records]
+
+    async def list_user_cleanings_page(
+        self, *, requesting_user: UserInDB, limit: int, after_id: Optional[int] = None
+    ) -> List[CleaningInDB]:
+        """
+        Newest first. Pass the id of the last cleaning of the previous page as
+        `after_id` to get the next one.
+        """
+        if after_id is None:
+            cleaning_records = await self.db.fetch_all(
+                query=LIST_USER_CLEANINGS_FIRST_PAGE_QUERY,
+                values={"owner": requesting_user.id, "limit": limit},
+            )
+        else:
+            cleaning_records = await self.db.fetch_all(
+                query=LIST_USER_CLEANINGS_NEXT_PAGE_QUERY,
+                values={
+                    "owner": requesting_user.id,
+                    "after_id": after_id,
+                    "limit": limit,
+                },
+            )
+
+        return [CleaningInDB.from_record(l) for l in cleaning_records]
+
+    async def iterate_all_user_cleanings(
+        self, *, requesting_user: UserInDB
+    ) -> AsyncGenerator[CleaningInDB, None]:
+        """
+        Rows are read through a server-side cursor (inside a transaction) and yielded
+        one by one, so memory stays flat no matter how many cleanings the user has.
+        """
+        async for record in self.db.iterate(
+            query=LIST_ALL_USER_CLEANINGS_QUERY, values={"owner": requesting_user.id}
+        ):
+            yield CleaningInDB.from_record(record)
 
     async def get_all_cleanings(self) -> List[CleaningInDB]:
         cleanings_records = await self.db.fetch_all(query=GET_ALL_CLEANINGS)
-        return [CleaningInDB(**cleaning) for cleaning in cleanings_records]
+        return [CleaningInDB.from_record(cleaning) for cleaning in cleanings_records]
 
     async def update_cleaning(
         self, *, id: int, cleaning_update: CleaningUpdate, requesting_user: UserInDB
     ) -> CleaningInDB:
-        cleaning = await self.get_cleaning_by_id(id=id, requesting_user=requesting_user)
+        record = await self.db.fetch_one(
+            query=UPDATE_CLEANING_BY_ID,
+            values={
+                **self.cleaning_update_values(cleaning_update=cleaning_update),
+                "id": id,
+                "owner": requesting_user.id,
+            },
+        )
 
-        if not cleaning:
+        if not record["found"]:
             return None
 
-        if cleaning.owner != requesting_user.id:
+        if record["id"] is None:
             raise HTTPException(
                 status_code=status.HTTP_403_FORBIDDEN,
                 detail="Users are only able to update cleanings that they created.",
             )
 
-        cleaning_update_params = cleaning.copy(
-            update=cleaning_update.dict(exclude_unset=True)
-        )  # By specifying exclude_unset=True, Pydantic will leave out any attributes that were not explicitly set when the model was created.
-        if cleaning_update_params.cleaning_type is None:
-            raise HTTPException(
-                status_code=status.HTTP_400_BAD_REQUEST,
-                detail="Invalid cleaning type. Cannot be None.",
-            )
-
-        updated_cleaning = await self.db.fetch_one(
-            query=UPDATE_CLEANING_BY_ID,
-            values={
-                **cleaning_update_params.dict(exclude={"created_at", "updated_at"}),
-                "owner": requesting_user.id,
-            },
-        )
-        return CleaningInDB(**updated_cleaning)
+        return CleaningInDB.from_record(record)
 
     async def delete_cleaning_by_id(self, id: int, requesting_user: UserInDB):
-        cleaning = await self.get_cleaning_by_id(id=id, requesting_user=requesting_user)
+        record = await self.db.fetch_one(
+            query=DELETE_CLEANING_BY_ID_QUERY,
+            values={"id": id, "owner": requesting_user.id},
+        )
 
-        if not cleaning:
+        if not record["found"]:
             return None
 
-        if cleaning.owner != requesting_user.id:
+        if record["deleted_id"] is None:
             raise HTTPException(
                 status_code=status.HTTP_403_FORBIDDEN,
                 detail="Users are only able to delete cleanings that they created.",
             )
 
-        deleted_id = await self.db.execute(
-            query=DELETE_CLEANING_BY_ID_QUERY,
-            values={"id": id, "owner": requesting_user.id},
+        return record["deleted_id"]
+
+    def cleaning_update_values(self, *, cleaning_update: CleaningUpdate) -> dict:
+        # these columns are NOT NULL, so an explicit None can't be written
+        update_data = cleaning_update.dict(exclude_unset=True)
+        for field in ("name", "price", "cleaning_type"):
+            if field in update_data and update_data[field] is None:
+                raise HTTPException(
+                    status_code=status.HTTP_400_BAD_REQUEST,
+                    detail=f"Invalid {field.replace('_', ' ')}. Cannot be None.",
+                )
+
+        return self.partial_update_values(
+            update=cleaning_update, fields=UPDATABLE_CLEANING_FIELDS
+        )
+
+    async def update_cleanings(
+        self,
+        *,
+        ids: List[int],
+        cleaning_update: CleaningUpdate,
+        requesting_user: UserInDB,
+    ) -> CleaningBulkUpdateResult:
+        records = await self.db.fetch_all(
+            query=BULK_UPDATE_CLEANINGS_QUERY,
+            values={
+                **self.cleaning_update_values(cleaning_update=cleaning_update),
+                "ids": ids,
+                "owner": requesting_user.id,
+            },
+        )
+
+        result = CleaningBulkUpdateResult(updated=[], not_found=[], forbidden=[])
+        for record in records:
+            if record["id"] is not None:
+                # requested_id and found are not model fields and are ignored
+                result.updated.append(CleaningInDB.from_record(record))
+            elif not record["found"]:
+                result.not_found.append(record["requested_id"])
+            else:
+                result.forbidden.append(record["requested_id"])
+        return result
+
+    async def delete_cleanings(
+        self, *, ids: List[int], requesting_user: UserInDB
+    ) -> CleaningBulkDeleteResult:
+        records = await self.db.fetch_all(
+            query=BULK_DELETE_CLEANINGS_QUERY,
+            values={"ids": ids, "owner": requesting_user.id},
         )
 
-        return deleted_id
+        result = CleaningBulkDeleteResult(deleted=[], not_found=[], forbidden=[])
+        for record in records:
+            if record["deleted"]:
+                result.deleted.append(record["requested_id"])
+            elif not record["found"]:
+                result.not_found.append(record["requested_id"])
+            else:
+                result.forbidden.append(record["requested_id"])
+        return result
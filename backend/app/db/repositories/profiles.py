@@ -1,13 +1,10 @@
+from datetime import datetime
+from typing import Optional
+
 from app.db.repositories.base import BaseRepository
-from app.models.profile import ProfileCreate, ProfileInDB, ProfileUpdate
+from app.models.profile import ProfileInDB, ProfileUpdate
 from app.models.user import UserInDB
-
-CREATE_PROFILE_FOR_USER_QUERY = """
-INSERT INTO profiles (full_name, phone_number, bio, image, user_id)
-VALUES( :full_name, :phone_number, :bio, :image, :user_id)
-RETURNING id, full_name, phone_number, bio, image, user_id, created_at, updated_at;
-"""
-
+from app.services import invalidate_user
 
 GET_USER_BY_ID_QUERY = """
 SELECT id, full_name, phone_number, bio, image, user_id, created_at, updated_at
@@ -32,31 +29,39 @@ FROM profiles p
 WHERE user_id = (SELECT id FROM users WHERE username = :username);
 """  # why not WHERE u.username = : username ?? to verify A: I know why the tutor does not spot it.
 
+# cheap version check for conditional GETs, see app/utils/conditional.py
+# (username and email can't be changed, so the profile row has the whole version)
+GET_PROFILE_UPDATED_AT_BY_USERNAME_QUERY = """
+SELECT p.updated_at
+FROM profiles p
+    INNER JOIN users u
+    ON p.user_id = u.id
+WHERE u.username = :username;
+"""
+
+# partial update in a single statement, see BaseRepository.partial_update_values
 UPDATE_PROFILE_QUERY = """
 UPDATE profiles
-SET full_name       = :full_name,
-    phone_number    = :phone_number,
-    bio             = :bio,
-    image           = :image
+SET full_name       = CASE WHEN CAST(:update_full_name AS BOOLEAN)
+                           THEN CAST(:full_name AS TEXT) ELSE full_name END,
+    phone_number    = CASE WHEN CAST(:update_phone_number AS BOOLEAN)
+                           THEN CAST(:phone_number AS TEXT) ELSE phone_number END,
+    bio             = CASE WHEN CAST(:update_bio AS BOOLEAN)
+                           THEN CAST(:bio AS TEXT) ELSE bio END,
+    image           = CASE WHEN CAST(:update_image AS BOOLEAN)
+                           THEN CAST(:image AS TEXT) ELSE image END
 WHERE user_id       = :user_id
 RETURNING id, full_name, phone_number, bio, image, user_id, created_at, updated_at;
 """
 
+UPDATABLE_PROFILE_FIELDS = ("full_name", "phone_number", "bio", "image")
+
 
 class ProfilesRepository(BaseRepository):
     """
     All database actions related to the profile
     """
 
-    async def create_profile_for_user(
-        self, *, profile_create: ProfileCreate
-    ) -> ProfileInDB:
-        created_profile = await self.db.fetch_one(
-            query=CREATE_PROFILE_FOR_USER_QUERY, values=profile_create.dict()
-        )
-
-        return created_profile  # should not be ProfileInDB?
-
     async def get_profile_by_user_id(self, *, user_id: int) -> ProfileInDB:
         profile_record = await self.db.fetch_one(
             query=GET_USER_BY_ID_QUERY, values={"user_id": user_id}
@@ -64,7 +69,7 @@ class ProfilesRepository(BaseRepository):
         if not profile_record:
             return None
 
-        return ProfileInDB(**profile_record)
+        return ProfileInDB.from_record(profile_record)
 
     async def get_profile_by_username(self, *, username: str) -> ProfileInDB:
         profile_record = await self.db.fetch_one(
@@ -73,17 +78,26 @@ class ProfilesRepository(BaseRepository):
         if not profile_record:
             return None
 
-        return ProfileInDB(**profile_record)
+        return ProfileInDB.from_record(profile_record)
+
+    async def get_profile_updated_at(self, *, username: str) -> Optional[datetime]:
+        # fetch_one, see CleaningsRepository.get_cleaning_updated_at
+        record = await self.db.fetch_one(
+            query=GET_PROFILE_UPDATED_AT_BY_USERNAME_QUERY, values={"username": username}
+        )
+        return record["updated_at"] if record else None
 
     async def update_current_user(
         self, *, profile_update: ProfileUpdate, requesting_user: UserInDB
     ) -> ProfileInDB:
-        profile = await self.get_profile_by_user_id(user_id=requesting_user.id)
-        update_params = profile.copy(update=profile_update.dict(exclude_unset=True))
+        values = self.partial_update_values(
+            update=profile_update, fields=UPDATABLE_PROFILE_FIELDS
+        )
+        if values["image"] is not None:
+            values["image"] = str(values["image"])  # HttpUrl
         update_profile = await self.db.fetch_one(
-            query=UPDATE_PROFILE_QUERY,
-            values=update_params.dict(
-                exclude={"id", "created_at", "updated_at", "username", "email"}
-            ),
+            query=UPDATE_PROFILE_QUERY, values={**values, "user_id": requesting_user.id}
         )
-        return ProfileInDB(**update_profile)
+        # cached principals and profile responses embed the profile
+        invalidate_user(username=requesting_user.username)
+        return ProfileInDB.from_record(update_profile)
@@ -1,10 +1,10 @@
-from typing import Optional
+from typing import Mapping, Optional
 
 from app.db.repositories.base import BaseRepository
-from app.db.repositories.profiles import ProfilesRepository
-from app.models.profile import ProfileCreate, ProfilePublic
+from app.models.profile import ProfilePublic
 from app.models.user import UserCreate, UserInDB, UserPublic, UserUpdate
 from app.services import auth_service
+from asyncpg.exceptions import UniqueViolationError
 from databases import Database
 from fastapi import HTTPException, status
 from pydantic import EmailStr
@@ -28,77 +28,149 @@ FROM users
 WHERE username = :username;
 """
 
+# LEFT JOIN so that users without a profile are still returned (profile columns are NULL).
+# Profile columns are aliased with a "profile_" prefix to avoid clashing with the user ones.
+GET_USER_WITH_PROFILE_BY_EMAIL_QUERY = """
+SELECT  u.id, u.username, u.email, u.email_verified, u.is_active, u.is_superuser,
+        u.created_at, u.updated_at,
+        p.id            AS profile_id,
+        p.full_name     AS profile_full_name,
+        p.phone_number  AS profile_phone_number,
+        p.bio           AS profile_bio,
+        p.image         AS profile_image,
+        p.user_id       AS profile_user_id,
+        p.created_at    AS profile_created_at,
+        p.updated_at    AS profile_updated_at
+FROM users u
+    LEFT JOIN profiles p
+    ON p.user_id = u.id
+WHERE u.email = :email;
+"""
+
+GET_USER_WITH_PROFILE_BY_USER_NAME_QUERY = """
+SELECT  u.id, u.username, u.email, u.email_verified, u.is_active, u.is_superuser,
+        u.created_at, u.updated_at,
+        p.id            AS profile_id,
+        p.full_name     AS profile_full_name,
+        p.phone_number  AS profile_phone_number,
+        p.bio           AS profile_bio,
+        p.image         AS profile_image,
+        p.user_id       AS profile_user_id,
+        p.created_at    AS profile_created_at,
+        p.updated_at    AS profile_updated_at
+FROM users u
+    LEFT JOIN profiles p
+    ON p.user_id = u.id
+WHERE u.username = :username;
+"""
+
+PROFILE_COLUMNS = (
+    "id",
+    "full_name",
+    "phone_number",
+    "bio",
+    "image",
+    "user_id",
+    "created_at",
+    "updated_at",
+)
+
+# User and profile are inserted by one statement, so either both exist or neither does.
+# Taken emails/usernames are reported by the unique indexes on users (see
+# UNIQUE_VIOLATION_DETAILS) instead of being looked up before the insert.
 REGISTER_NEW_USER_QUERY = """
-INSERT INTO users (username, email, password, salt)
-VALUES(:username, :email, :password, :salt)
-RETURNING id, username, email, email_verified, password, salt, is_active, is_superuser, created_at, updated_at;
+WITH new_user AS (
+    INSERT INTO users (username, email, password, salt)
+    VALUES(:username, :email, :password, :salt)
+    RETURNING id, username, email, email_verified, is_active, is_superuser, created_at, updated_at
+), new_profile AS (
+    INSERT INTO profiles (user_id)
+    SELECT id FROM new_user
+    RETURNING id, full_name, phone_number, bio, image, user_id, created_at, updated_at
+)
+SELECT  u.id, u.username, u.email, u.email_verified, u.is_active, u.is_superuser,
+        u.created_at, u.updated_at,
+        p.id            AS profile_id,
+        p.full_name     AS profile_full_name,
+        p.phone_number  AS profile_phone_number,
+        p.bio           AS profile_bio,
+        p.image         AS profile_image,
+        p.user_id       AS profile_user_id,
+        p.created_at    AS profile_created_at,
+        p.updated_at    AS profile_updated_at
+FROM new_user u
+    INNER JOIN new_profile p
+    ON p.user_id = u.id;
 """
 
+UNIQUE_VIOLATION_DETAILS = {
+    "ix_users_email": (
+        "That email is already taken. Login with that email or register with another one."
+    ),
+    "ix_users_username": "That user_name is already taken. Please try another one.",
+}
+
 
 class UsersRepository(BaseRepository):
     def __init__(self, db: Database) -> None:
         super().__init__(db)
         self.auth_service = auth_service
-        self.profiles_repo = ProfilesRepository(db)
 
     async def get_user_by_email(
         self, *, email: EmailStr, populate: bool = True
     ) -> UserInDB:
+        if populate:
+            # user and profile are loaded together in a single round trip
+            user_record = await self.db.fetch_one(
+                query=GET_USER_WITH_PROFILE_BY_EMAIL_QUERY, values={"email": email}
+            )
+            if user_record:
+                return self.build_user_with_profile(record=user_record)
+            return None
+
         user_record = await self.db.fetch_one(
             query=GET_USER_BY_EMAIL_QUERY, values={"email": email}
         )
-
         if user_record:
-            user = UserInDB(**user_record)
-
-            if populate:
-                return await self.populate_user(user=user)
-
-            return user
+            return UserInDB.from_record(user_record)
 
     async def get_user_by_user_name(
         self, *, username: str, populate: bool = True
     ) -> UserInDB:
+        if populate:
+            user_record = await self.db.fetch_one(
+                query=GET_USER_WITH_PROFILE_BY_USER_NAME_QUERY,
+                values={"username": username},
+            )
+            if user_record:
+                return self.build_user_with_profile(record=user_record)
+            return None
+
         user_record = await self.db.fetch_one(
             query=GET_USER_BY_USER_NAME_QUERY, values={"username": username}
         )
         if user_record:
-            user = UserInDB(**user_record)
-
-            if populate:
-                return await self.populate_user(user=user)
-
-            return user
+            return UserInDB.from_record(user_record)
 
     async def register_new_user(self, *, new_user: UserCreate) -> UserInDB:
-        # make sure email isn't already taken
-        if await self.get_user_by_email(email=new_user.email):
-            raise HTTPException(
-                status_code=status.HTTP_400_BAD_REQUEST,
-                detail="That email is already taken. Login with that email or register with another one.",
-            )
-
-        # make sure username isn't already taken
-        if await self.get_user_by_user_name(username=new_user.username):
-            raise HTTPException(
-                status_code=status.HTTP_400_BAD_REQUEST,
-                detail="That user_name is already taken. Please try another one.",
+        user_password_update = (
+            await self.auth_service.create_salt_and_hashed_password_async(
+                plaintext_password=new_user.password
             )
-
-        user_password_update = self.auth_service.create_salt_and_hashed_password(
-            plaintext_password=new_user.password
         )
         new_user_params = new_user.copy(update=user_password_update.dict())
-        created_user = await self.db.fetch_one(
-            query=REGISTER_NEW_USER_QUERY, values=new_user_params.dict()
-        )
-
-        # create profile for new user
-        await self.profiles_repo.create_profile_for_user(
-            profile_create=ProfileCreate(user_id=created_user["id"])
-        )
+        try:
+            created_user = await self.db.fetch_one(
+                query=REGISTER_NEW_USER_QUERY, values=new_user_params.dict()
+            )
+        except UniqueViolationError as e:
+            # make sure email and username aren't already taken
+            detail = UNIQUE_VIOLATION_DETAILS.get(e.constraint_name)
+            if detail is None:
+                raise e
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=detail)
 
-        return await self.populate_user(user=UserInDB(**created_user))
+        return self.build_user_with_profile(record=created_user)
 
     async def authenticate_user(
         self, *, email: EmailStr, password: str
@@ -107,17 +179,24 @@ class UsersRepository(BaseRepository):
         if not user:
             return None
 
-        if not self.auth_service.verify_password(
+        if not await self.auth_service.verify_password_async(
             password=password, salt=user.salt, hashed_pw=user.password
         ):
             return None
         return user
 
-    async def populate_user(self, *, user: UserInDB) -> UserInDB:
-        return UserPublic(
-            # unpack the user in db dict into the user public model
-            # which will remove 'password' and 'salt'
-            **user.dict(),
-            # fetch the user's profile from the profiels repo
-            profile=await self.profiles_repo.get_profile_by_user_id(user_id=user.id),
-        )
+    def build_user_with_profile(self, *, record: Mapping) -> UserPublic:
+        """
+        Build UserPublic with its nested ProfilePublic from a single
+        users LEFT JOIN profiles row (see GET_USER_WITH_PROFILE_BY_*_QUERY).
+        """
+        profile = None
+        if record["profile_id"] is not None:
+            profile = ProfilePublic.from_record(
+                {column: record[f"profile_{column}"] for column in PROFILE_COLUMNS}
+            )
+
+        # the profile_* columns are not fields of UserPublic, from_record skips them
+        user = UserPublic.from_record(record)
+        user.profile = profile
+        return user
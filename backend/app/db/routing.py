@@ -0,0 +1,129 @@
+import itertools
+import re
+import time
+from collections import OrderedDict
+from typing import Any, AsyncGenerator, List, Mapping, Optional
+
+from app.core import config
+from app.db.fast_path import fast_path_for
+from databases import Database
+
+# statements that change data, anything else starting with SELECT/WITH is a read
+WRITE_STATEMENT = re.compile(r"\b(INSERT|UPDATE|DELETE)\b", re.IGNORECASE)
+
+
+def is_read_query(query: str) -> bool:
+    return query.lstrip().upper().startswith(
+        ("SELECT", "WITH")
+    ) and not WRITE_STATEMENT.search(query)
+
+
+class ReplicaRouter:
+    """
+    Sends read queries to the read replicas (round robin) and everything else to the
+    primary. After a client writes, its reads stick to the primary for
+    `sticky_window` seconds so it always sees its own writes despite replication lag.
+
+    Clients are identified by a key (the Authorization header), the last write of each
+    one is remembered in process, so the stickiness is per worker.
+    """
+
+    def __init__(
+        self,
+        *,
+        primary: Database,
+        replicas: List[Database],
+        sticky_window: float,
+        max_tracked_clients: int = 10000,
+    ) -> None:
+        self.primary = primary
+        self.replicas = replicas
+        self.sticky_window = sticky_window
+        self.max_tracked_clients = max_tracked_clients
+        self._replica_cycle = itertools.cycle(replicas)
+        self._last_writes: "OrderedDict[str, float]" = OrderedDict()
+
+        self.replica_reads = 0
+        self.primary_reads = 0
+        self.writes = 0
+
+    def for_request(self, key: Optional[str]) -> "RoutedDatabase":
+        return RoutedDatabase(router=self, key=key)
+
+    def mark_write(self, key: Optional[str]) -> None:
+        self.writes += 1
+        if key is None:
+            return
+        self._last_writes[key] = time.monotonic()
+        self._last_writes.move_to_end(key)
+        while len(self._last_writes) > self.max_tracked_clients:
+            self._last_writes.popitem(last=False)
+
+    def is_sticky(self, key: Optional[str]) -> bool:
+        if key is None or key not in self._last_writes:
+            return False
+        if time.monotonic() - self._last_writes[key] < self.sticky_window:
+            return True
+        del self._last_writes[key]
+        return False
+
+    def database_for_read(self, key: Optional[str]) -> Database:
+        if not self.replicas or self.is_sticky(key):
+            self.primary_reads += 1
+            return self.primary
+        self.replica_reads += 1
+        return next(self._replica_cycle)
+
+
+class RoutedDatabase:
+    """
+    Stand-in for `databases.Database` handed to the repositories by get_repository.
+    Once a transaction is started everything goes to the primary.
+    """
+
+    def __init__(self, *, router: ReplicaRouter, key: Optional[str]) -> None:
+        self.router = router
+        self.key = key
+        self._pinned_to_primary = False
+
+    def _pick(self, query: str) -> Any:
+        if not self._pinned_to_primary and is_read_query(query):
+            database = self.router.database_for_read(self.key)
+        else:
+            self.router.mark_write(self.key)
+            database = self.router.primary
+        return fast_path_for(database) if config.DB_FAST_PATH else database
+
+    async def fetch_all(self, query: str, values: Optional[dict] = None) -> List[Mapping]:
+        return await self._pick(query).fetch_all(query=query, values=values)
+
+    async def fetch_one(
+        self, query: str, values: Optional[dict] = None
+    ) -> Optional[Mapping]:
+        return await self._pick(query).fetch_one(query=query, values=values)
+
+    async def fetch_val(
+        self, query: str, values: Optional[dict] = None, column: Any = 0
+    ) -> Any:
+        return await self._pick(query).fetch_val(
+            query=query, values=values, column=column
+        )
+
+    async def execute(self, query: str, values: Optional[dict] = None) -> Any:
+        return await self._pick(query).execute(query=query, values=values)
+
+    async def execute_many(self, query: str, values: list) -> None:
+        return await self._pick(query).execute_many(query=query, values=values)
+
+    async def iterate(
+        self, query: str, values: Optional[dict] = None
+    ) -> AsyncGenerator[Mapping, None]:
+        async for record in self._pick(query).iterate(query=query, values=values):
+            yield record
+
+    def transaction(self, *, force_rollback: bool = False) -> Any:
+        self._pinned_to_primary = True
+        primary = self.router.primary
+        if config.DB_FAST_PATH:
+            primary = fast_path_for(primary)
+        return primary.transaction(force_rollback=force_rollback)
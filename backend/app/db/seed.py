@@ -0,0 +1,281 @@
+"""
+Seed the database with users, profiles and cleanings at production-like volumes.
+
+The rows follow skewed, realistic distributions rather than one cleaning per user:
+a few owners post most of the cleanings (zipf-like, --skew), most users post none
+(--owner-share), cleaning types are uneven and prices depend on the type. They are
+bulk-loaded with COPY, in one transaction, into the database configured in .env /
+environment (migrations must be applied):
+
+    python -m app.db.seed --users 100000 --cleanings 1000000
+
+Every seeded user logs in with --password, which is hashed once (bcrypt is far too
+slow to hash per user). Usernames start with --prefix, a random one by default so
+seeding can be repeated.
+"""
+import argparse
+import asyncio
+import bisect
+import itertools
+import math
+import random
+import time
+import uuid
+from datetime import datetime, timedelta, timezone
+from decimal import Decimal
+from typing import Any, Dict, Iterable, Iterator, List, Sequence, Tuple
+
+import asyncpg
+from app.core.config import DATABASE_URL
+from app.services import auth_service
+
+USER_COLUMNS = ("id", "username", "email", "salt", "password", "created_at", "updated_at")
+PROFILE_COLUMNS = ("user_id", "full_name", "phone_number", "bio", "image", "created_at")
+CLEANING_COLUMNS = (
+    "name",
+    "description",
+    "cleaning_type",
+    "price",
+    "owner",
+    "created_at",
+    "updated_at",
+)
+
+# cleaning_type -> (share of the cleanings, median price)
+CLEANING_TYPES = {
+    "dust_up": (0.5, 35),
+    "spot_clean": (0.35, 70),
+    "full_clean": (0.15, 180),
+}
+TYPE_CUM_WEIGHTS = list(itertools.accumulate(s for s, _ in CLEANING_TYPES.values()))
+PRICE_SPREAD = 0.45  # sigma of the log-normal prices
+
+FIRST_NAMES = (
+    "Ada",
+    "Ben",
+    "Chloe",
+    "Dan",
+    "Eva",
+    "Finn",
+    "Grace",
+    "Hugo",
+    "Ivy",
+    "Jack",
+)
+LAST_NAMES = ("Smith", "Jones", "Brown", "Taylor", "Wilson", "Evans", "Clark", "Moore")
+ROOMS = ("kitchen", "bathroom", "living room", "garage", "office", "apartment", "house")
+
+
+def owner_weights(owners: int, skew: float) -> List[float]:
+    """
+    Cumulative weights of the owners, the one of rank r posts ~ 1 / r**skew cleanings.
+    """
+    return list(itertools.accumulate(1 / (rank**skew) for rank in range(1, owners + 1)))
+
+
+def pick_owners(
+    rng: random.Random, owner_ids: Sequence[int], skew: float, count: int
+) -> Iterator[int]:
+    cum_weights = owner_weights(len(owner_ids), skew)
+    total = cum_weights[-1]
+    for _ in range(count):
+        yield owner_ids[bisect.bisect(cum_weights, rng.random() * total)]
+
+
+def seed_date(rng: random.Random, after: datetime, now: datetime) -> datetime:
+    return after + (now - after) * rng.random()
+
+
+def user_rows(
+    ids: Sequence[int],
+    created_at: Sequence[datetime],
+    prefix: str,
+    password: Tuple[str, str],
+) -> Iterator[Tuple[Any, ...]]:
+    salt, hashed_password = password
+    for id, created in zip(ids, created_at):
+        username = f"{prefix}{id}"
+        yield id, username, f"{username}@example.com", salt, hashed_password, created, created
+
+
+def profile_rows(
+    rng: random.Random, users: Iterable[Tuple[int, datetime]]
+) -> Iterator[Tuple[Any, ...]]:
+    # most profiles are left (partly) empty, like the ones created at registration
+    for user_id, created_at in users:
+        full_name = (
+            f"{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)}"
+            if rng.random() < 0.7
+            else None
+        )
+        phone_number = f"555-{rng.randrange(10000):04d}" if rng.random() < 0.4 else None
+        bio = "Happy to help with any cleaning." if rng.random() < 0.3 else ""
+        image = (
+            f"https://example.com/avatars/{user_id}.png" if rng.random() < 0.2 else None
+        )
+        yield user_id, full_name, phone_number, bio, image, created_at
+
+
+def cleaning_row(
+    rng: random.Random, owner: int, owner_created_at: datetime, now: datetime
+) -> Tuple[Any, ...]:
+    cleaning_type = rng.choices(list(CLEANING_TYPES), cum_weights=TYPE_CUM_WEIGHTS)[0]
+    median_price = CLEANING_TYPES[cleaning_type][1]
+    price = Decimal(f"{rng.lognormvariate(math.log(median_price), PRICE_SPREAD):.2f}")
+    room = rng.choice(ROOMS)
+    description = (
+        f"{cleaning_type.replace('_', ' ')} of my {room}" if rng.random() < 0.6 else None
+    )
+    created_at = seed_date(rng, owner_created_at, now)
+    updated_at = seed_date(rng, created_at, now) if rng.random() < 0.2 else created_at
+    return (
+        f"Clean my {room}",
+        description,
+        cleaning_type,
+        price,
+        owner,
+        created_at,
+        updated_at,
+    )
+
+
+def batches(
+    rows: Iterable[Tuple[Any, ...]], size: int
+) -> Iterator[List[Tuple[Any, ...]]]:
+    rows = iter(rows)
+    while True:
+        batch = list(itertools.islice(rows, size))
+        if not batch:
+            return
+        yield batch
+
+
+async def copy_rows(
+    connection: asyncpg.Connection,
+    table: str,
+    columns: Sequence[str],
+    rows: Iterable[Tuple[Any, ...]],
+    batch_size: int,
+) -> None:
+    for batch in batches(rows, batch_size):
+        await connection.copy_records_to_table(table, records=batch, columns=columns)
+
+
+async def seed(
+    connection: asyncpg.Connection,
+    *,
+    users: int,
+    cleanings: int,
+    prefix: str,
+    password: Tuple[str, str],
+    owner_share: float = 0.3,
+    skew: float = 0.8,
+    days: int = 365,
+    random_seed: Any = None,
+    batch_size: int = 50_000,
+) -> Dict[str, int]:
+    """
+    COPY `users` users (each with a profile) and `cleanings` cleanings owned by
+    `owner_share` of them. `password` is the (salt, hashed password) of every user.
+    Runs in the caller's transaction, if any.
+    """
+    rng = random.Random(random_seed)
+    now = datetime.now(timezone.utc)
+    # ids are taken from the sequence up front, so cleanings and profiles can refer
+    # to the users without reading them back
+    ids = [
+        record[0]
+        for record in await connection.fetch(
+            "SELECT nextval(pg_get_serial_sequence('users', 'id')) FROM generate_series(1, $1)",
+            users,
+        )
+    ]
+    first = now - timedelta(days=days)
+    created_at = [seed_date(rng, first, now) for _ in ids]
+    await copy_rows(
+        connection,
+        "users",
+        USER_COLUMNS,
+        user_rows(ids, created_at, prefix, password),
+        batch_size,
+    )
+    await copy_rows(
+        connection,
+        "profiles",
+        PROFILE_COLUMNS,
+        profile_rows(rng, zip(ids, created_at)),
+        batch_size,
+    )
+    joined = dict(zip(ids, created_at))
+
+    owner_ids = rng.sample(ids, max(1, round(users * owner_share))) if ids else []
+    owners = pick_owners(rng, owner_ids, skew, cleanings if owner_ids else 0)
+    cleaning_rows = (cleaning_row(rng, owner, joined[owner], now) for owner in owners)
+    await copy_rows(connection, "cleanings", CLEANING_COLUMNS, cleaning_rows, batch_size)
+
+    for table in ("users", "profiles", "cleanings"):
+        await connection.execute(f"ANALYZE {table}")
+    return {"users": users, "profiles": users, "cleanings": cleanings if owner_ids else 0}
+
+
+async def main(args: argparse.Namespace) -> None:
+    hashed = auth_service.create_salt_and_hashed_password(
+        plaintext_password=args.password
+    )
+    connection = await asyncpg.connect(str(DATABASE_URL))
+    try:
+        start = time.perf_counter()
+        async with connection.transaction():
+            counts = await seed(
+                connection,
+                users=args.users,
+                cleanings=args.cleanings,
+                prefix=args.prefix,
+                password=(hashed.salt, hashed.password),
+                owner_share=args.owner_share,
+                skew=args.skew,
+                days=args.days,
+                random_seed=args.seed,
+                batch_size=args.batch_size,
+            )
+        elapsed = time.perf_counter() - start
+    finally:
+        await connection.close()
+
+    rows = sum(counts.values())
+    print(", ".join(f"{count} {table}" for table, count in counts.items()))
+    print(f"{rows} rows in {elapsed:.1f} s ({rows / elapsed:,.0f} rows/s)")
+    print(
+        f"usernames {args.prefix}<id>, emails <username>@example.com, password {args.password!r}"
+    )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument(
+        "--users", type=int, default=10_000, help="users, one profile each"
+    )
+    parser.add_argument(
+        "--cleanings", type=int, default=100_000, help="cleanings in total"
+    )
+    parser.add_argument(
+        "--owner-share",
+        type=float,
+        default=0.3,
+        help="share of the users owning cleanings",
+    )
+    parser.add_argument(
+        "--skew", type=float, default=0.8, help="zipf exponent of cleanings per owner"
+    )
+    parser.add_argument(
+        "--days", type=int, default=365, help="history spanned by created_at"
+    )
+    parser.add_argument(
+        "--prefix", default=f"seed_{uuid.uuid4().hex[:6]}_", help="start of the usernames"
+    )
+    parser.add_argument(
+        "--password", default="seed-password", help="password of every user"
+    )
+    parser.add_argument("--seed", type=int, help="random seed, for repeatable data")
+    parser.add_argument("--batch-size", type=int, default=50_000, help="rows per COPY")
+    asyncio.run(main(parser.parse_args()))
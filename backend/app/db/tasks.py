@@ -1,7 +1,19 @@
 import logging
 import os
+from typing import List
 
-from app.core.config import DATABASE_URL
+from app.core.config import (
+    DATABASE_REPLICA_URLS,
+    DATABASE_URL,
+    DB_POOL_ACQUIRE_TIMEOUT,
+    DB_POOL_IDLE_TIMEOUT,
+    DB_POOL_MAX_LIFETIME,
+    DB_POOL_MAX_SIZE,
+    DB_POOL_MIN_SIZE,
+    READ_YOUR_WRITES_SECONDS,
+)
+from app.db.pool import install_instrumented_pool
+from app.db.routing import ReplicaRouter
 from databases import (
     Database,  # to establish connection to postgresql with the db url string in config.py
 )
@@ -10,24 +22,72 @@ from fastapi import FastAPI
 logger = logging.getLogger(__name__)
 
 
+async def create_database(url: str) -> Database:
+    database = Database(
+        url,
+        min_size=DB_POOL_MIN_SIZE,
+        max_size=DB_POOL_MAX_SIZE,
+        max_inactive_connection_lifetime=DB_POOL_IDLE_TIMEOUT,
+    )  # minimum and maximum number of connections at given time
+
+    await database.connect()
+    install_instrumented_pool(
+        database,
+        acquire_timeout=DB_POOL_ACQUIRE_TIMEOUT,
+        max_lifetime=DB_POOL_MAX_LIFETIME,
+    )
+    return database
+
+
+async def connect_to_replicas(urls: List[str]) -> List[Database]:
+    """
+    All of the replicas or none, the ones already connected are disconnected again
+    when one of them fails.
+    """
+    replicas: List[Database] = []
+    try:
+        for url in urls:
+            replicas.append(await create_database(url))
+    except Exception:
+        for replica in replicas:
+            await replica.disconnect()
+        raise
+    return replicas
+
+
 async def connect_to_db(app: FastAPI) -> None:
     DB_URL = f"{DATABASE_URL}_test" if os.environ.get("TESTING") else DATABASE_URL
-    database = Database(
-        DB_URL, min_size=2, max_size=10
-    )  # minimum and maximum number of connections at given time, can be also added to config.py
 
     try:
-        await database.connect()
-        app.state._db = database
+        app.state._db = await create_database(str(DB_URL))
     except Exception as e:
         logger.warning("--- DB CONNECTION ERROR ----")
         logger.warning(e)
         logger.warning("--- DB CONNECTION ERROR ----")
+        return
+
+    # replicas are not used by the test suite, it works against a single test database
+    if DATABASE_REPLICA_URLS and not os.environ.get("TESTING"):
+        try:
+            replicas = await connect_to_replicas(DATABASE_REPLICA_URLS)
+        except Exception as e:
+            logger.warning("--- DB REPLICA CONNECTION ERROR, READING FROM PRIMARY ----")
+            logger.warning(e)
+            return
+        app.state._db_router = ReplicaRouter(
+            primary=app.state._db,
+            replicas=replicas,
+            sticky_window=READ_YOUR_WRITES_SECONDS,
+        )
 
 
 async def close_db_connection(app: FastAPI) -> None:
     try:
         await app.state._db.disconnect()
+        router = getattr(app.state, "_db_router", None)
+        if router is not None:
+            for replica in router.replicas:
+                await replica.disconnect()
     except Exception as e:
         logger.warning("--- DB DISCONNECT ERROR ---")
         logger.warning(e)
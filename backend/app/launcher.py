@@ -0,0 +1,197 @@
+"""
+Production launcher: uvicorn with one worker process per cpu, uvloop and httptools.
+
+    python -m app.launcher --port 8000
+
+On top of `uvicorn --workers`:
+- the db pool of each worker is sized so that all of them together stay within
+  DB_CONNECTION_BUDGET connections (per database),
+- workers are replaced after WORKER_MAX_REQUESTS requests (plus jitter) and when
+  they crash - uvicorn's own supervisor never starts a worker again,
+- the workers share a METRICS_MULTIPROCESS_DIR (a temporary one unless configured),
+  emptied at start, so /metrics adds all of them up,
+- SIGTERM to the launcher (docker stop) shuts every worker down gracefully.
+
+The rest of the settings come from .env / environment like for the app itself.
+"""
+import argparse
+import functools
+import glob
+import logging
+import os
+import random
+import shutil
+import signal
+import tempfile
+from typing import Any, Callable, List, Optional
+
+from app.core import config
+from app.services.metrics import MetricsDirectory
+from uvicorn.config import Config
+from uvicorn.main import Server
+from uvicorn.subprocess import get_subprocess
+from uvicorn.supervisors import Multiprocess
+
+logger = logging.getLogger("uvicorn.error")
+
+APP = "app.api.server:app"
+
+
+def worker_count(configured: int) -> int:
+    if configured > 0:
+        return configured
+    try:
+        return len(os.sched_getaffinity(0))  # cpus this process may run on
+    except AttributeError:
+        return os.cpu_count() or 1
+
+
+def pool_size_per_worker(budget: int, workers: int, default: int) -> int:
+    if not budget:
+        return default
+    if budget < workers:
+        logger.warning(
+            "DB_CONNECTION_BUDGET %s is smaller than the %s workers, they need at "
+            "least one connection each",
+            budget,
+            workers,
+        )
+    return max(1, budget // workers)
+
+
+def prepare_metrics_directory(path: str) -> str:
+    """
+    The (emptied) directory for the metrics of the workers, a new temporary one
+    when no path is configured.
+    """
+    if not path:
+        return tempfile.mkdtemp(prefix="phresh-metrics-")
+    os.makedirs(path, exist_ok=True)
+    # the workers of an earlier run would be added to the totals forever
+    for filename in glob.glob(os.path.join(path, "*.json*")):
+        os.remove(filename)
+    return path
+
+
+class WorkerServer(Server):
+    async def shutdown(self, sockets: Optional[List[Any]] = None) -> None:
+        # uvicorn 0.11 closes the sockets before the servers listening on them, which
+        # then fail to stop (so the app's shutdown never runs) - closing the servers
+        # closes the sockets too
+        await super().shutdown(sockets=None)
+
+
+def run_worker(
+    sockets: List[Any], *, config: Config, max_requests: int, jitter: int
+) -> None:
+    # out of the launcher's process group: ctrl+c reaches the launcher only, which
+    # then stops the workers once (a second signal would make uvicorn skip the
+    # graceful shutdown)
+    os.setpgrp()
+    if max_requests:
+        config.limit_max_requests = max_requests + random.randint(0, jitter)
+    WorkerServer(config=config).run(sockets=sockets)
+
+
+class Supervisor(Multiprocess):
+    """
+    uvicorn's Multiprocess, but a worker that exits is replaced until the launcher
+    itself is asked to stop (and its metrics are retired), and stopping forwards
+    SIGTERM to the workers.
+    """
+
+    check_interval = 1.0
+
+    def __init__(
+        self,
+        config: Config,
+        target: Callable[..., None],
+        sockets: List[Any],
+        metrics_directory: Optional[MetricsDirectory] = None,
+    ) -> None:
+        super().__init__(config, target=target, sockets=sockets)
+        self.metrics_directory = metrics_directory
+
+    def run(self) -> None:
+        self.startup()
+        while not self.should_exit.wait(self.check_interval):
+            self.replace_exited_workers()
+        self.shutdown()
+
+    def replace_exited_workers(self) -> None:
+        for i, process in enumerate(self.processes):
+            if process.is_alive():
+                continue
+            logger.info(
+                "Worker [%s] exited with code %s, starting a new one",
+                process.pid,
+                process.exitcode,
+            )
+            if self.metrics_directory is not None:
+                self.metrics_directory.retire(process.pid)
+            self.processes[i] = get_subprocess(
+                config=self.config, target=self.target, sockets=self.sockets
+            )
+            self.processes[i].start()
+
+    def shutdown(self) -> None:
+        for process in self.processes:
+            if process.is_alive():
+                os.kill(process.pid, signal.SIGTERM)
+        super().shutdown()
+
+
+def configure_workers(workers: int) -> Optional[MetricsDirectory]:
+    """
+    Settings the workers read from the environment when they import the app.
+    """
+    pool_size = pool_size_per_worker(
+        config.DB_CONNECTION_BUDGET, workers, config.DB_POOL_MAX_SIZE
+    )
+    os.environ["DB_POOL_MAX_SIZE"] = str(pool_size)
+    os.environ["DB_POOL_MIN_SIZE"] = str(min(config.DB_POOL_MIN_SIZE, pool_size))
+    logger.info("Starting %s workers, db pool of %s connections each", workers, pool_size)
+    if not config.METRICS_ENABLED:
+        return None
+    path = prepare_metrics_directory(config.METRICS_MULTIPROCESS_DIR)
+    os.environ["METRICS_MULTIPROCESS_DIR"] = path
+    return MetricsDirectory(path, interval=config.METRICS_WRITE_INTERVAL)
+
+
+def main(args: argparse.Namespace) -> None:
+    workers = worker_count(args.workers)
+    # uvicorn's Config sets up the logging, the workers only import the app later
+    uvicorn_config = Config(
+        APP,
+        host=args.host,
+        port=args.port,
+        workers=workers,
+        loop="uvloop",
+        http="httptools",
+    )
+    metrics_directory = configure_workers(workers)
+    target = functools.partial(
+        run_worker,
+        config=uvicorn_config,
+        max_requests=config.WORKER_MAX_REQUESTS,
+        jitter=config.WORKER_MAX_REQUESTS_JITTER,
+    )
+    sockets = [uvicorn_config.bind_socket()]
+    try:
+        Supervisor(uvicorn_config, target, sockets, metrics_directory).run()
+    finally:
+        if metrics_directory is not None and not config.METRICS_MULTIPROCESS_DIR:
+            shutil.rmtree(metrics_directory.path, ignore_errors=True)  # a temporary one
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--host", default="0.0.0.0", help="address to bind")
+    parser.add_argument("--port", type=int, default=8000, help="port to bind")
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=config.WEB_CONCURRENCY,
+        help="worker processes, one per cpu by default",
+    )
+    main(parser.parse_args())
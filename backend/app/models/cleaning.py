@@ -1,6 +1,9 @@
 # when creating the model instance will be set to None
 from enum import Enum
 from typing import (  # We use the Optional type declaration to specify that any attribute not passed in
+    Any,
+    Dict,
+    List,
     Optional,
     Union,
 )
@@ -71,8 +74,36 @@ class CleaningInDB(IDModelMixin, CleaningBase, DateTimeModelMixin):
     cleaning_type: CleaningType
     owner: int  # it's not Optional so it might have the big impact on whole app
 
+    __db_casts__ = {"price": float, "cleaning_type": CleaningType}
+
 
 class CleaningPublic(CleaningInDB):
     owner: Union[
         int, UserPublic
     ]  # it's not Optional so it might have the big impact on whole app
+
+
+class CleaningBulkItemError(CoreModel):
+    """
+    Why a single item of a bulk request was rejected, index is its position in the request
+    """
+
+    index: int
+    errors: List[Dict[str, Any]]
+
+
+class CleaningBulkCreateResult(CoreModel):
+    created: List[CleaningPublic]
+    errors: List[CleaningBulkItemError]
+
+
+class CleaningBulkUpdateResult(CoreModel):
+    updated: List[CleaningPublic]
+    not_found: List[int]
+    forbidden: List[int]
+
+
+class CleaningBulkDeleteResult(CoreModel):
+    deleted: List[int]
+    not_found: List[int]
+    forbidden: List[int]
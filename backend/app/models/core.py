@@ -1,15 +1,47 @@
 from datetime import datetime
-from typing import Optional
+from typing import Any, Callable, ClassVar, Dict, Mapping, Optional, Type, TypeVar
 
 from pydantic import BaseModel, validator
 
+Model = TypeVar("Model", bound="CoreModel")
+
 
 class CoreModel(BaseModel):
     """
     Any common logic to be shared by all models goes here
     """
 
-    pass
+    # conversions from_record applies to raw db values, e.g. NUMERIC -> float
+    __db_casts__: ClassVar[Dict[str, Callable[[Any], Any]]] = {}
+
+    @classmethod
+    def from_record(cls: Type[Model], record: Mapping) -> Model:
+        """
+        Trusted construction for rows coming from our own tables - the db already
+        enforces the types, so validation (and validators) are skipped, only the
+        columns that are fields of the model are kept and __db_casts__ applied.
+        Never use it for data coming from the client.
+        """
+        casts = cls.__db_casts__
+        # membership is checked on the keys - `name in record` raises ValueError
+        # instead of returning False on the Records of databases 0.3
+        columns = set(record.keys())
+        values = {}
+        fields_set = set()
+        for name, field in cls.__fields__.items():
+            if name in columns:
+                value = record[name]
+                if value is not None and name in casts:
+                    value = casts[name](value)
+                values[name] = value
+                fields_set.add(name)
+            else:
+                values[name] = field.default
+        # same as cls.construct(), minus the deepcopy of every default
+        model = cls.__new__(cls)
+        object.__setattr__(model, "__dict__", values)
+        object.__setattr__(model, "__fields_set__", fields_set)
+        return model
 
 
 class DateTimeModelMixin(BaseModel):
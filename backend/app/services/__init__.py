@@ -1,3 +1,32 @@
+from app.core.config import (
+    PRINCIPAL_CACHE_ENABLED,
+    PRINCIPAL_CACHE_MAX_SIZE,
+    PRINCIPAL_CACHE_TTL_SECONDS,
+    PROFILE_CACHE_ENABLED,
+    PROFILE_CACHE_MAX_SIZE,
+    PROFILE_CACHE_TTL_SECONDS,
+)
 from app.services.authentication import AuthService
+from app.services.principal_cache import PrincipalCache
+from app.services.profile_cache import ProfileResponseCache
 
 auth_service = AuthService()
+principal_cache = PrincipalCache(
+    ttl=PRINCIPAL_CACHE_TTL_SECONDS,
+    max_size=PRINCIPAL_CACHE_MAX_SIZE,
+    enabled=PRINCIPAL_CACHE_ENABLED,
+)
+profile_cache = ProfileResponseCache(
+    ttl=PROFILE_CACHE_TTL_SECONDS,
+    max_size=PROFILE_CACHE_MAX_SIZE,
+    enabled=PROFILE_CACHE_ENABLED,
+)
+
+
+def invalidate_user(*, username: str) -> None:
+    """
+    Drop everything cached about the user - call it from anything that changes
+    a user (username, email, ...) or its profile.
+    """
+    principal_cache.invalidate(username=username)
+    profile_cache.invalidate(username=username)
@@ -1,6 +1,8 @@
+import asyncio
 import logging
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta
-from typing import Optional, Type
+from typing import Any, Callable, Optional, Type
 
 import bcrypt
 import jwt
@@ -9,8 +11,10 @@ from app.core.config import (
     JWT_ALGORITHM,
     JWT_AUDIENCE,
     JWT_TOKEN_PREFIX,
+    PASSWORD_HASHING_WORKERS,
     SECRET_KEY,
 )
+from app.core.timing import timed
 from app.models.token import JWTCreds, JWTMeta, JWTPayload
 from app.models.user import UserBase, UserInDB, UserPasswordUpdate
 from fastapi import HTTPException, status
@@ -32,6 +36,56 @@ class AuthException(BaseException):
 
 
 class AuthService:
+    """
+    bcrypt is slow on purpose (tens of milliseconds per hash), so calling it directly from
+    an async route blocks the whole event loop. The *_async methods run it in a bounded
+    thread pool instead (bcrypt releases the GIL while hashing), so `max_workers` is also
+    the maximum number of hashes computed at once.
+    """
+
+    def __init__(self, *, max_workers: int = PASSWORD_HASHING_WORKERS) -> None:
+        self.max_workers = max_workers
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self.pending = 0  # hashes submitted to the pool and not finished yet
+
+    def _get_executor(self) -> ThreadPoolExecutor:
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(
+                max_workers=self.max_workers, thread_name_prefix="bcrypt"
+            )
+        return self._executor
+
+    async def _run_in_pool(self, func: Callable[..., Any], *args: Any) -> Any:
+        loop = asyncio.get_event_loop()
+        self.pending += 1
+        try:
+            with timed("auth"):
+                return await loop.run_in_executor(self._get_executor(), func, *args)
+        finally:
+            self.pending -= 1
+
+    def shutdown(self) -> None:
+        if self._executor is not None:
+            self._executor.shutdown(wait=True)
+            self._executor = None
+
+    async def create_salt_and_hashed_password_async(
+        self, *, plaintext_password: str
+    ) -> UserPasswordUpdate:
+        salt = self.generate_salt()
+        hashed_password = await self.hash_password_async(
+            password=plaintext_password, salt=salt
+        )
+        return UserPasswordUpdate(salt=salt, password=hashed_password)
+
+    async def hash_password_async(self, *, password: str, salt: str) -> str:
+        return await self._run_in_pool(pwd_context.hash, password + salt)
+
+    async def verify_password_async(
+        self, *, password: str, salt: str, hashed_pw: str
+    ) -> bool:
+        return await self._run_in_pool(pwd_context.verify, password + salt, hashed_pw)
+
     def create_salt_and_hashed_password(
         self, *, plaintext_password: str
     ) -> UserPasswordUpdate:
@@ -71,18 +125,23 @@ class AuthService:
         )
         # NOTE - previous versions of pyjwt ("<2.0") returned the token as bytes instead of a string.
         # That is no longer the case and the `.decode("utf-8")` has been removed.
-        access_token = jwt.encode(
-            token_payload.dict(), secret_key, algorithm=JWT_ALGORITHM
-        )
+        with timed("auth"):
+            access_token = jwt.encode(
+                token_payload.dict(), secret_key, algorithm=JWT_ALGORITHM
+            )
         return access_token
 
     def get_username_from_token(self, *, token: str, secret_key: str) -> Optional[str]:
         logger.info("services - get_username_from_token")
         try:
-            decoded_token = jwt.decode(
-                token, str(secret_key), audience=JWT_AUDIENCE, algorithms=[JWT_ALGORITHM]
-            )
-            payload = JWTPayload(**decoded_token)
+            with timed("auth"):
+                decoded_token = jwt.decode(
+                    token,
+                    str(secret_key),
+                    audience=JWT_AUDIENCE,
+                    algorithms=[JWT_ALGORITHM],
+                )
+                payload = JWTPayload(**decoded_token)
         except (jwt.PyJWTError, ValidationError):
             raise HTTPException(
                 status_code=status.HTTP_401_UNAUTHORIZED,
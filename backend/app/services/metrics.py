@@ -0,0 +1,300 @@
+import bisect
+import itertools
+import os
+import time
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+import orjson
+
+# upper bounds (in seconds) of the request latency histogram buckets
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+# Metric families are plain json-able dicts, so that the workers can hand them over
+# through files:
+#   {"type": "counter" | "gauge" | "histogram", "help": str,
+#    "buckets": [upper bounds] (histograms only),
+#    "samples": [[labels, value], ...]}
+# where a histogram value is {"buckets": [cumulative counts, +Inf last], "sum", "count"}.
+Family = Dict[str, Any]
+
+
+def family(
+    kind: str,
+    help_text: str,
+    samples: Iterable[Tuple[Dict[str, str], Any]],
+    buckets: Optional[Sequence[float]] = None,
+) -> Family:
+    result = {"type": kind, "help": help_text, "samples": [list(s) for s in samples]}
+    if buckets is not None:
+        result["buckets"] = list(buckets)
+    return result
+
+
+def histogram_value(bucket_counts: Sequence[int], total: float) -> Dict[str, Any]:
+    """
+    Per bucket counts (+Inf last) -> the cumulative form prometheus expects.
+    """
+    cumulative = list(itertools.accumulate(bucket_counts))
+    return {"buckets": cumulative, "sum": total, "count": cumulative[-1]}
+
+
+class RequestMetrics:
+    """
+    Request counters of one worker process, by route name, method and status code.
+    Only touched from the event loop, so there are no locks - recording a request
+    is a couple of dict lookups and a bisect.
+    """
+
+    def __init__(self, buckets: Sequence[float] = LATENCY_BUCKETS) -> None:
+        self.buckets = tuple(buckets)
+        self.in_flight = 0
+        self.requests: Dict[Tuple[str, str, int], int] = {}
+        # (route, method) -> [per bucket counts..., +Inf, sum of durations]
+        self.latency: Dict[Tuple[str, str], List[float]] = {}
+
+    def observe(self, route: str, method: str, status: int, seconds: float) -> None:
+        key = (route, method, status)
+        self.requests[key] = self.requests.get(key, 0) + 1
+        latency = self.latency.get((route, method))
+        if latency is None:
+            latency = self.latency[(route, method)] = [0] * (len(self.buckets) + 2)
+        latency[bisect.bisect_left(self.buckets, seconds)] += 1
+        latency[-1] += seconds
+
+    def collect(self) -> Dict[str, Family]:
+        return {
+            "http_requests_total": family(
+                "counter",
+                "Requests handled, by route name, method and status code.",
+                (
+                    ({"route": route, "method": method, "status": str(status)}, count)
+                    for (route, method, status), count in self.requests.items()
+                ),
+            ),
+            "http_request_duration_seconds": family(
+                "histogram",
+                "Time from receiving a request to sending the last byte of the response.",
+                (
+                    (
+                        {"route": route, "method": method},
+                        histogram_value(latency[:-1], latency[-1]),
+                    )
+                    for (route, method), latency in self.latency.items()
+                ),
+                buckets=self.buckets,
+            ),
+            "http_requests_in_flight": family(
+                "gauge", "Requests being handled right now.", [({}, self.in_flight)]
+            ),
+        }
+
+
+def pool_families(stats: Optional[Dict[str, Any]]) -> Dict[str, Family]:
+    """
+    Metric families from the statistics of an InstrumentedPool (get_pool_stats).
+    """
+    if stats is None:
+        return {}
+    families = {
+        f"db_pool_{name}": family("gauge", help_text, [({}, stats[name])])
+        for name, help_text in (
+            ("size", "Open connections."),
+            ("idle", "Open connections not in use."),
+            ("in_use", "Connections checked out of the pool."),
+            ("max_size", "Upper limit of open connections."),
+            ("waiters", "Requests waiting for a connection."),
+        )
+    }
+    families.update(
+        {
+            f"db_pool_{name}_total": family("counter", help_text, [({}, stats[name])])
+            for name, help_text in (
+                ("acquires", "Connections handed out."),
+                ("acquire_timeouts", "Acquires that gave up waiting."),
+                ("recycled", "Connections closed for reaching their maximum lifetime."),
+            )
+        }
+    )
+    wait = stats["acquire_wait_seconds"]
+    bounds = [float(bound) for bound in wait["buckets"] if bound != "+Inf"]
+    families["db_pool_acquire_wait_seconds"] = family(
+        "histogram",
+        "Time spent waiting for a connection.",
+        [({}, {**wait, "buckets": list(wait["buckets"].values())})],
+        buckets=bounds,
+    )
+    return families
+
+
+def add_values(left: Any, right: Any) -> Any:
+    if isinstance(left, dict):
+        return {
+            "buckets": [a + b for a, b in zip(left["buckets"], right["buckets"])],
+            "sum": left["sum"] + right["sum"],
+            "count": left["count"] + right["count"],
+        }
+    return left + right
+
+
+def merge_families(worker_families: Iterable[Dict[str, Family]]) -> Dict[str, Family]:
+    """
+    Add up the metrics of several workers sample by sample (same name and labels).
+    """
+    merged: Dict[str, Family] = {}
+    samples: Dict[str, Dict[Tuple, List]] = {}
+    for families in worker_families:
+        for name, metric in families.items():
+            if name not in merged:
+                merged[name] = {**metric, "samples": []}
+                samples[name] = {}
+            for labels, value in metric["samples"]:
+                key = tuple(sorted(labels.items()))
+                if key in samples[name]:
+                    sample = samples[name][key]
+                    sample[1] = add_values(sample[1], value)
+                else:
+                    samples[name][key] = [labels, value]
+                    merged[name]["samples"].append(samples[name][key])
+    return merged
+
+
+class MetricsDirectory:
+    """
+    With several uvicorn workers every process has its own counters and a scrape
+    reaches only one of them. So each worker writes its metrics to a file in a
+    shared directory (every `interval` seconds and when it stops) and /metrics adds
+    up all the files - the prometheus_client "multiprocess mode", without mmap.
+
+    Counters and histograms of workers that are gone are still included, so the
+    totals never go down; gauges only come from workers that wrote recently.
+    The launcher (app/launcher.py) folds the files of exited workers into one
+    (`retire`), so recycling workers doesn't pile up files to read on every scrape.
+    The directory should be emptied before the server starts.
+    """
+
+    retired_filename = "retired.json"
+
+    def __init__(self, path: str, *, interval: float) -> None:
+        self.path = path
+        self.interval = interval
+
+    def worker_filename(self, pid: int) -> str:
+        return os.path.join(self.path, f"metrics-{pid}.json")
+
+    def _load(self, filename: str) -> Optional[Dict[str, Any]]:
+        try:
+            with open(filename, "rb") as f:
+                return orjson.loads(f.read())
+        except FileNotFoundError:  # not written yet, or retired in the meantime
+            return None
+
+    def _save(self, filename: str, snapshot: Dict[str, Any]) -> None:
+        temporary = f"{filename}.tmp"
+        with open(temporary, "wb") as f:
+            f.write(orjson.dumps(snapshot))
+        os.replace(temporary, filename)  # readers never see half a file
+
+    def write(self, families: Dict[str, Family]) -> None:
+        snapshot = {"written_at": time.time(), "families": families}
+        self._save(self.worker_filename(os.getpid()), snapshot)
+
+    def read(self) -> Iterator[Dict[str, Family]]:
+        retired = self._load(os.path.join(self.path, self.retired_filename))
+        if retired:
+            yield retired["families"]
+        live_after = time.time() - 3 * self.interval
+        for entry in os.scandir(self.path):
+            if not entry.name.startswith("metrics-") or not entry.name.endswith(".json"):
+                continue
+            snapshot = self._load(entry.path)
+            if snapshot is None or self._is_retired(entry.path, snapshot, retired):
+                continue
+            yield {
+                name: metric
+                for name, metric in snapshot["families"].items()
+                if metric["type"] != "gauge" or snapshot["written_at"] >= live_after
+            }
+
+    def _is_retired(
+        self, filename: str, snapshot: Dict[str, Any], retired: Optional[Dict[str, Any]]
+    ) -> bool:
+        # a later file with the same pid is a new process
+        if not retired or filename != self.worker_filename(retired["last_pid"]):
+            return False
+        return snapshot["written_at"] <= retired["last_written_at"]
+
+    def retire(self, pid: int) -> None:
+        """
+        Add the counters and histograms of an exited worker to the retired ones and
+        remove its file.
+        """
+        filename = self.worker_filename(pid)
+        snapshot = self._load(filename)
+        if snapshot is None:  # it stopped before writing anything
+            return
+        retired_filename = os.path.join(self.path, self.retired_filename)
+        retired = self._load(retired_filename) or {"families": {}}
+        totals = {
+            name: metric
+            for name, metric in snapshot["families"].items()
+            if metric["type"] != "gauge"
+        }
+        retired["families"] = merge_families([retired["families"], totals])
+        # retired.json is written first, a scrape in between recognizes the worker's
+        # file as already added
+        retired["last_pid"] = pid
+        retired["last_written_at"] = snapshot["written_at"]
+        self._save(retired_filename, retired)
+        os.remove(filename)
+
+
+def escape_label(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def format_labels(labels: Dict[str, str], **extra: str) -> str:
+    pairs = [*labels.items(), *extra.items()]
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{key}="{escape_label(str(v))}"' for key, v in pairs) + "}"
+
+
+def render_sample(name: str, metric: Family, labels: Dict[str, str], value: Any) -> str:
+    if metric["type"] != "histogram":
+        return f"{name}{format_labels(labels)} {value}"
+    bounds = [*(repr(float(bound)) for bound in metric["buckets"]), "+Inf"]
+    lines = [
+        f"{name}_bucket{format_labels(labels, le=bound)} {count}"
+        for bound, count in zip(bounds, value["buckets"])
+    ]
+    lines.append(f"{name}_sum{format_labels(labels)} {value['sum']}")
+    lines.append(f"{name}_count{format_labels(labels)} {value['count']}")
+    return "\n".join(lines)
+
+
+def render(families: Dict[str, Family]) -> str:
+    """
+    Prometheus text exposition format (version 0.0.4).
+    """
+    lines = []
+    for name, metric in sorted(families.items()):
+        lines.append(f"# HELP {name} {metric['help']}")
+        lines.append(f"# TYPE {name} {metric['type']}")
+        lines.extend(
+            render_sample(name, metric, labels, value)
+            for labels, value in metric["samples"]
+        )
+    return "\n".join(lines) + "\n"
+
+
+def password_hashing_families(pending: int, workers: int) -> Dict[str, Family]:
+    return {
+        "password_hashing_pending": family(
+            "gauge",
+            "Password hashes submitted to the bcrypt pool, queued or running.",
+            [({}, pending)],
+        ),
+        "password_hashing_workers": family(
+            "gauge", "Threads of the bcrypt pool.", [({}, workers)]
+        ),
+    }
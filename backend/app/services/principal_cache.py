@@ -0,0 +1,32 @@
+from typing import Optional
+
+from app.models.user import UserPublic
+from app.services.ttl_cache import TTLCache
+
+
+class PrincipalCache(TTLCache[UserPublic]):
+    """
+    Cache of the users resolved from bearer tokens.
+    It's keyed by username (that's what we get out of the token) and it lets
+    get_user_from_token skip the database for tokens that are reused over and over.
+
+    Entries are shared between requests, so treat cached users as read only.
+    Anything that changes a user or its profile must call invalidate_user().
+    """
+
+    def __init__(self, *, ttl: float, max_size: int, enabled: bool = True) -> None:
+        super().__init__(name="principal", ttl=ttl, max_size=max_size, enabled=enabled)
+
+    def get(self, *, username: str) -> Optional[UserPublic]:
+        return self.lookup(username)
+
+    def generation(self, *, username: str) -> int:
+        return self.current_generation(username)
+
+    def set(
+        self, *, username: str, user: UserPublic, generation: Optional[int] = None
+    ) -> None:
+        self.store(username, user, generation)
+
+    def invalidate(self, *, username: str) -> None:
+        self.discard(username)
@@ -0,0 +1,35 @@
+from datetime import datetime
+from typing import NamedTuple, Optional
+
+from app.services.ttl_cache import TTLCache
+
+
+class CachedProfile(NamedTuple):
+    body: bytes  # the rendered ProfilePublic
+    etag: str
+    updated_at: datetime
+
+
+class ProfileResponseCache(TTLCache[CachedProfile]):
+    """
+    Rendered responses of profiles:get-profile-by-username keyed by username,
+    a hit skips both the database and the models.
+    Anything that changes a user or its profile must call invalidate_user().
+    """
+
+    def __init__(self, *, ttl: float, max_size: int, enabled: bool = True) -> None:
+        super().__init__(name="profile", ttl=ttl, max_size=max_size, enabled=enabled)
+
+    def get(self, *, username: str) -> Optional[CachedProfile]:
+        return self.lookup(username)
+
+    def generation(self, *, username: str) -> int:
+        return self.current_generation(username)
+
+    def set(
+        self, *, username: str, profile: CachedProfile, generation: Optional[int] = None
+    ) -> None:
+        self.store(username, profile, generation)
+
+    def invalidate(self, *, username: str) -> None:
+        self.discard(username)
@@ -0,0 +1,92 @@
+import logging
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Generic, Optional, Tuple, TypeVar
+
+logger = logging.getLogger(__name__)
+
+Value = TypeVar("Value")
+
+
+class TTLCache(Generic[Value]):
+    """
+    Small in-process LRU cache with TTL, bounded by max_size entries.
+    Each worker process has its own, so after a write the other workers only
+    catch up when their entry expires - keep the ttl short.
+
+    Fills race with invalidation: take current_generation(key) before reading the
+    db and pass it to store(), which then skips values read before a discard().
+    """
+
+    def __init__(
+        self, *, name: str, ttl: float, max_size: int, enabled: bool = True
+    ) -> None:
+        self.name = name
+        self.ttl = ttl
+        self.max_size = max_size
+        self.enabled = enabled and ttl > 0 and max_size > 0
+        self._entries: "OrderedDict[str, Tuple[float, Value]]" = OrderedDict()
+        # generation of every recently discarded key, older ones fall back to the floor
+        self._generations: "OrderedDict[str, int]" = OrderedDict()
+        self._generation_floor = 0
+        self._last_generation = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def lookup(self, key: str) -> Optional[Value]:
+        if not self.enabled:
+            return None
+
+        entry = self._entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+
+        expires_at, value = entry
+        if expires_at <= time.monotonic():
+            del self._entries[key]
+            self.misses += 1
+            return None
+
+        # mark as recently used
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return value
+
+    def current_generation(self, key: str) -> int:
+        return self._generations.get(key, self._generation_floor)
+
+    def store(self, key: str, value: Value, generation: Optional[int] = None) -> None:
+        if not self.enabled:
+            return
+        if generation is not None and generation != self.current_generation(key):
+            return  # discarded while the value was being read, it may be stale
+
+        self._entries[key] = (time.monotonic() + self.ttl, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def discard(self, key: str) -> None:
+        logger.info("%s cache - invalidate %s", self.name, key)
+        self._entries.pop(key, None)
+        self._last_generation += 1
+        self._generations[key] = self._last_generation
+        self._generations.move_to_end(key)
+        if len(self._generations) > self.max_size:
+            _, generation = self._generations.popitem(last=False)
+            self._generation_floor = max(self._generation_floor, generation)
+
+    def clear(self) -> None:
+        self._entries.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "size": len(self._entries),
+            "max_size": self.max_size,
+        }
@@ -0,0 +1,84 @@
+from datetime import datetime, timezone
+from email.utils import format_datetime, parsedate_to_datetime
+from typing import Optional
+
+from fastapi import Request, Response, status
+
+
+def make_etag(key: str, updated_at: datetime) -> str:
+    """
+    Weak validator of a resource version, updated_at is kept fresh by the
+    update_updated_at_column trigger of every table.
+    """
+    return f'W/"{key}-{updated_at.timestamp():.6f}"'
+
+
+def weak(etag: str) -> str:
+    return etag[2:] if etag.startswith("W/") else etag
+
+
+def http_date(value: datetime) -> str:
+    return format_datetime(value.astimezone(timezone.utc), usegmt=True)
+
+
+def etag_matches(if_none_match: str, etag: str) -> bool:
+    if if_none_match.strip() == "*":
+        return True
+    return any(
+        weak(candidate.strip()) == weak(etag) for candidate in if_none_match.split(",")
+    )
+
+
+def unmodified_since(if_modified_since: str, updated_at: datetime) -> bool:
+    try:
+        since = parsedate_to_datetime(if_modified_since)
+    except (TypeError, ValueError):
+        return False  # invalid dates are ignored
+    if since.tzinfo is None:
+        since = since.replace(tzinfo=timezone.utc)
+    # http dates only have a second resolution
+    return updated_at.replace(microsecond=0) <= since
+
+
+def is_not_modified(request: Request, etag: str, updated_at: datetime) -> bool:
+    """
+    RFC 7232 - If-None-Match (weak comparison) wins over If-Modified-Since.
+    """
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match is not None:
+        return etag_matches(if_none_match, etag)
+
+    if_modified_since = request.headers.get("if-modified-since")
+    if if_modified_since is not None:
+        return unmodified_since(if_modified_since, updated_at)
+
+    return False
+
+
+def has_conditional_headers(request: Request) -> bool:
+    return "if-none-match" in request.headers or "if-modified-since" in request.headers
+
+
+def set_validators(response: Response, etag: str, updated_at: datetime) -> None:
+    response.headers["ETag"] = etag
+    response.headers["Last-Modified"] = http_date(updated_at)
+
+
+def not_modified(etag: str, updated_at: datetime) -> Response:
+    response = Response(status_code=status.HTTP_304_NOT_MODIFIED)
+    set_validators(response, etag, updated_at)
+    return response
+
+
+def check_not_modified(
+    request: Request, key: str, updated_at: Optional[datetime]
+) -> Optional[Response]:
+    """
+    The 304 response when the client already has the current version, else None.
+    """
+    if updated_at is None:
+        return None
+    etag = make_etag(key, updated_at)
+    if is_not_modified(request, etag, updated_at):
+        return not_modified(etag, updated_at)
+    return None
@@ -0,0 +1,28 @@
+import base64
+import json
+from typing import Any, Dict
+
+from fastapi import HTTPException, status
+
+
+def encode_cursor(position: Dict[str, Any]) -> str:
+    """
+    Turn the keyset position of the last returned row into an opaque cursor.
+    Clients should only pass it back, never build or parse it themselves.
+    """
+    raw = json.dumps(position, separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Dict[str, Any]:
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        position = json.loads(base64.urlsafe_b64decode(padded.encode()))
+    except ValueError:  # binascii.Error included
+        position = None
+
+    if not isinstance(position, dict):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid pagination cursor."
+        )
+    return position
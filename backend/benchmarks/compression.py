@@ -0,0 +1,116 @@
+"""
+Throughput of the compression middleware, uncompressed vs gzip vs brotli.
+
+Calls the ASGI app directly (no sockets) with a rendered cleanings list, for every
+encoding and level, and reports the CPU time per response next to the bytes that
+go over the wire and how long they take at --bandwidth-mbps. The compressed
+response cache is off, so every request pays the full compression:
+
+    python -m benchmarks.compression --rows 1000 --repeat 50 --bandwidth-mbps 10
+"""
+import argparse
+import asyncio
+import time
+from typing import List, Tuple
+
+from app.api.middleware.compression import CompressionMiddleware
+from app.api.responses import ORJSONResponse
+from benchmarks.serialization import build_cleanings
+from starlette.responses import Response
+from starlette.types import ASGIApp, Message
+
+# (label, accept-encoding, gzip level, brotli quality)
+VARIANTS = (
+    ("identity", "identity", 6, 4),
+    ("gzip level 1", "gzip", 1, 4),
+    ("gzip level 6", "gzip", 6, 4),
+    ("gzip level 9", "gzip", 9, 4),
+    ("br quality 1", "br", 6, 1),
+    ("br quality 4", "br", 6, 4),
+    ("br quality 8", "br", 6, 8),
+)
+
+
+def build_app(body: bytes) -> ASGIApp:
+    async def app(scope, receive, send) -> None:
+        await Response(body, media_type="application/json")(scope, receive, send)
+
+    return app
+
+
+async def request(app: ASGIApp, accept_encoding: str) -> int:
+    sent: List[Message] = []
+
+    async def receive() -> Message:
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(message: Message) -> None:
+        sent.append(message)
+
+    scope = {
+        "type": "http",
+        "method": "GET",
+        "path": "/api/cleanings/",
+        "query_string": b"",
+        "headers": [(b"accept-encoding", accept_encoding.encode())],
+    }
+    await app(scope, receive, send)
+    return sum(len(m.get("body", b"")) for m in sent if m["type"] == "http.response.body")
+
+
+async def measure(app: ASGIApp, accept_encoding: str, repeat: int) -> Tuple[float, int]:
+    size = await request(app, accept_encoding)
+    start = time.perf_counter()
+    for _ in range(repeat):
+        await request(app, accept_encoding)
+    return (time.perf_counter() - start) / repeat, size
+
+
+def wire_ms(size: int, bandwidth_mbps: float) -> float:
+    return size * 8 / (bandwidth_mbps * 1_000_000) * 1000
+
+
+async def main(args: argparse.Namespace) -> None:
+    body = ORJSONResponse(build_cleanings(args.rows)).body
+    print(f"{args.rows} cleanings, {len(body)} bytes of json")
+    print(
+        f"{'':<16}{'cpu (ms)':>10}{'req/s':>10}{'MB/s in':>10}"
+        f"{'bytes':>10}{'ratio':>8}{f'wire @{args.bandwidth_mbps}Mbps (ms)':>24}"
+    )
+    for label, accept_encoding, gzip_level, brotli_quality in VARIANTS:
+        app = CompressionMiddleware(
+            build_app(body),
+            minimum_size=args.minimum_size,
+            gzip_level=gzip_level,
+            brotli_quality=brotli_quality,
+            cache_size=0,
+        )
+        elapsed, size = await measure(app, accept_encoding, args.repeat)
+        print(
+            f"{label:<16}{elapsed * 1000:>10.2f}{1 / elapsed:>10.0f}"
+            f"{len(body) / elapsed / 1_000_000:>10.1f}{size:>10}"
+            f"{len(body) / size:>8.1f}{wire_ms(size, args.bandwidth_mbps):>24.1f}"
+        )
+
+    # a response under the threshold only pays for looking at the headers
+    small = ORJSONResponse(build_cleanings(1)).body
+    plain_app = build_app(small)
+    plain, _ = await measure(plain_app, "gzip, br", args.repeat * 20)
+    wrapped, _ = await measure(
+        CompressionMiddleware(plain_app, minimum_size=args.minimum_size),
+        "gzip, br",
+        args.repeat * 20,
+    )
+    print(
+        f"\n{len(small)} byte response: {plain * 1_000_000:.1f} us without the "
+        f"middleware, {wrapped * 1_000_000:.1f} us with it"
+    )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--rows", type=int, default=1000)
+    parser.add_argument("--repeat", type=int, default=50)
+    parser.add_argument("--minimum-size", type=int, default=1024)
+    parser.add_argument("--bandwidth-mbps", type=float, default=10)
+    asyncio.run(main(parser.parse_args()))
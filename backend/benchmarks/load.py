@@ -0,0 +1,255 @@
+"""
+Load test of the API: throughput and tail latency of its main endpoints.
+
+Every scenario is run for --duration seconds by --concurrency clients that send
+requests back to back (after --warmup seconds that aren't recorded), the result is
+the number of requests per second and the p50/p95/p99 latency of each scenario.
+
+By default the app runs in-process (httpx calls the ASGI app, no sockets) against
+the database configured in .env / environment. With --url it loads a running
+server instead, e.g. uvicorn against a local Postgres:
+
+    python -m benchmarks.load --concurrency 16 --duration 10
+    python -m benchmarks.load --url http://localhost:8000 --scenario cleanings profile
+
+The results are printed as json (or written to --output), pass a previous result
+as --compare to see the change in rps and latency:
+
+    python -m benchmarks.load --output before.json
+    git checkout my-branch
+    python -m benchmarks.load --compare before.json
+"""
+import argparse
+import asyncio
+import json
+import statistics
+import subprocess
+import time
+import uuid
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, List, NamedTuple
+
+import httpx
+from asgi_lifespan import LifespanManager
+from benchmarks.login_contention import percentile
+
+
+class Session(NamedTuple):
+    email: str
+    username: str
+    password: str
+    token: str
+
+
+class Scenario(NamedTuple):
+    description: str
+    request: Callable[[httpx.AsyncClient, Session], Awaitable[httpx.Response]]
+
+
+def auth(session: Session) -> Dict[str, str]:
+    return {"Authorization": f"Bearer {session.token}"}
+
+
+async def login(client: httpx.AsyncClient, session: Session) -> httpx.Response:
+    return await client.post(
+        "/api/users/login/token/",
+        data={"username": session.email, "password": session.password},
+        headers={"Content-Type": "application/x-www-form-urlencoded"},
+    )
+
+
+async def list_cleanings(client: httpx.AsyncClient, session: Session) -> httpx.Response:
+    return await client.get("/api/cleanings/", headers=auth(session))
+
+
+async def get_profile(client: httpx.AsyncClient, session: Session) -> httpx.Response:
+    return await client.get(f"/api/profiles/{session.username}/", headers=auth(session))
+
+
+SCENARIOS = {
+    "login": Scenario("POST /api/users/login/token/ (bcrypt)", login),
+    "cleanings": Scenario("GET /api/cleanings/ (first page)", list_cleanings),
+    "profile": Scenario("GET /api/profiles/{username}/", get_profile),
+}
+
+
+@asynccontextmanager
+async def open_client(url: str) -> AsyncIterator[httpx.AsyncClient]:
+    if url:
+        # a connection per concurrent client, no pool limit in the way
+        limits = httpx.Limits(max_connections=None, max_keepalive_connections=None)
+        async with httpx.AsyncClient(base_url=url, limits=limits) as client:
+            yield client
+        return
+
+    from app.api.server import get_application
+
+    app = get_application()
+    async with LifespanManager(app):
+        async with httpx.AsyncClient(app=app, base_url="http://benchmark") as client:
+            yield client
+
+
+async def create_session(client: httpx.AsyncClient, cleanings: int) -> Session:
+    """
+    A new user with `cleanings` cleanings, so runs don't depend on each other.
+    """
+    suffix = uuid.uuid4().hex[:8]
+    email, username, password = f"load_{suffix}@example.com", f"load_{suffix}", "load-pw"
+    res = await client.post(
+        "/api/users/",
+        json={"new_user": {"email": email, "username": username, "password": password}},
+    )
+    res.raise_for_status()
+    session = Session(
+        email, username, password, res.json()["access_token"]["access_token"]
+    )
+    new_cleanings = [
+        {"name": f"load cleaning {i}", "price": 10 + i % 90, "cleaning_type": "dust_up"}
+        for i in range(cleanings)
+    ]
+    res = await client.post(
+        "/api/cleanings/bulk/",
+        json={"new_cleanings": new_cleanings},
+        headers=auth(session),
+    )
+    res.raise_for_status()
+    return session
+
+
+async def run_client(
+    client: httpx.AsyncClient,
+    scenario: Scenario,
+    session: Session,
+    record_after: float,
+    stop: float,
+) -> List[Any]:
+    """
+    Send requests until `stop`, returns the latencies (ms) of those that started
+    after `record_after` - None for the ones that failed.
+    """
+    results: List[Any] = []
+    while time.perf_counter() < stop:
+        start = time.perf_counter()
+        try:
+            res = await scenario.request(client, session)
+            ok = res.status_code < 400
+        except httpx.HTTPError:
+            ok = False
+        if start >= record_after:
+            results.append((time.perf_counter() - start) * 1000 if ok else None)
+    return results
+
+
+def summarize(results: List[Any], duration: float) -> Dict[str, Any]:
+    latencies = [latency for latency in results if latency is not None]
+    summary: Dict[str, Any] = {
+        "requests": len(results),
+        "errors": len(results) - len(latencies),
+        "rps": round(len(latencies) / duration, 1),
+    }
+    if latencies:
+        summary["latency_ms"] = {
+            "mean": round(statistics.mean(latencies), 2),
+            **{f"p{p}": round(percentile(latencies, p), 2) for p in (50, 95, 99)},
+            "max": round(max(latencies), 2),
+        }
+    return summary
+
+
+async def run_scenario(
+    client: httpx.AsyncClient,
+    scenario: Scenario,
+    session: Session,
+    args: argparse.Namespace,
+) -> Dict[str, Any]:
+    record_after = time.perf_counter() + args.warmup
+    stop = record_after + args.duration
+    per_client = await asyncio.gather(
+        *(
+            run_client(client, scenario, session, record_after, stop)
+            for _ in range(args.concurrency)
+        )
+    )
+    return summarize([r for results in per_client for r in results], args.duration)
+
+
+def git_revision() -> str:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def compare(before: Dict[str, Any], after: Dict[str, Any]) -> List[str]:
+    """
+    One line per scenario present in both results: rps and latency change in %.
+    """
+
+    def change(old: float, new: float) -> str:
+        return f"{(new - old) / old * 100:+.1f}%" if old else "n/a"
+
+    lines = [f"{'scenario':<12}{'rps':>10}{'p50':>10}{'p95':>10}{'p99':>10}"]
+    for name, new in after["scenarios"].items():
+        old = before["scenarios"].get(name)
+        if old is None or "latency_ms" not in old or "latency_ms" not in new:
+            continue
+        latency_changes = (
+            change(old["latency_ms"][p], new["latency_ms"][p])
+            for p in ("p50", "p95", "p99")
+        )
+        lines.append(
+            f"{name:<12}{change(old['rps'], new['rps']):>10}"
+            + "".join(f"{c:>10}" for c in latency_changes)
+        )
+    return lines
+
+
+async def main(args: argparse.Namespace) -> None:
+    result: Dict[str, Any] = {
+        "revision": git_revision(),
+        "target": args.url or "in-process",
+        "concurrency": args.concurrency,
+        "duration": args.duration,
+        "scenarios": {},
+    }
+    async with open_client(args.url) as client:
+        session = await create_session(client, args.cleanings)
+        for name in args.scenario:
+            result["scenarios"][name] = await run_scenario(
+                client, SCENARIOS[name], session, args
+            )
+
+    output = json.dumps(result, indent=2, sort_keys=True)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(output + "\n")
+    else:
+        print(output)
+    if args.compare:
+        with open(args.compare) as f:
+            print("\n".join(compare(json.load(f), result)))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument(
+        "--scenario",
+        nargs="+",
+        choices=sorted(SCENARIOS),
+        default=list(SCENARIOS),
+        help="scenarios to run, one after another",
+    )
+    parser.add_argument("--concurrency", type=int, default=8, help="concurrent clients")
+    parser.add_argument("--duration", type=float, default=10, help="seconds per scenario")
+    parser.add_argument("--warmup", type=float, default=1, help="seconds not recorded")
+    parser.add_argument("--cleanings", type=int, default=50, help="cleanings of the user")
+    parser.add_argument("--url", default="", help="running server, in-process if empty")
+    parser.add_argument("--output", help="write the json result to this file")
+    parser.add_argument("--compare", help="previous json result to compare with")
+    asyncio.run(main(parser.parse_args()))
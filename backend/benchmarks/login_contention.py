@@ -0,0 +1,128 @@
+"""
+Measure how concurrent logins affect the latency of an unrelated endpoint.
+
+A few "login" workers hammer /api/users/login/token/ (bcrypt verification) while a
+probe repeatedly requests /api/cleanings/ and records its latency. Run it once with
+--sync-hashing (bcrypt on the event loop, the old behaviour) and once without it
+(bcrypt in AuthService's thread pool) to compare the probe's p99.
+
+It runs the app in-process against the database configured in .env / environment
+(migrations must be applied):
+
+    python -m benchmarks.login_contention --logins 8 --duration 10
+    python -m benchmarks.login_contention --logins 8 --duration 10 --sync-hashing
+"""
+import argparse
+import asyncio
+import statistics
+import time
+import uuid
+from typing import List
+
+from app.services import auth_service
+from app.services.authentication import AuthService, pwd_context
+from asgi_lifespan import LifespanManager
+from httpx import AsyncClient
+
+
+def percentile(values: List[float], pct: float) -> float:
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def use_sync_hashing() -> None:
+    """Restore the old behaviour: bcrypt runs directly on the event loop."""
+
+    async def verify_password_async(
+        self: AuthService, *, password: str, salt: str, hashed_pw: str
+    ) -> bool:
+        return pwd_context.verify(password + salt, hashed_pw)
+
+    AuthService.verify_password_async = verify_password_async
+
+
+async def login_worker(
+    client: AsyncClient, email: str, password: str, stop: float
+) -> int:
+    logins = 0
+    while time.perf_counter() < stop:
+        res = await client.post(
+            "/api/users/login/token/",
+            data={"username": email, "password": password},
+            headers={"Content-Type": "application/x-www-form-urlencoded"},
+        )
+        assert res.status_code == 200, res.text
+        logins += 1
+    return logins
+
+
+async def probe(client: AsyncClient, token: str, stop: float) -> List[float]:
+    latencies = []
+    while time.perf_counter() < stop:
+        start = time.perf_counter()
+        res = await client.get(
+            "/api/cleanings/", headers={"Authorization": f"Bearer {token}"}
+        )
+        latencies.append((time.perf_counter() - start) * 1000)
+        assert res.status_code == 200, res.text
+        await asyncio.sleep(0.005)
+    return latencies
+
+
+async def main(args: argparse.Namespace) -> None:
+    from app.api.server import get_application
+
+    if args.sync_hashing:
+        use_sync_hashing()
+
+    app = get_application()
+    suffix = uuid.uuid4().hex[:8]
+    email, password = f"bench_{suffix}@example.com", "benchmark-password"
+
+    async with LifespanManager(app):
+        async with AsyncClient(app=app, base_url="http://benchmark") as client:
+            res = await client.post(
+                "/api/users/",
+                json={
+                    "new_user": {
+                        "email": email,
+                        "username": f"bench_{suffix}",
+                        "password": password,
+                    }
+                },
+            )
+            token = res.json()["access_token"]["access_token"]
+            for i in range(20):
+                await client.post(
+                    "/api/cleanings/",
+                    json={"new_cleaning": {"name": f"cleaning {i}", "price": 9.99}},
+                    headers={"Authorization": f"Bearer {token}"},
+                )
+
+            stop = time.perf_counter() + args.duration
+            results = await asyncio.gather(
+                probe(client, token, stop),
+                *(
+                    login_worker(client, email, password, stop)
+                    for _ in range(args.logins)
+                ),
+            )
+
+    latencies, logins = results[0], sum(results[1:])
+    print(f"mode:             {'sync' if args.sync_hashing else 'thread pool'} hashing")
+    print(f"pool workers:     {auth_service.max_workers}")
+    print(f"logins/s:         {logins / args.duration:.1f}")
+    print(f"probe requests:   {len(latencies)}")
+    print(f"probe p50 (ms):   {statistics.median(latencies):.1f}")
+    print(f"probe p99 (ms):   {percentile(latencies, 99):.1f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--logins", type=int, default=8, help="concurrent login workers")
+    parser.add_argument("--duration", type=float, default=10, help="seconds to run")
+    parser.add_argument(
+        "--sync-hashing", action="store_true", help="run bcrypt on the event loop"
+    )
+    asyncio.run(main(parser.parse_args()))
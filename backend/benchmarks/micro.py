@@ -0,0 +1,197 @@
+"""
+Microbenchmarks of the CPU hot paths: tokens, models and serialization.
+
+Every case is timed with timeit (the best of --repeat runs of an auto-ranged number
+of calls) and compared with the stored baseline (benchmarks/baselines/micro.json),
+cases more than --threshold percent slower than their baseline are marked. No
+database is needed:
+
+    python -m benchmarks.micro
+    python -m benchmarks.micro --filter models.
+    python -m benchmarks.micro --save  # after an intended change, to update the baseline
+
+Baselines are only comparable on the same machine, python and package versions
+(stored with the baseline, a difference is reported), record the baseline with
+requirements.dev.txt on the project's python 3.8.
+"""
+import argparse
+import json
+import os
+import platform
+import timeit
+from datetime import datetime, timezone
+from importlib import metadata
+from typing import Any, Callable, Dict, List
+
+from app.api.responses import ORJSONResponse
+from app.models.cleaning import CleaningInDB, CleaningPublic
+from app.models.core import DateTimeModelMixin
+from app.models.profile import ProfilePublic
+from app.models.user import UserInDB, UserPublic
+from app.services.authentication import AuthService
+from benchmarks.serialization import build_cleanings, build_rows
+from fastapi.encoders import jsonable_encoder
+
+BASELINE = os.path.join(os.path.dirname(__file__), "baselines", "micro.json")
+# the numbers depend on these as much as on the code, they're stored with the baseline
+PACKAGES = ("fastapi", "starlette", "pydantic", "orjson", "PyJWT", "passlib")
+SECRET = "microbenchmark-secret"
+
+NOW = datetime(2021, 6, 1, 12, 30, tzinfo=timezone.utc)
+USER = {
+    "id": 1,
+    "email": "bench@example.com",
+    "username": "bench",
+    "email_verified": False,
+    "is_active": True,
+    "is_superuser": False,
+    "created_at": NOW,
+    "updated_at": NOW,
+}
+PROFILE = {
+    "id": 1,
+    "full_name": "Bench Mark",
+    "phone_number": "555-1234",
+    "bio": "cleans things",
+    "image": "https://example.com/bench.png",
+    "user_id": 1,
+    "username": "bench",
+    "email": "bench@example.com",
+    "created_at": NOW,
+    "updated_at": NOW,
+}
+
+
+def user_public_from_records() -> UserPublic:
+    # what UsersRepository.build_user_with_profile does with the joined row
+    user = UserPublic.from_record(USER)
+    user.profile = ProfilePublic.from_record(PROFILE)
+    return user
+
+
+def build_cases() -> Dict[str, Callable[[], Any]]:
+    auth_service = AuthService()
+    user_in_db = UserInDB(**USER, password="hashed-password", salt="salt")
+    token = auth_service.create_access_token_for_user(user=user_in_db, secret_key=SECRET)
+    user_public = UserPublic(**USER, profile=ProfilePublic(**PROFILE))
+    row = build_rows(1)[0]
+    cleanings = build_cleanings(50)
+    timestamps = {"created_at": NOW.isoformat(), "updated_at": NOW.isoformat()}
+
+    return {
+        "auth.create_access_token_for_user": lambda: (
+            auth_service.create_access_token_for_user(user=user_in_db, secret_key=SECRET)
+        ),
+        "auth.get_username_from_token": lambda: auth_service.get_username_from_token(
+            token=token, secret_key=SECRET
+        ),
+        "models.user_public_with_profile": lambda: UserPublic(
+            **USER, profile=ProfilePublic(**PROFILE)
+        ),
+        "models.user_public_with_profile_from_record": user_public_from_records,
+        "models.cleaning_in_db": lambda: CleaningInDB(**row),
+        "models.cleaning_in_db_from_record": lambda: CleaningInDB.from_record(row),
+        "models.datetime_mixin_validators": lambda: DateTimeModelMixin(**timestamps),
+        "serialization.user_public": lambda: ORJSONResponse(
+            jsonable_encoder(user_public)
+        ).body,
+        "serialization.cleanings_50_jsonable_encoder": lambda: ORJSONResponse(
+            jsonable_encoder(cleanings)
+        ).body,
+        "serialization.cleanings_50_orjson": lambda: ORJSONResponse(cleanings).body,
+        "serialization.cleanings_50_validate_response": lambda: [
+            CleaningPublic(**cleaning.dict()) for cleaning in cleanings
+        ],
+    }
+
+
+def time_case(func: Callable[[], Any], repeat: int) -> float:
+    """
+    Microseconds per call, best of `repeat` runs.
+    """
+    timer = timeit.Timer(func)
+    number, _ = timer.autorange()
+    return min(timer.repeat(repeat=repeat, number=number)) / number * 1_000_000
+
+
+def load_baseline() -> Dict[str, Any]:
+    if not os.path.exists(BASELINE):
+        return {"results": {}}
+    with open(BASELINE) as f:
+        return json.load(f)
+
+
+def report(
+    results: Dict[str, float], baseline: Dict[str, float], threshold: float
+) -> List[str]:
+    lines = [f"{'case':<50}{'baseline us':>14}{'now us':>12}{'change':>10}"]
+    for name, now in results.items():
+        before = baseline.get(name)
+        if before is None:
+            lines.append(f"{name:<50}{'-':>14}{now:>12.2f}{'new':>10}")
+            continue
+        change = (now - before) / before * 100
+        marker = "  <- slower" if change > threshold else ""
+        lines.append(f"{name:<50}{before:>14.2f}{now:>12.2f}{change:>+9.1f}%{marker}")
+    return lines
+
+
+def environment() -> Dict[str, Any]:
+    return {
+        "python": platform.python_version(),
+        "machine": platform.machine(),
+        "packages": {package: metadata.version(package) for package in PACKAGES},
+    }
+
+
+def environment_changes(baseline: Dict[str, Any], current: Dict[str, Any]) -> List[str]:
+    """
+    What differs between the environment of the baseline and this one.
+    """
+    changes = []
+    for key in ("python", "machine"):
+        if baseline.get(key) != current[key]:
+            changes.append(f"{key} {baseline.get(key)} -> {current[key]}")
+    baseline_packages = baseline.get("packages", {})
+    for package, version in current["packages"].items():
+        if baseline_packages.get(package) != version:
+            changes.append(f"{package} {baseline_packages.get(package)} -> {version}")
+    return changes
+
+
+def save_baseline(results: Dict[str, float], current: Dict[str, Any]) -> None:
+    os.makedirs(os.path.dirname(BASELINE), exist_ok=True)
+    baseline = {
+        **current,
+        "results": {name: round(value, 3) for name, value in results.items()},
+    }
+    with open(BASELINE, "w") as f:
+        json.dump(baseline, f, indent=2, sort_keys=True)
+        f.write("\n")
+
+
+def main(args: argparse.Namespace) -> None:
+    cases = {name: func for name, func in build_cases().items() if args.filter in name}
+    results = {name: time_case(func, args.repeat) for name, func in cases.items()}
+    baseline = load_baseline()
+    current = environment()
+    changes = environment_changes(baseline, current) if baseline["results"] else []
+    if changes:
+        print("baseline recorded elsewhere, not comparable: " + ", ".join(changes))
+    print("\n".join(report(results, baseline["results"], args.threshold)))
+    if args.save:
+        # results of another environment aren't kept next to the new ones
+        kept = {} if changes else baseline["results"]
+        save_baseline({**kept, **results}, current)
+        print(f"saved to {BASELINE}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--repeat", type=int, default=5, help="runs per case")
+    parser.add_argument("--filter", default="", help="only cases containing this")
+    parser.add_argument(
+        "--threshold", type=float, default=10, help="percent slower worth marking"
+    )
+    parser.add_argument("--save", action="store_true", help="store as the baseline")
+    main(parser.parse_args())
@@ -0,0 +1,74 @@
+"""
+Per-query overhead of `databases` vs the asyncpg fast path (app/db/fast_path.py).
+
+Runs the same hot repository queries sequentially through both and prints the mean
+time per query. Uses the database configured in .env / environment (migrations must
+be applied):
+
+    python -m benchmarks.query_overhead --iterations 5000
+"""
+import argparse
+import asyncio
+import time
+import uuid
+from typing import Any
+
+from app.core.config import DATABASE_URL
+from app.db.fast_path import fast_path_for
+from app.db.repositories.cleanings import GET_CLEANING_BY_ID, CleaningsRepository
+from app.db.repositories.users import (
+    GET_USER_WITH_PROFILE_BY_USER_NAME_QUERY,
+    UsersRepository,
+)
+from app.db.tasks import create_database
+from app.models.cleaning import CleaningCreate
+from app.models.user import UserCreate
+
+
+async def time_query(db: Any, query: str, values: dict, iterations: int) -> float:
+    for _ in range(100):  # warm up connections and statement caches
+        await db.fetch_one(query=query, values=values)
+    start = time.perf_counter()
+    for _ in range(iterations):
+        await db.fetch_one(query=query, values=values)
+    return (time.perf_counter() - start) / iterations * 1_000_000
+
+
+async def main(args: argparse.Namespace) -> None:
+    database = await create_database(str(DATABASE_URL))
+    try:
+        suffix = uuid.uuid4().hex[:8]
+        user = await UsersRepository(database).register_new_user(
+            new_user=UserCreate(
+                email=f"bench_{suffix}@example.com",
+                username=f"bench_{suffix}",
+                password="benchmark-password",
+            )
+        )
+        cleaning = await CleaningsRepository(database).create_cleaning(
+            new_cleaning=CleaningCreate(name="benchmark cleaning", price=9.99),
+            requesting_user=user,
+        )
+
+        queries = {
+            "GET_CLEANING_BY_ID": (GET_CLEANING_BY_ID, {"id": cleaning.id}),
+            "GET_USER_WITH_PROFILE_BY_USER_NAME_QUERY": (
+                GET_USER_WITH_PROFILE_BY_USER_NAME_QUERY,
+                {"username": user.username},
+            ),
+        }
+        print(f"{'query':<42}{'databases (us)':>16}{'fast path (us)':>16}")
+        for name, (query, values) in queries.items():
+            slow = await time_query(database, query, values, args.iterations)
+            fast = await time_query(
+                fast_path_for(database), query, values, args.iterations
+            )
+            print(f"{name:<42}{slow:>16.1f}{fast:>16.1f}")
+    finally:
+        await database.disconnect()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--iterations", type=int, default=5000)
+    asyncio.run(main(parser.parse_args()))
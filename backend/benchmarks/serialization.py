@@ -0,0 +1,111 @@
+"""
+Serialization throughput of a large cleaning list, stdlib json vs orjson.
+
+Reproduces what FastAPI does with a route's return value - jsonable_encoder() followed by
+the response class' render() - for JSONResponse and the app's ORJSONResponse, then the
+whole way from db rows to a response body: validated models re-validated against the
+response_model vs trusted CleaningInDB.from_record models sent with trusted_response().
+No database is needed:
+
+    python -m benchmarks.serialization --rows 10000 --repeat 10
+"""
+import argparse
+import asyncio
+import time
+from datetime import datetime, timezone
+from decimal import Decimal
+from typing import Any, Callable, Dict, List, Type
+
+from app.api.responses import ORJSONResponse, trusted_response
+from app.models.cleaning import CleaningInDB, CleaningPublic
+from fastapi.encoders import jsonable_encoder
+from fastapi.routing import serialize_response
+from fastapi.utils import create_response_field
+from starlette.responses import JSONResponse, Response
+
+
+def build_cleanings(rows: int) -> List[CleaningPublic]:
+    now = datetime.now(timezone.utc)
+    return [
+        CleaningPublic(
+            id=i,
+            name=f"cleaning {i}",
+            description="a fairly typical description of the cleaning job",
+            price=Decimal("19.99"),
+            cleaning_type=("dust_up", "spot_clean", "full_clean")[i % 3],
+            owner=i % 100,
+            created_at=now,
+            updated_at=now,
+        )
+        for i in range(rows)
+    ]
+
+
+def build_rows(rows: int) -> List[Dict[str, Any]]:
+    """
+    What asyncpg hands us for SELECT * FROM cleanings
+    """
+    return [
+        {**cleaning.dict(), "cleaning_type": cleaning.cleaning_type.value}
+        for cleaning in build_cleanings(rows)
+    ]
+
+
+def measure(func: Callable[[], bytes], repeat: int) -> float:
+    func()
+    start = time.perf_counter()
+    for _ in range(repeat):
+        func()
+    return (time.perf_counter() - start) / repeat
+
+
+def main(args: argparse.Namespace) -> None:
+    cleanings = build_cleanings(args.rows)
+    encoded = jsonable_encoder(cleanings)
+
+    print(f"{args.rows} cleanings")
+    print(f"{'':<28}{'render (ms)':>14}{'encode+render (ms)':>22}{'rows/s':>12}")
+    response_class: Type[Response]
+    for response_class in (JSONResponse, ORJSONResponse):
+        render = measure(lambda: response_class(encoded).body, args.repeat)
+        full = measure(
+            lambda: response_class(jsonable_encoder(cleanings)).body, args.repeat
+        )
+        print(
+            f"{response_class.__name__:<28}{render * 1000:>14.1f}{full * 1000:>22.1f}"
+            f"{args.rows / full:>12.0f}"
+        )
+
+    # the ORJSONResponse default hook can take the models themselves
+    direct = measure(lambda: ORJSONResponse(cleanings).body, args.repeat)
+    print(
+        f"{'ORJSONResponse (models)':<28}{'':>14}{direct * 1000:>22.1f}"
+        f"{args.rows / direct:>12.0f}"
+    )
+
+    rows = build_rows(args.rows)
+    response_field = create_response_field(name="Response", type_=List[CleaningPublic])
+    loop = asyncio.get_event_loop()
+
+    def validated() -> bytes:
+        content = [CleaningInDB(**row) for row in rows]
+        encoded = loop.run_until_complete(
+            serialize_response(field=response_field, response_content=content)
+        )
+        return ORJSONResponse(encoded).body
+
+    def trusted() -> bytes:
+        return trusted_response([CleaningInDB.from_record(row) for row in rows]).body
+
+    print()
+    print(f"{'db rows -> body':<28}{'(ms)':>14}{'':>22}{'rows/s':>12}")
+    for label, func in (("validated + response_model", validated), ("trusted", trusted)):
+        elapsed = measure(func, args.repeat)
+        print(f"{label:<28}{elapsed * 1000:>14.1f}{'':>22}{args.rows / elapsed:>12.0f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--rows", type=int, default=10000)
+    parser.add_argument("--repeat", type=int, default=10)
+    main(parser.parse_args())
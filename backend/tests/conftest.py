@@ -1,10 +1,13 @@
 import os
 import warnings
+from contextlib import contextmanager
+from typing import Callable, ContextManager, Iterator, List
 
 import alembic
 import pytest
 from alembic.config import Config
 from app.core.config import JWT_TOKEN_PREFIX, SECRET_KEY
+from app.db.instrumentation import count_queries
 from app.db.repositories.cleanings import CleaningsRepository
 from app.db.repositories.users import UsersRepository
 from app.models.cleaning import CleaningCreate, CleaningInDB
@@ -109,3 +112,22 @@ def authorized_client(client: AsyncClient, test_user: UserInDB) -> AsyncClient:
         "Authorization": f"{JWT_TOKEN_PREFIX} {access_token}",
     }
     return client
+
+
+@pytest.fixture
+def max_queries() -> Callable[[int], ContextManager[List[str]]]:
+    """
+    Fails the test when the block runs more queries than the limit, e.g.
+        with max_queries(2):
+            await authorized_client.get(...)
+    """
+
+    @contextmanager
+    def assert_max_queries(limit: int) -> Iterator[List[str]]:
+        with count_queries() as queries:
+            yield queries
+        assert (
+            len(queries) <= limit
+        ), f"{len(queries)} queries, expected at most {limit}:\n" + "\n".join(queries)
+
+    return assert_max_queries
@@ -1,9 +1,18 @@
+import json
 import logging
 from typing import Dict, List, Optional
 
 import pytest
+from app.core.config import MAX_BULK_SIZE
 from app.db.repositories.cleanings import CleaningsRepository
-from app.models.cleaning import CleaningCreate, CleaningInDB, CleaningPublic
+from app.models.cleaning import (
+    CleaningBulkCreateResult,
+    CleaningBulkDeleteResult,
+    CleaningBulkUpdateResult,
+    CleaningCreate,
+    CleaningInDB,
+    CleaningPublic,
+)
 from app.models.user import UserInDB
 from databases import Database
 from fastapi import FastAPI
@@ -113,6 +122,166 @@ class TestCreateCleaning:
         assert res.status_code == status_code
 
 
+class TestBulkCreateCleanings:
+    async def test_valid_items_are_created_and_invalid_reported(
+        self,
+        app: FastAPI,
+        authorized_client: AsyncClient,
+        test_user: UserInDB,
+        db: Database,
+    ) -> None:
+        new_cleanings = [
+            {"name": "bulk cleaning 0", "price": 10.50, "cleaning_type": "dust_up"},
+            {"name": "bulk cleaning 1"},  # missing price
+            {"name": "bulk cleaning 2", "price": 12.00, "description": "bulk"},
+            {"name": "bulk cleaning 3", "price": 1.00, "cleaning_type": "invalid"},
+            {"name": "bulk cleaning 4", "price": 1.00, "cleaning_type": None},
+        ]
+        res = await authorized_client.post(
+            app.url_path_for("cleanings:bulk-create-cleanings"),
+            json={"new_cleanings": new_cleanings},
+        )
+        assert res.status_code == status.HTTP_200_OK
+        result = CleaningBulkCreateResult(**res.json())
+        assert [e.index for e in result.errors] == [1, 3, 4]
+        assert [c.name for c in result.created] == ["bulk cleaning 0", "bulk cleaning 2"]
+        assert all(c.owner == test_user.id for c in result.created)
+        assert result.created[0].cleaning_type == "dust_up"
+        assert result.created[1].cleaning_type == "spot_clean"
+
+        cleaning_repo = CleaningsRepository(db)
+        for cleaning in result.created:
+            in_db = await cleaning_repo.get_cleaning_by_id(
+                id=cleaning.id, requesting_user=test_user
+            )
+            assert in_db == CleaningInDB(**cleaning.dict())
+
+    async def test_items_that_are_not_objects_are_reported(
+        self, app: FastAPI, authorized_client: AsyncClient
+    ) -> None:
+        new_cleanings = [
+            "not a cleaning",
+            {"name": "bulk cleaning 1", "price": 10.50},
+            None,
+            [1, 2],
+        ]
+        res = await authorized_client.post(
+            app.url_path_for("cleanings:bulk-create-cleanings"),
+            json={"new_cleanings": new_cleanings},
+        )
+        assert res.status_code == status.HTTP_200_OK
+        result = CleaningBulkCreateResult(**res.json())
+        assert [e.index for e in result.errors] == [0, 2, 3]
+        assert [c.name for c in result.created] == ["bulk cleaning 1"]
+
+    async def test_too_many_items_raise_error(
+        self, app: FastAPI, authorized_client: AsyncClient
+    ) -> None:
+        res = await authorized_client.post(
+            app.url_path_for("cleanings:bulk-create-cleanings"),
+            json={"new_cleanings": [{"name": "x", "price": 1}] * (MAX_BULK_SIZE + 1)},
+        )
+        assert res.status_code == status.HTTP_400_BAD_REQUEST
+
+
+class TestBulkUpdateAndDeleteCleanings:
+    async def test_bulk_update_reports_missing_and_forbidden_ids(
+        self,
+        app: FastAPI,
+        authorized_client: AsyncClient,
+        test_user: UserInDB,
+        db: Database,
+        test_cleanings_list: List[CleaningInDB],
+    ) -> None:
+        cleaning_repo = CleaningsRepository(db)
+        own = await cleaning_repo.create_cleanings(
+            new_cleanings=[
+                CleaningCreate(name=f"repriced {i}", description="keep me", price=1.00)
+                for i in range(3)
+            ],
+            requesting_user=test_user,
+        )
+        own_ids = [c.id for c in own]
+        other_id = test_cleanings_list[0].id
+
+        res = await authorized_client.patch(
+            app.url_path_for("cleanings:bulk-update-cleanings"),
+            json={
+                "ids": own_ids + [other_id, 5000000],
+                "cleaning_update": {"price": 42.00},
+            },
+        )
+        assert res.status_code == status.HTTP_200_OK
+        result = CleaningBulkUpdateResult(**res.json())
+        assert sorted(c.id for c in result.updated) == sorted(own_ids)
+        assert all(c.price == 42.00 for c in result.updated)
+        assert all(c.description == "keep me" for c in result.updated)
+        assert result.forbidden == [other_id]
+        assert result.not_found == [5000000]
+
+        other = await cleaning_repo.get_cleaning_by_id(
+            id=other_id, requesting_user=test_user
+        )
+        assert other.price == test_cleanings_list[0].price
+
+    async def test_bulk_update_rejects_null_required_fields(
+        self, app: FastAPI, authorized_client: AsyncClient, test_cleaning: CleaningInDB
+    ) -> None:
+        res = await authorized_client.patch(
+            app.url_path_for("cleanings:bulk-update-cleanings"),
+            json={"ids": [test_cleaning.id], "cleaning_update": {"cleaning_type": None}},
+        )
+        assert res.status_code == status.HTTP_400_BAD_REQUEST
+
+    async def test_bulk_delete_reports_missing_and_forbidden_ids(
+        self,
+        app: FastAPI,
+        authorized_client: AsyncClient,
+        test_user: UserInDB,
+        db: Database,
+        test_cleanings_list: List[CleaningInDB],
+    ) -> None:
+        cleaning_repo = CleaningsRepository(db)
+        own = await cleaning_repo.create_cleanings(
+            new_cleanings=[
+                CleaningCreate(name=f"doomed {i}", price=1.00) for i in range(3)
+            ],
+            requesting_user=test_user,
+        )
+        own_ids = [c.id for c in own]
+        other_id = test_cleanings_list[1].id
+
+        res = await authorized_client.post(
+            app.url_path_for("cleanings:bulk-delete-cleanings"),
+            json={"ids": own_ids + [other_id, 5000000]},
+        )
+        assert res.status_code == status.HTTP_200_OK
+        result = CleaningBulkDeleteResult(**res.json())
+        assert result.deleted == sorted(own_ids)
+        assert result.forbidden == [other_id]
+        assert result.not_found == [5000000]
+        for id in own_ids:
+            assert (
+                await cleaning_repo.get_cleaning_by_id(id=id, requesting_user=test_user)
+                is None
+            )
+        assert await cleaning_repo.get_cleaning_by_id(
+            id=other_id, requesting_user=test_user
+        )
+
+    async def test_bulk_delete_takes_up_to_max_bulk_size_ids(
+        self, app: FastAPI, authorized_client: AsyncClient
+    ) -> None:
+        url = app.url_path_for("cleanings:bulk-delete-cleanings")
+        ids = list(range(10_000_000, 10_000_000 + MAX_BULK_SIZE))
+        res = await authorized_client.post(url, json={"ids": ids})
+        assert res.status_code == status.HTTP_200_OK
+        assert len(res.json()["not_found"]) == MAX_BULK_SIZE
+
+        res = await authorized_client.post(url, json={"ids": ids + [1]})
+        assert res.status_code == status.HTTP_400_BAD_REQUEST
+
+
 class TestGetCleaning:
     async def test_get_cleaning_by_id(
         self, app: FastAPI, authorized_client: AsyncClient, test_cleaning: CleaningInDB
@@ -178,12 +347,163 @@ class TestGetCleaning:
         assert all(c not in cleanings for c in test_cleanings_list)
 
 
+class TestConditionalGetCleaning:
+    async def test_not_modified_when_client_has_current_version(
+        self,
+        app: FastAPI,
+        authorized_client: AsyncClient,
+        test_cleaning: CleaningInDB,
+        monkeypatch,
+    ) -> None:
+        url = app.url_path_for("cleanings:get-cleaning-by-id", id=test_cleaning.id)
+        res = await authorized_client.get(url)
+        assert res.status_code == status.HTTP_200_OK
+        etag, last_modified = res.headers["etag"], res.headers["last-modified"]
+        assert etag.startswith('W/"')
+
+        # the 304 is answered from updated_at alone
+        async def fail(*args, **kwargs):
+            raise AssertionError("the full cleaning should not be loaded")
+
+        monkeypatch.setattr(CleaningsRepository, "get_cleaning_by_id", fail)
+        for headers in ({"If-None-Match": etag}, {"If-Modified-Since": last_modified}):
+            res = await authorized_client.get(url, headers=headers)
+            assert res.status_code == status.HTTP_304_NOT_MODIFIED
+            assert res.content == b""
+            assert res.headers["etag"] == etag
+
+    async def test_stale_validators_get_full_response(
+        self,
+        app: FastAPI,
+        authorized_client: AsyncClient,
+        test_cleaning: CleaningInDB,
+    ) -> None:
+        url = app.url_path_for("cleanings:get-cleaning-by-id", id=test_cleaning.id)
+        for headers in (
+            {"If-None-Match": 'W/"other-version", "and-another"'},
+            {"If-Modified-Since": "Mon, 01 Jan 2001 00:00:00 GMT"},
+            {"If-Modified-Since": "not a date"},
+        ):
+            res = await authorized_client.get(url, headers=headers)
+            assert res.status_code == status.HTTP_200_OK
+            assert CleaningInDB(**res.json()) == test_cleaning
+
+    async def test_conditional_get_of_missing_cleaning_returns_404(
+        self, app: FastAPI, authorized_client: AsyncClient
+    ) -> None:
+        res = await authorized_client.get(
+            app.url_path_for("cleanings:get-cleaning-by-id", id=5000000),
+            headers={"If-None-Match": "*"},
+        )
+        assert res.status_code == status.HTTP_404_NOT_FOUND
+
+
+class TestListCleaningsPagination:
+    async def test_cursor_walks_all_user_cleanings_newest_first(
+        self,
+        app: FastAPI,
+        authorized_client: AsyncClient,
+        test_user: UserInDB,
+        db: Database,
+    ) -> None:
+        cleaning_repo = CleaningsRepository(db)
+        for i in range(5):
+            await cleaning_repo.create_cleaning(
+                new_cleaning=CleaningCreate(name=f"paged cleaning {i}", price=5.00),
+                requesting_user=test_user,
+            )
+        all_cleanings = await cleaning_repo.list_all_user_cleanings(
+            requesting_user=test_user
+        )
+
+        ids, cursor, pages = [], None, 0
+        while True:
+            params = {"limit": 2, **({"cursor": cursor} if cursor else {})}
+            res = await authorized_client.get(
+                app.url_path_for("cleanings:list-all-user-cleanings"), params=params
+            )
+            assert res.status_code == status.HTTP_200_OK
+            assert len(res.json()) <= 2
+            ids += [c["id"] for c in res.json()]
+            pages += 1
+            cursor = res.headers.get("X-Next-Cursor")
+            if not cursor:
+                break
+
+        assert pages > 1
+        assert ids == sorted((c.id for c in all_cleanings), reverse=True)
+
+    async def test_browsers_can_read_the_cursor(
+        self, app: FastAPI, authorized_client: AsyncClient, test_cleaning: CleaningInDB
+    ) -> None:
+        res = await authorized_client.get(
+            app.url_path_for("cleanings:list-all-user-cleanings"),
+            params={"limit": 1},
+            headers={"Origin": "https://phresh.io"},
+        )
+        assert res.status_code == status.HTTP_200_OK
+        assert res.headers.get("X-Next-Cursor")
+        exposed = res.headers["access-control-expose-headers"].lower().split(",")
+        assert "x-next-cursor" in [header.strip() for header in exposed]
+
+    @pytest.mark.parametrize(
+        "params, status_code",
+        (
+            ({"cursor": "not-a-cursor"}, 400),
+            ({"cursor": "eyJpZCI6ImEifQ"}, 400),  # {"id":"a"}
+            ({"limit": 0}, 422),
+            ({"limit": 100000}, 422),
+        ),
+    )
+    async def test_invalid_pagination_params_raise_error(
+        self, app: FastAPI, authorized_client: AsyncClient, params: dict, status_code: int
+    ) -> None:
+        res = await authorized_client.get(
+            app.url_path_for("cleanings:list-all-user-cleanings"), params=params
+        )
+        assert res.status_code == status_code
+
+
+class TestStreamCleanings:
+    async def test_streamed_cleanings_match_user_cleanings(
+        self,
+        app: FastAPI,
+        authorized_client: AsyncClient,
+        test_user: UserInDB,
+        db: Database,
+        test_cleaning: CleaningInDB,
+        test_cleanings_list: List[CleaningInDB],
+    ) -> None:
+        cleaning_repo = CleaningsRepository(db)
+        user_cleanings = await cleaning_repo.list_all_user_cleanings(
+            requesting_user=test_user
+        )
+
+        res = await authorized_client.get(
+            app.url_path_for("cleanings:stream-all-user-cleanings"),
+            params={"format": "ndjson"},
+        )
+        assert res.status_code == status.HTTP_200_OK
+        assert res.headers["content-type"].startswith("application/x-ndjson")
+        lines = [json.loads(line) for line in res.text.splitlines()]
+        assert [CleaningInDB(**l) for l in lines] == user_cleanings
+
+        res = await authorized_client.get(
+            app.url_path_for("cleanings:stream-all-user-cleanings"),
+            params={"format": "json"},
+        )
+        assert res.status_code == status.HTTP_200_OK
+        assert [CleaningInDB(**l) for l in res.json()] == user_cleanings
+        assert all(c not in user_cleanings for c in test_cleanings_list)
+
+
 class TestUpdateCleaning:
     @pytest.mark.parametrize(
         "attrs_to_change, values",
         (
             (["name"], ["new fake cleaning name"]),
             (["description"], ["new fake cleaning description"]),
+            (["description"], [None]),
             (["price"], [3.14]),
             (["cleaning_type"], ["full_clean"]),
             (
@@ -0,0 +1,184 @@
+import asyncio
+import json
+import zlib
+from typing import AsyncGenerator
+
+import brotli
+import pytest
+from app.api.middleware.compression import CompressionMiddleware, negotiate_encoding
+from app.core.config import COMPRESSION_MINIMUM_SIZE
+from app.db.repositories.cleanings import CleaningsRepository
+from app.models.cleaning import CleaningCreate
+from app.models.user import UserInDB
+from databases import Database
+from fastapi import FastAPI
+from httpx import AsyncClient
+from starlette.applications import Starlette
+from starlette.requests import Request
+from starlette.responses import JSONResponse, PlainTextResponse, StreamingResponse
+from starlette.routing import Route
+
+pytestmark = pytest.mark.asyncio
+
+LARGE = {"rows": [{"id": i, "name": f"cleaning {i}"} for i in range(500)]}
+
+
+async def large(request: Request) -> JSONResponse:
+    return JSONResponse(LARGE, headers={"ETag": 'W/"large-1"'})
+
+
+async def small(request: Request) -> JSONResponse:
+    return JSONResponse({"id": 1})
+
+
+async def ndjson_rows() -> AsyncGenerator[str, None]:
+    for i in range(100):
+        yield json.dumps({"id": i}) + "\n"
+
+
+async def stream(request: Request) -> StreamingResponse:
+    return StreamingResponse(ndjson_rows(), media_type="application/x-ndjson")
+
+
+async def image(request: Request) -> PlainTextResponse:
+    return PlainTextResponse("x" * 5000, media_type="image/svg+xml")
+
+
+def build_app(**options) -> CompressionMiddleware:
+    routes = [
+        Route("/large", large),
+        Route("/small", small),
+        Route("/stream", stream),
+        Route("/image", image),
+    ]
+    return CompressionMiddleware(Starlette(routes=routes), **options)
+
+
+@pytest.fixture
+def compressed_app() -> CompressionMiddleware:
+    return build_app(minimum_size=500)
+
+
+@pytest.fixture
+async def raw_client(compressed_app: CompressionMiddleware) -> AsyncClient:
+    async with AsyncClient(app=compressed_app, base_url="http://testserver") as client:
+        yield client
+
+
+class TestNegotiation:
+    @pytest.mark.parametrize(
+        "accept_encoding, expected",
+        (
+            ("gzip, deflate, br", "br"),
+            ("gzip", "gzip"),
+            ("br;q=0, gzip", "gzip"),
+            ("gzip;q=0.5, br;q=0.4", "gzip"),
+            ("*", "br"),
+            ("identity", None),
+            ("", None),
+        ),
+    )
+    def test_negotiate_encoding(self, accept_encoding: str, expected: str) -> None:
+        assert negotiate_encoding(accept_encoding) == expected
+
+
+class TestCompressionMiddleware:
+    @pytest.mark.parametrize("encoding", ("gzip", "br"))
+    async def test_large_responses_are_compressed(
+        self, raw_client: AsyncClient, encoding: str
+    ) -> None:
+        res = await raw_client.get("/large", headers={"Accept-Encoding": encoding})
+        assert res.headers["content-encoding"] == encoding
+        assert "Accept-Encoding" in res.headers["vary"]
+        assert int(res.headers["content-length"]) < len(json.dumps(LARGE))
+        assert res.json() == LARGE
+
+    async def test_small_and_incompressible_responses_are_untouched(
+        self, raw_client: AsyncClient
+    ) -> None:
+        for path in ("/small", "/image"):
+            res = await raw_client.get(path, headers={"Accept-Encoding": "gzip, br"})
+            assert "content-encoding" not in res.headers
+
+    async def test_clients_without_accept_encoding_get_plain_body(
+        self, raw_client: AsyncClient
+    ) -> None:
+        res = await raw_client.get("/large", headers={"Accept-Encoding": "identity"})
+        assert "content-encoding" not in res.headers
+        assert res.json() == LARGE
+
+    @pytest.mark.parametrize("encoding", ("gzip", "br"))
+    async def test_streaming_responses_are_compressed_chunk_by_chunk(
+        self, compressed_app: CompressionMiddleware, encoding: str
+    ) -> None:
+        chunks = []
+
+        requests = [{"type": "http.request", "body": b"", "more_body": False}]
+
+        async def receive():
+            if requests:
+                return requests.pop()
+            await asyncio.Event().wait()  # the client never disconnects
+
+        async def send(message):
+            chunks.append(message)
+
+        scope = {
+            "type": "http",
+            "method": "GET",
+            "path": "/stream",
+            "root_path": "",
+            "scheme": "http",
+            "query_string": b"",
+            "headers": [(b"accept-encoding", encoding.encode())],
+            "server": ("testserver", 80),
+        }
+        await compressed_app(scope, receive, send)
+
+        start, *bodies = chunks
+        assert (b"content-encoding", encoding.encode()) in start["headers"]
+        # every chunk is flushed, so it can be decoded without the ones after it
+        decompressor = (
+            brotli.Decompressor() if encoding == "br" else zlib.decompressobj(31)
+        )
+        decompress = getattr(decompressor, "process", None) or decompressor.decompress
+        assert decompress(bodies[0]["body"]) == b'{"id": 0}\n'
+        data = bodies[0]["body"] + b"".join(body["body"] for body in bodies[1:])
+        plain = brotli.decompress(data) if encoding == "br" else zlib.decompress(data, 31)
+        assert plain.splitlines()[-1] == b'{"id": 99}'
+
+    async def test_responses_with_etag_are_compressed_once(
+        self, compressed_app: CompressionMiddleware, raw_client: AsyncClient
+    ) -> None:
+        for _ in range(3):
+            res = await raw_client.get("/large", headers={"Accept-Encoding": "gzip"})
+            assert res.json() == LARGE
+        assert compressed_app.cache.misses == 1
+        assert compressed_app.cache.hits == 2
+
+
+class TestCompressedApi:
+    async def test_cleanings_list_is_compressed(
+        self,
+        app: FastAPI,
+        authorized_client: AsyncClient,
+        db: Database,
+        test_user: UserInDB,
+    ) -> None:
+        # enough cleanings for a page well over COMPRESSION_MINIMUM_SIZE
+        await CleaningsRepository(db).create_cleanings(
+            new_cleanings=[
+                CleaningCreate(name=f"compressed {i}", price=9.99) for i in range(20)
+            ],
+            requesting_user=test_user,
+        )
+        url = app.url_path_for("cleanings:list-all-user-cleanings")
+        plain = await authorized_client.get(url, headers={"Accept-Encoding": "identity"})
+        assert len(plain.content) > COMPRESSION_MINIMUM_SIZE
+        assert "content-encoding" not in plain.headers
+
+        res = await authorized_client.get(url, headers={"Accept-Encoding": "gzip, br"})
+        assert res.status_code == 200
+        assert res.headers["content-encoding"] == "br"
+        assert int(res.headers["content-length"]) < len(plain.content)
+        assert res.json() == plain.json()
@@ -0,0 +1,74 @@
+import asyncio
+import gc
+import time
+
+import pytest
+from app.db.pool import InstrumentedPool, get_pool_stats, physical_connection
+from databases import Database
+from httpx import AsyncClient
+
+pytestmark = pytest.mark.asyncio
+
+
+class TestInstrumentedPool:
+    async def test_pool_stats_track_connections_in_use(
+        self, client: AsyncClient, db: Database
+    ) -> None:
+        before = get_pool_stats(db)
+        assert before["max_size"] >= before["min_size"]
+
+        async with db.connection() as connection:
+            await connection.fetch_one("SELECT 1")
+            during = get_pool_stats(db)
+            assert during["in_use"] == before["in_use"] + 1
+
+        after = get_pool_stats(db)
+        assert after["in_use"] == before["in_use"]
+        assert after["acquires"] > before["acquires"]
+        assert after["acquire_wait_seconds"]["buckets"]["+Inf"] == after["acquires"]
+
+    async def test_connections_are_recycled_after_max_lifetime(
+        self, client: AsyncClient, db: Database
+    ) -> None:
+        pool: InstrumentedPool = db._backend._pool
+        pool.max_lifetime = 0.000001
+        try:
+            await db.fetch_one("SELECT 1")
+            assert pool.stats()["recycled"] >= 1
+        finally:
+            pool.max_lifetime = None
+
+        assert (await db.fetch_one("SELECT 1 AS one"))["one"] == 1
+
+    async def test_connection_ages_go_away_with_their_connections(
+        self, client: AsyncClient, db: Database
+    ) -> None:
+        pool: InstrumentedPool = db._backend._pool
+        async with db.connection() as connection:
+            await connection.fetch_one("SELECT 1")
+
+        # what asyncpg does to connections that were idle for too long
+        await pool._pool.expire_connections()
+        async with db.connection() as connection:
+            await connection.fetch_one("SELECT 1")
+            raw = physical_connection(connection.raw_connection)
+            # a fresh connection starts a fresh lifetime, whatever its backend pid
+            assert time.monotonic() - pool._connected_at[raw] < 1
+        del raw
+
+        gc.collect()
+        assert len(pool._connected_at) <= pool.stats()["size"]
+
+    async def test_acquire_times_out_when_pool_is_exhausted(
+        self, client: AsyncClient, db: Database
+    ) -> None:
+        pool: InstrumentedPool = db._backend._pool
+        held = [await pool.acquire() for _ in range(pool.stats()["max_size"])]
+        pool.acquire_timeout = 0.05
+        try:
+            with pytest.raises(asyncio.TimeoutError):
+                await pool.acquire()
+            assert pool.stats()["acquire_timeouts"] == 1
+        finally:
+            for connection in held:
+                await pool.release(connection)
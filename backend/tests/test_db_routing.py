@@ -0,0 +1,121 @@
+import pytest
+from app.db import tasks
+from app.db.repositories import cleanings, profiles, users
+from app.db.routing import ReplicaRouter, is_read_query
+from app.models.cleaning import CleaningInDB
+from databases import Database
+from fastapi import FastAPI
+from httpx import AsyncClient
+from starlette import status
+
+pytestmark = pytest.mark.asyncio
+
+READ_QUERIES = {
+    cleanings.GET_CLEANING_BY_ID,
+    cleanings.LIST_ALL_USER_CLEANINGS_QUERY,
+    cleanings.LIST_USER_CLEANINGS_FIRST_PAGE_QUERY,
+    cleanings.LIST_USER_CLEANINGS_NEXT_PAGE_QUERY,
+    cleanings.GET_ALL_CLEANINGS,
+    profiles.GET_USER_BY_ID_QUERY,
+    profiles.GET_PROFILE_BY_USERNAME_QUERY,
+    users.GET_USER_BY_EMAIL_QUERY,
+    users.GET_USER_BY_USER_NAME_QUERY,
+    users.GET_USER_WITH_PROFILE_BY_EMAIL_QUERY,
+    users.GET_USER_WITH_PROFILE_BY_USER_NAME_QUERY,
+}
+
+WRITE_QUERIES = {
+    cleanings.CREATE_CLEANING_QUERY,
+    cleanings.BULK_CREATE_CLEANINGS_QUERY,
+    cleanings.UPDATE_CLEANING_BY_ID,
+    cleanings.BULK_UPDATE_CLEANINGS_QUERY,
+    cleanings.BULK_DELETE_CLEANINGS_QUERY,
+    cleanings.DELETE_CLEANING_BY_ID_QUERY,
+    profiles.UPDATE_PROFILE_QUERY,
+    users.REGISTER_NEW_USER_QUERY,
+}
+
+
+@pytest.fixture
+async def replica(db: Database) -> Database:
+    # a second pool standing in for a read replica of the test database
+    replica = Database(str(db.url), min_size=1, max_size=2)
+    await replica.connect()
+    yield replica
+    await replica.disconnect()
+
+
+class TestReplicaRouting:
+    async def test_repository_queries_are_classified(self) -> None:
+        assert all(is_read_query(query) for query in READ_QUERIES)
+        assert not any(is_read_query(query) for query in WRITE_QUERIES)
+
+    async def test_reads_go_to_replica_until_client_writes(
+        self,
+        app: FastAPI,
+        authorized_client: AsyncClient,
+        db: Database,
+        replica: Database,
+        test_cleaning: CleaningInDB,
+    ) -> None:
+        router = ReplicaRouter(primary=db, replicas=[replica], sticky_window=60)
+        app.state._db_router = router
+        cleaning_path = app.url_path_for(
+            "cleanings:get-cleaning-by-id", id=test_cleaning.id
+        )
+
+        res = await authorized_client.get(cleaning_path)
+        assert res.status_code == status.HTTP_200_OK
+        assert router.replica_reads > 0 and router.primary_reads == 0
+
+        res = await authorized_client.put(
+            app.url_path_for("cleanings:update-cleaning-by-id", id=test_cleaning.id),
+            json={"cleaning_update": {"price": 1.23}},
+        )
+        assert res.status_code == status.HTTP_200_OK
+        assert router.writes == 1
+
+        # read-your-writes: this client now reads from the primary
+        replica_reads = router.replica_reads
+        res = await authorized_client.get(cleaning_path)
+        assert res.json()["price"] == 1.23
+        assert router.primary_reads > 0 and router.replica_reads == replica_reads
+
+    async def test_sticky_window_expires(
+        self, client: AsyncClient, db: Database, replica: Database
+    ) -> None:
+        router = ReplicaRouter(primary=db, replicas=[replica], sticky_window=0)
+        router.mark_write("Bearer token")
+        assert router.database_for_read("Bearer token") is replica
+        assert router.database_for_read(None) is replica
+
+    async def test_failed_replica_disconnects_the_connected_ones(
+        self, monkeypatch: pytest.MonkeyPatch
+    ) -> None:
+        class FakeDatabase:
+            def __init__(self, url: str) -> None:
+                self.url = url
+                self.connected = True
+
+            async def disconnect(self) -> None:
+                self.connected = False
+
+        created = []
+
+        async def create_database(url: str) -> FakeDatabase:
+            if url == "replica-2":
+                raise ConnectionError("replica-2 is down")
+            created.append(FakeDatabase(url))
+            return created[-1]
+
+        monkeypatch.delenv("TESTING")
+        monkeypatch.setattr(tasks, "DATABASE_REPLICA_URLS", ["replica-1", "replica-2"])
+        monkeypatch.setattr(tasks, "create_database", create_database)
+        app = FastAPI()
+
+        await tasks.connect_to_db(app)
+
+        # reads fall back to the primary, replica-1 isn't left connected
+        assert not hasattr(app.state, "_db_router")
+        assert [d.url for d in created] == [str(tasks.DATABASE_URL), "replica-1"]
+        assert app.state._db.connected and not created[1].connected
@@ -0,0 +1,89 @@
+import pytest
+from app.core import config
+from app.db.fast_path import AsyncpgExecutor, convert_named_parameters
+from app.db.instrumentation import InstrumentedDatabase
+from app.db.repositories.cleanings import CleaningsRepository
+from app.db.repositories.users import UsersRepository
+from app.models.cleaning import CleaningCreate, CleaningUpdate
+from app.models.user import UserInDB, UserPublic
+from databases import Database
+from fastapi import FastAPI
+from httpx import AsyncClient
+from starlette import status
+
+pytestmark = pytest.mark.asyncio
+
+
+@pytest.fixture
+def fast_path(monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setattr(config, "DB_FAST_PATH", True)
+
+
+class TestFastPath:
+    async def test_named_parameters_are_converted_once_per_name(self) -> None:
+        sql, names = convert_named_parameters(
+            "SELECT CAST(:id AS INTEGER)::text WHERE id = :id AND owner = :owner"
+        )
+        assert sql == "SELECT CAST($1 AS INTEGER)::text WHERE id = $1 AND owner = $2"
+        assert names == ("id", "owner")
+
+    async def test_repositories_work_on_the_fast_path(
+        self, fast_path: None, client: AsyncClient, db: Database, test_user: UserInDB
+    ) -> None:
+        cleanings_repo = CleaningsRepository(db)
+        executor = cleanings_repo.db
+        if isinstance(executor, InstrumentedDatabase):  # slow query / N+1 checks
+            executor = executor.database
+        assert isinstance(executor, AsyncpgExecutor)
+
+        created = await cleanings_repo.create_cleaning(
+            new_cleaning=CleaningCreate(name="fast cleaning", price=3.50),
+            requesting_user=test_user,
+        )
+        fetched = await cleanings_repo.get_cleaning_by_id(
+            id=created.id, requesting_user=test_user
+        )
+        assert fetched == created
+
+        updated = await cleanings_repo.update_cleaning(
+            id=created.id,
+            cleaning_update=CleaningUpdate(description="updated"),
+            requesting_user=test_user,
+        )
+        assert updated.description == "updated" and updated.price == 3.50
+
+        streamed = [
+            c
+            async for c in cleanings_repo.iterate_all_user_cleanings(
+                requesting_user=test_user
+            )
+        ]
+        assert updated in streamed
+
+        bulk = await cleanings_repo.create_cleanings(
+            new_cleanings=[CleaningCreate(name="fast bulk", price=1)],
+            requesting_user=test_user,
+        )
+        assert len(bulk) == 1
+
+        assert (
+            await cleanings_repo.delete_cleaning_by_id(
+                id=created.id, requesting_user=test_user
+            )
+            == created.id
+        )
+
+        user = await UsersRepository(db).get_user_by_user_name(
+            username=test_user.username
+        )
+        assert isinstance(user, UserPublic) and user.profile is not None
+
+    async def test_endpoints_work_on_the_fast_path(
+        self, fast_path: None, app: FastAPI, authorized_client: AsyncClient
+    ) -> None:
+        res = await authorized_client.get(app.url_path_for("users:get-current-user"))
+        assert res.status_code == status.HTTP_200_OK
+        res = await authorized_client.get(
+            app.url_path_for("cleanings:list-all-user-cleanings")
+        )
+        assert res.status_code == status.HTTP_200_OK
@@ -0,0 +1,81 @@
+import os
+from pathlib import Path
+from typing import List
+
+import orjson
+import pytest
+from app import launcher
+from app.core import config
+from app.services.metrics import MetricsDirectory, RequestMetrics
+from uvicorn.config import Config
+
+pytestmark = pytest.mark.asyncio
+
+
+class FakeProcess:
+    started: List["FakeProcess"] = []
+
+    def __init__(self, pid: int, alive: bool = True) -> None:
+        self.pid = pid
+        self.alive = alive
+        self.exitcode = None if alive else 0
+
+    def is_alive(self) -> bool:
+        return self.alive
+
+    def start(self) -> None:
+        FakeProcess.started.append(self)
+
+
+class TestWorkers:
+    async def test_one_worker_per_cpu_by_default(self) -> None:
+        assert launcher.worker_count(3) == 3
+        assert 1 <= launcher.worker_count(0) <= (os.cpu_count() or 1)
+
+    async def test_connection_budget_is_split_between_workers(self) -> None:
+        assert launcher.pool_size_per_worker(40, 8, default=10) == 5
+        assert launcher.pool_size_per_worker(0, 8, default=10) == 10
+        # at least one connection each, even over the budget
+        assert launcher.pool_size_per_worker(4, 8, default=10) == 1
+
+    async def test_workers_are_configured_through_the_environment(
+        self, monkeypatch: pytest.MonkeyPatch, tmp_path: Path
+    ) -> None:
+        for name in ("DB_POOL_MAX_SIZE", "DB_POOL_MIN_SIZE", "METRICS_MULTIPROCESS_DIR"):
+            monkeypatch.setenv(name, "")  # restored afterwards
+        monkeypatch.setattr(config, "DB_CONNECTION_BUDGET", 20)
+        monkeypatch.setattr(config, "DB_POOL_MIN_SIZE", 8)
+        monkeypatch.setattr(config, "METRICS_MULTIPROCESS_DIR", str(tmp_path))
+        (tmp_path / "metrics-1.json").write_bytes(b"{}")  # left by an earlier run
+        (tmp_path / "retired.json").write_bytes(b"{}")
+
+        directory = launcher.configure_workers(4)
+        assert os.environ["DB_POOL_MAX_SIZE"] == "5"
+        assert os.environ["DB_POOL_MIN_SIZE"] == "5"
+        assert os.environ["METRICS_MULTIPROCESS_DIR"] == str(tmp_path)
+        assert directory is not None and directory.path == str(tmp_path)
+        assert list(tmp_path.iterdir()) == []
+
+    async def test_exited_workers_are_replaced(
+        self, monkeypatch: pytest.MonkeyPatch, tmp_path: Path
+    ) -> None:
+        monkeypatch.setattr(
+            launcher, "get_subprocess", lambda **kwargs: FakeProcess(pid=3)
+        )
+        FakeProcess.started = []
+        directory = MetricsDirectory(str(tmp_path), interval=5)
+        exited = RequestMetrics()
+        exited.observe("users:get-current-user", "GET", 200, 0.01)
+        snapshot = {"written_at": 1.0, "families": exited.collect()}
+        (tmp_path / "metrics-2.json").write_bytes(orjson.dumps(snapshot))
+
+        supervisor = launcher.Supervisor(
+            Config(launcher.APP), lambda **kwargs: None, [], directory
+        )
+        alive, exited_process = FakeProcess(pid=1), FakeProcess(pid=2, alive=False)
+        supervisor.processes = [alive, exited_process]
+        supervisor.replace_exited_workers()
+
+        assert [p.pid for p in supervisor.processes] == [1, 3]
+        assert FakeProcess.started == [supervisor.processes[1]]
+        assert sorted(p.name for p in tmp_path.iterdir()) == ["retired.json"]
@@ -0,0 +1,206 @@
+import asyncio
+import os
+import time
+from pathlib import Path
+
+import orjson
+import pytest
+from app.api import metrics as api_metrics
+from app.core import config
+from app.models.cleaning import CleaningInDB
+from app.services.metrics import (
+    MetricsDirectory,
+    RequestMetrics,
+    format_labels,
+    merge_families,
+    render,
+)
+from fastapi import FastAPI
+from httpx import AsyncClient
+from starlette.status import HTTP_200_OK
+
+pytestmark = pytest.mark.asyncio
+
+
+def sample_lines(text: str) -> dict:
+    """
+    'name{labels} value' lines of the exposition format -> {"name{labels}": value}
+    """
+    samples = {}
+    for line in text.splitlines():
+        if line and not line.startswith("#"):
+            name, value = line.rsplit(" ", 1)
+            samples[name] = float(value)
+    return samples
+
+
+class TestRequestMetrics:
+    async def test_requests_are_counted_by_route_and_status(self) -> None:
+        metrics = RequestMetrics(buckets=(0.1, 1.0))
+        metrics.observe("cleanings:get-cleaning-by-id", "GET", 200, 0.05)
+        metrics.observe("cleanings:get-cleaning-by-id", "GET", 200, 0.5)
+        metrics.observe("cleanings:get-cleaning-by-id", "GET", 404, 2.0)
+
+        samples = sample_lines(render(metrics.collect()))
+        labels = 'route="cleanings:get-cleaning-by-id",method="GET"'
+        assert samples[f'http_requests_total{{{labels},status="200"}}'] == 2
+        assert samples[f'http_requests_total{{{labels},status="404"}}'] == 1
+        # cumulative buckets
+        assert samples[f'http_request_duration_seconds_bucket{{{labels},le="0.1"}}'] == 1
+        assert samples[f'http_request_duration_seconds_bucket{{{labels},le="1.0"}}'] == 2
+        assert samples[f'http_request_duration_seconds_bucket{{{labels},le="+Inf"}}'] == 3
+        assert samples[f"http_request_duration_seconds_count{{{labels}}}"] == 3
+        assert samples[f"http_request_duration_seconds_sum{{{labels}}}"] == 2.55
+        assert samples["http_requests_in_flight"] == 0
+
+    async def test_label_values_are_escaped(self) -> None:
+        assert format_labels({"route": 'a"b\\c\n'}) == '{route="a\\"b\\\\c\\n"}'
+        assert format_labels({}) == ""
+
+    async def test_workers_are_added_up(self) -> None:
+        first, second = RequestMetrics(), RequestMetrics()
+        first.observe("users:get-current-user", "GET", 200, 0.01)
+        second.observe("users:get-current-user", "GET", 200, 0.02)
+        second.observe("users:get-current-user", "GET", 401, 0.01)
+        second.in_flight = 3
+
+        samples = sample_lines(
+            render(merge_families([first.collect(), second.collect()]))
+        )
+        labels = 'route="users:get-current-user",method="GET"'
+        assert samples[f'http_requests_total{{{labels},status="200"}}'] == 2
+        assert samples[f'http_requests_total{{{labels},status="401"}}'] == 1
+        assert samples[f"http_request_duration_seconds_count{{{labels}}}"] == 3
+        assert samples["http_requests_in_flight"] == 3
+
+    async def test_gauges_of_workers_that_stopped_writing_are_left_out(
+        self, tmp_path: Path
+    ) -> None:
+        directory = MetricsDirectory(str(tmp_path), interval=5)
+        gone = RequestMetrics()
+        gone.observe("users:get-current-user", "GET", 200, 0.01)
+        gone.in_flight = 7
+        snapshot = {"written_at": time.time() - 60, "families": gone.collect()}
+        (tmp_path / "metrics-1.json").write_bytes(orjson.dumps(snapshot))
+
+        directory.write(RequestMetrics().collect())
+        assert (tmp_path / f"metrics-{os.getpid()}.json").exists()
+
+        samples = sample_lines(render(merge_families(directory.read())))
+        labels = 'route="users:get-current-user",method="GET",status="200"'
+        assert samples[f"http_requests_total{{{labels}}}"] == 1
+        assert samples["http_requests_in_flight"] == 0
+
+    async def test_exited_workers_are_retired_into_one_file(self, tmp_path: Path) -> None:
+        directory = MetricsDirectory(str(tmp_path), interval=5)
+        for pid, status in ((1, 200), (2, 404)):
+            worker = RequestMetrics()
+            worker.observe("users:get-current-user", "GET", status, 0.01)
+            worker.in_flight = 1
+            snapshot = {"written_at": time.time(), "families": worker.collect()}
+            (tmp_path / f"metrics-{pid}.json").write_bytes(orjson.dumps(snapshot))
+
+        directory.retire(1)
+        assert sorted(p.name for p in tmp_path.iterdir()) == [
+            "metrics-2.json",
+            "retired.json",
+        ]
+        samples = sample_lines(render(merge_families(directory.read())))
+        labels = 'route="users:get-current-user",method="GET"'
+        assert samples[f'http_requests_total{{{labels},status="200"}}'] == 1
+        assert samples[f'http_requests_total{{{labels},status="404"}}'] == 1
+        assert samples["http_requests_in_flight"] == 1  # only the live worker's
+
+        # a scrape that still sees the retired file doesn't count it twice, a new
+        # process with the same pid is counted
+        retired_snapshot = orjson.loads((tmp_path / "metrics-2.json").read_bytes())
+        directory.retire(2)
+        (tmp_path / "metrics-2.json").write_bytes(orjson.dumps(retired_snapshot))
+        samples = sample_lines(render(merge_families(directory.read())))
+        assert samples[f'http_requests_total{{{labels},status="404"}}'] == 1
+        retired_snapshot["written_at"] = time.time() + 1
+        (tmp_path / "metrics-2.json").write_bytes(orjson.dumps(retired_snapshot))
+        samples = sample_lines(render(merge_families(directory.read())))
+        assert samples[f'http_requests_total{{{labels},status="404"}}'] == 2
+
+
+class TestMetricsEndpoint:
+    async def test_metrics_are_exposed_in_prometheus_format(
+        self,
+        app: FastAPI,
+        authorized_client: AsyncClient,
+        test_cleaning: CleaningInDB,
+    ) -> None:
+        for _ in range(2):
+            await authorized_client.get(
+                app.url_path_for("cleanings:get-cleaning-by-id", id=str(test_cleaning.id))
+            )
+        await authorized_client.get("/api/does-not-exist/")
+
+        res = await authorized_client.get(app.url_path_for("metrics:get-metrics"))
+        assert res.status_code == HTTP_200_OK
+        assert res.headers["content-type"].startswith("text/plain; version=0.0.4")
+        samples = sample_lines(res.text)
+
+        labels = 'route="cleanings:get-cleaning-by-id",method="GET"'
+        assert samples[f'http_requests_total{{{labels},status="200"}}'] == 2
+        assert samples[f"http_request_duration_seconds_count{{{labels}}}"] == 2
+        unmatched = 'route="unmatched",method="GET",status="404"'
+        assert samples[f"http_requests_total{{{unmatched}}}"] == 1
+        # the scrape itself
+        assert samples["http_requests_in_flight"] == 1
+        assert samples["db_pool_size"] >= 1
+        assert samples["db_pool_acquires_total"] >= 1
+        assert 'db_pool_acquire_wait_seconds_bucket{le="+Inf"}' in samples
+        assert samples["password_hashing_pending"] == 0
+        assert samples["password_hashing_workers"] == config.PASSWORD_HASHING_WORKERS
+
+    async def test_metrics_of_all_workers_are_added_up(
+        self,
+        app: FastAPI,
+        client: AsyncClient,
+        tmp_path: Path,
+    ) -> None:
+        app.state.metrics_directory = MetricsDirectory(str(tmp_path), interval=5)
+        other_worker = RequestMetrics()
+        other_worker.observe("metrics:get-metrics", "GET", 200, 0.01)
+        snapshot = {"written_at": time.time(), "families": other_worker.collect()}
+        (tmp_path / "metrics-1.json").write_bytes(orjson.dumps(snapshot))
+
+        await client.get(app.url_path_for("metrics:get-metrics"))
+        res = await client.get(app.url_path_for("metrics:get-metrics"))
+        samples = sample_lines(res.text)
+        labels = 'route="metrics:get-metrics",method="GET",status="200"'
+        # one from the other worker, one earlier scrape of this one
+        assert samples[f"http_requests_total{{{labels}}}"] == 2
+
+    async def test_writer_keeps_going_after_a_failed_write(
+        self,
+        app: FastAPI,
+        client: AsyncClient,
+        tmp_path: Path,
+        monkeypatch: pytest.MonkeyPatch,
+    ) -> None:
+        worker_families = api_metrics.worker_families
+        calls = []
+
+        def fail_once(app: FastAPI) -> dict:
+            calls.append(1)
+            if len(calls) == 1:
+                raise RuntimeError("pool went away")
+            return worker_families(app)
+
+        monkeypatch.setattr(api_metrics, "worker_families", fail_once)
+        directory = MetricsDirectory(str(tmp_path), interval=0.01)
+        writer = asyncio.ensure_future(
+            api_metrics.write_metrics_periodically(app, directory)
+        )
+        try:
+            for _ in range(100):
+                if len(calls) >= 2:
+                    break
+                await asyncio.sleep(0.01)
+            assert not writer.done()  # still running after the failed write
+        finally:
+            writer.cancel()
+        assert (tmp_path / f"metrics-{os.getpid()}.json").exists()
@@ -2,6 +2,7 @@ import pytest
 from app.db.repositories.profiles import ProfilesRepository
 from app.models.profile import ProfileInDB, ProfilePublic
 from app.models.user import UserInDB, UserPublic
+from app.services import invalidate_user, profile_cache
 from databases import Database
 from fastapi import FastAPI, status
 from httpx import AsyncClient
@@ -96,6 +97,123 @@ class TestProfileView:
         assert res.status_code == status.HTTP_404_NOT_FOUND
 
 
+class TestConditionalGetProfile:
+    async def test_etag_changes_when_profile_is_updated(
+        self, app: FastAPI, authorized_client: AsyncClient, test_user: UserInDB
+    ) -> None:
+        url = app.url_path_for(
+            "profiles:get-profile-by-username", username=test_user.username
+        )
+        res = await authorized_client.get(url)
+        assert res.status_code == status.HTTP_200_OK
+        etag = res.headers["etag"]
+
+        res = await authorized_client.get(url, headers={"If-None-Match": etag})
+        assert res.status_code == status.HTTP_304_NOT_MODIFIED
+
+        res = await authorized_client.put(
+            app.url_path_for("profiles:update-own-profile"),
+            json={"profile_update": {"bio": "a new bio"}},
+        )
+        assert res.status_code == status.HTTP_200_OK
+
+        res = await authorized_client.get(url, headers={"If-None-Match": etag})
+        assert res.status_code == status.HTTP_200_OK
+        assert res.json()["bio"] == "a new bio"
+        assert res.headers["etag"] != etag
+
+    async def test_conditional_get_of_missing_profile_returns_404(
+        self, app: FastAPI, authorized_client: AsyncClient
+    ) -> None:
+        res = await authorized_client.get(
+            app.url_path_for(
+                "profiles:get-profile-by-username", username="username_doesnt_match"
+            ),
+            headers={"If-None-Match": "*"},
+        )
+        assert res.status_code == status.HTTP_404_NOT_FOUND
+
+
+class TestProfileResponseCache:
+    async def test_cached_profile_skips_the_database(
+        self,
+        app: FastAPI,
+        authorized_client: AsyncClient,
+        test_user2: UserInDB,
+        monkeypatch,
+    ) -> None:
+        profile_cache.invalidate(username=test_user2.username)
+        url = app.url_path_for(
+            "profiles:get-profile-by-username", username=test_user2.username
+        )
+        first = await authorized_client.get(url)
+        assert first.status_code == status.HTTP_200_OK
+
+        async def fail(*args, **kwargs):
+            raise AssertionError("cached profiles should not hit the db")
+
+        monkeypatch.setattr(ProfilesRepository, "get_profile_by_username", fail)
+        monkeypatch.setattr(ProfilesRepository, "get_profile_updated_at", fail)
+        hits = profile_cache.hits
+
+        res = await authorized_client.get(url)
+        assert res.status_code == status.HTTP_200_OK
+        assert res.json() == first.json()
+        assert res.headers["etag"] == first.headers["etag"]
+
+        res = await authorized_client.get(
+            url, headers={"If-None-Match": first.headers["etag"]}
+        )
+        assert res.status_code == status.HTTP_304_NOT_MODIFIED
+        assert profile_cache.hits == hits + 2
+
+    async def test_profile_read_during_update_is_not_cached(
+        self,
+        app: FastAPI,
+        authorized_client: AsyncClient,
+        test_user: UserInDB,
+        monkeypatch,
+    ) -> None:
+        profile_cache.invalidate(username=test_user.username)
+        get_profile_by_username = ProfilesRepository.get_profile_by_username
+
+        async def read_then_update(self, *, username: str):
+            profile = await get_profile_by_username(self, username=username)
+            # PUT /me/ commits while this (now stale) profile is on its way back
+            invalidate_user(username=username)
+            return profile
+
+        monkeypatch.setattr(
+            ProfilesRepository, "get_profile_by_username", read_then_update
+        )
+        res = await authorized_client.get(
+            app.url_path_for(
+                "profiles:get-profile-by-username", username=test_user.username
+            )
+        )
+        assert res.status_code == status.HTTP_200_OK
+        assert profile_cache.get(username=test_user.username) is None
+
+    async def test_updating_own_profile_invalidates_cached_response(
+        self, app: FastAPI, authorized_client: AsyncClient, test_user: UserInDB
+    ) -> None:
+        url = app.url_path_for(
+            "profiles:get-profile-by-username", username=test_user.username
+        )
+        await authorized_client.get(url)
+        assert profile_cache.get(username=test_user.username) is not None
+
+        res = await authorized_client.put(
+            app.url_path_for("profiles:update-own-profile"),
+            json={"profile_update": {"full_name": "zwirek z cache"}},
+        )
+        assert res.status_code == status.HTTP_200_OK
+        assert profile_cache.get(username=test_user.username) is None
+
+        res = await authorized_client.get(url)
+        assert res.json()["full_name"] == "zwirek z cache"
+
+
 class TestProfileManagement:
     @pytest.mark.parametrize(
         "attr, value",
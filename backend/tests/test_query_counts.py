@@ -0,0 +1,170 @@
+import logging
+from typing import Callable, ContextManager, List
+
+import pytest
+from app.core import config
+from app.core.timing import RequestTimings
+from app.db.instrumentation import query_name
+from app.db.repositories.cleanings import GET_CLEANING_BY_ID, CleaningsRepository
+from app.models.cleaning import CleaningInDB
+from app.models.user import UserInDB
+from app.services import principal_cache, profile_cache
+from fastapi import FastAPI
+from httpx import AsyncClient
+from starlette.requests import Request
+
+pytestmark = pytest.mark.asyncio
+
+MaxQueries = Callable[[int], ContextManager[List[str]]]
+
+
+@pytest.fixture(autouse=True)
+def cold_caches() -> None:
+    # a cache hit would hide the queries of the authentication / profile lookup
+    principal_cache.clear()
+    profile_cache.clear()
+
+
+class TestQueryBudgets:
+    """
+    Every endpoint has a budget of queries, one more query is a regression.
+    The authenticated ones spend one on the user (and its profile).
+    """
+
+    @pytest.mark.parametrize(
+        "method, route_name, body, budget",
+        (
+            ("get", "users:get-current-user", None, 1),
+            ("get", "cleanings:get-cleaning-by-id", None, 2),
+            ("get", "cleanings:list-all-user-cleanings", None, 2),
+            (
+                "put",
+                "cleanings:update-cleaning-by-id",
+                {"cleaning_update": {"price": 3}},
+                2,
+            ),
+            ("delete", "cleanings:delete-cleaning-by-id", None, 2),
+            (
+                "put",
+                "profiles:update-own-profile",
+                {"profile_update": {"full_name": "Z"}},
+                2,
+            ),
+        ),
+    )
+    async def test_authenticated_endpoints(
+        self,
+        app: FastAPI,
+        authorized_client: AsyncClient,
+        test_cleaning: CleaningInDB,
+        max_queries: MaxQueries,
+        method: str,
+        route_name: str,
+        body: dict,
+        budget: int,
+    ) -> None:
+        path_params = {"id": str(test_cleaning.id)} if "by-id" in route_name else {}
+        url = app.url_path_for(route_name, **path_params)
+        with max_queries(budget):
+            res = await authorized_client.request(method, url, json=body)
+        assert res.status_code < 300
+
+    async def test_profile_lookup(
+        self,
+        app: FastAPI,
+        authorized_client: AsyncClient,
+        test_user2: UserInDB,
+        max_queries: MaxQueries,
+    ) -> None:
+        url = app.url_path_for(
+            "profiles:get-profile-by-username", username=test_user2.username
+        )
+        with max_queries(2) as queries:
+            await authorized_client.get(url)
+        assert "profiles.GET_PROFILE_BY_USERNAME_QUERY" in queries
+
+    async def test_register_and_login(
+        self, app: FastAPI, client: AsyncClient, max_queries: MaxQueries
+    ) -> None:
+        new_user = {
+            "email": "budget@mail.pl",
+            "username": "budget",
+            "password": "budget1",
+        }
+        with max_queries(1):
+            await client.post(
+                app.url_path_for("users:register-new-user"), json={"new_user": new_user}
+            )
+        client.headers["content-type"] = "application/x-www-form-urlencoded"
+        with max_queries(1):
+            await client.post(
+                app.url_path_for("users:login-email-and-password"),
+                data={"username": new_user["email"], "password": new_user["password"]},
+            )
+
+    async def test_helper_fails_over_the_budget(
+        self,
+        app: FastAPI,
+        authorized_client: AsyncClient,
+        max_queries: MaxQueries,
+    ) -> None:
+        with pytest.raises(AssertionError, match="users.GET_USER_WITH_PROFILE"):
+            with max_queries(0):
+                await authorized_client.get(app.url_path_for("users:get-current-user"))
+
+
+class TestQueryWarnings:
+    async def test_queries_are_named_after_their_constant(self) -> None:
+        assert query_name(GET_CLEANING_BY_ID) == "cleanings.GET_CLEANING_BY_ID"
+        assert query_name("SELECT  1\n  FROM users") == "SELECT 1 FROM users"
+
+    async def test_slow_queries_are_logged(
+        self,
+        app: FastAPI,
+        authorized_client: AsyncClient,
+        test_cleaning: CleaningInDB,
+        monkeypatch: pytest.MonkeyPatch,
+        caplog: pytest.LogCaptureFixture,
+    ) -> None:
+        monkeypatch.setattr(config, "SLOW_QUERY_MS", 0.001)  # every query is slow
+        with caplog.at_level(logging.WARNING, logger="app.db.instrumentation"):
+            await authorized_client.get(
+                app.url_path_for("cleanings:get-cleaning-by-id", id=str(test_cleaning.id))
+            )
+        messages = [r.getMessage() for r in caplog.records]
+        assert any(
+            m.startswith("db - slow query cleanings.GET_CLEANING_BY_ID took")
+            for m in messages
+        )
+
+    async def test_repeated_queries_are_reported(self) -> None:
+        timings = RequestTimings()
+        for _ in range(3):
+            timings.add_query(GET_CLEANING_BY_ID, 0.001)
+        timings.add_query("SELECT 1", 0.001)
+        assert timings.repeated_queries(2) == {GET_CLEANING_BY_ID: 3}
+        assert timings.repeated_queries(3) == {}
+
+    async def test_n_plus_one_is_logged(
+        self,
+        app: FastAPI,
+        authorized_client: AsyncClient,
+        test_cleaning: CleaningInDB,
+        test_user: UserInDB,
+        caplog: pytest.LogCaptureFixture,
+    ) -> None:
+        async def one_by_one(request: Request) -> dict:
+            cleanings_repo = CleaningsRepository(request.app.state._db)
+            for _ in range(config.REPEATED_QUERY_LIMIT + 1):
+                await cleanings_repo.get_cleaning_by_id(
+                    id=test_cleaning.id, requesting_user=test_user
+                )
+            return {}
+
+        app.add_api_route("/n-plus-one/", one_by_one, name="test:n-plus-one")
+        with caplog.at_level(logging.WARNING, logger="app.api.middleware.timing"):
+            await authorized_client.get("/n-plus-one/")
+        assert [r.getMessage() for r in caplog.records] == [
+            f"db - cleanings.GET_CLEANING_BY_ID ran {config.REPEATED_QUERY_LIMIT + 1}"
+            " times in one request to test:n-plus-one, N+1?"
+        ]
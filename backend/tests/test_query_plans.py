@@ -0,0 +1,96 @@
+import json
+import re
+from typing import Any, Dict, List
+
+import pytest
+from app.db.instrumentation import repository_queries
+from app.db.seed import seed
+from databases import Database
+from httpx import AsyncClient
+
+pytestmark = pytest.mark.asyncio
+
+SEED_USERS = 2000
+SEED_CLEANINGS = 50_000
+
+# queries that read a whole table on purpose
+SEQ_SCAN_ALLOWED = {"GET_ALL_CLEANINGS"}
+
+# sample value for every named parameter used by the repositories
+PARAMETER_VALUES = {
+    "id": 1000,
+    "ids": [1000, 1001, 1002],
+    "owner": 100,
+    "user_id": 100,
+    "username": "seed_user_100",
+    "email": "seed_user_100@example.com",
+    "password": "hashed",
+    "salt": "salt",
+    "name": "name",
+    "names": ["name"],
+    "description": "description",
+    "descriptions": ["description"],
+    "price": 9.99,
+    "prices": [9.99],
+    "cleaning_type": "spot_clean",
+    "cleaning_types": ["spot_clean"],
+    "limit": 50,
+    "after_id": 5000,
+    "full_name": "full name",
+    "phone_number": "555-555-5555",
+    "bio": "bio",
+    "image": "https://example.com/image.png",
+}
+
+
+def seq_scans(plan: Dict[str, Any]) -> List[str]:
+    found = []
+    if plan["Node Type"] == "Seq Scan" and plan["Relation Name"] in {
+        "users",
+        "profiles",
+        "cleanings",
+    }:
+        found.append(plan["Relation Name"])
+    for child in plan.get("Plans", []):
+        found += seq_scans(child)
+    return found
+
+
+class TestQueryPlans:
+    """
+    Run EXPLAIN for every SQL constant of the repositories against a realistic amount of
+    data and fail when one of them falls back to a sequential scan (= missing index).
+    Seeding happens in a transaction that is rolled back at the end.
+    """
+
+    async def test_repository_queries_use_indexes(
+        self, client: AsyncClient, db: Database
+    ) -> None:
+        queries = list(repository_queries())
+        assert queries
+
+        async with db.transaction(force_rollback=True):
+            async with db.connection() as connection:
+                await seed(
+                    connection.raw_connection,
+                    users=SEED_USERS,
+                    cleanings=SEED_CLEANINGS,
+                    prefix="seed_user_",
+                    password=("salt", "hashed"),
+                    random_seed=0,
+                )
+
+            failures = []
+            for name, query in queries:
+                parameters = set(re.findall(r"(?<![:\w]):(\w+)", query))
+                values = {
+                    p: PARAMETER_VALUES.get(p, True if p.startswith("update_") else None)
+                    for p in parameters
+                }
+                record = await db.fetch_one(f"EXPLAIN (FORMAT JSON) {query}", values)
+                plan = json.loads(record["QUERY PLAN"])[0]["Plan"]
+                tables = seq_scans(plan)
+                if tables and name.rsplit(".", 1)[-1] not in SEQ_SCAN_ALLOWED:
+                    failures.append(f"{name}: seq scan on {', '.join(tables)}")
+
+        assert not failures, "\n".join(failures)
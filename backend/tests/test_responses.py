@@ -0,0 +1,134 @@
+import json
+from datetime import datetime, timezone
+from decimal import Decimal
+from typing import Any, Iterator, List, Mapping
+
+import pytest
+from app.api.responses import ORJSONResponse, trusted_response
+from app.db.repositories import cleanings, users
+from app.models.cleaning import CleaningInDB, CleaningPublic, CleaningType
+from app.models.profile import ProfilePublic
+from app.models.user import UserInDB, UserPublic
+from databases import Database
+from fastapi import FastAPI
+from fastapi.encoders import jsonable_encoder
+from httpx import AsyncClient
+from pydantic import parse_obj_as
+
+
+class TestORJSONResponse:
+    def test_app_routes_use_orjson_by_default(self, app: FastAPI) -> None:
+        api_routes = [route for route in app.routes if hasattr(route, "response_model")]
+        assert api_routes
+        assert all(route.response_class is ORJSONResponse for route in api_routes)
+
+    def test_renders_same_json_as_stdlib(self) -> None:
+        now = datetime(2021, 1, 16, 17, 12, 20, 667046, tzinfo=timezone.utc)
+        content = {
+            "price": Decimal("9.99"),
+            "cleaning_type": CleaningType.full_clean,
+            "created_at": now,
+            "profile": ProfilePublic(
+                id=1, user_id=1, image="https://phresh.io/me.png", created_at=now
+            ),
+            "cleanings": [
+                CleaningPublic(
+                    id=1, name="n", price=9.99, owner=1, cleaning_type="dust_up"
+                )
+            ],
+        }
+        rendered = json.loads(ORJSONResponse(content).body)
+
+        assert rendered["price"] == 9.99
+        assert rendered["cleaning_type"] == "full_clean"
+        assert rendered["profile"]["image"] == "https://phresh.io/me.png"
+        assert rendered["cleanings"][0]["cleaning_type"] == "dust_up"
+        assert rendered == json.loads(json.dumps(jsonable_encoder(content)))
+
+
+class RecordWithoutContains(Mapping):
+    """
+    Lookups like databases 0.3's Record for raw queries - a missing key raises ValueError
+    """
+
+    def __init__(self, row: Mapping) -> None:
+        self._keys = tuple(row.keys())
+        self._values = tuple(row.values())
+
+    def __getitem__(self, key: Any) -> Any:
+        return self._values[self._keys.index(key)]
+
+    def __iter__(self) -> Iterator:
+        return iter(self._keys)
+
+    def __len__(self) -> int:
+        return len(self._keys)
+
+
+class TestTrustedConstruction:
+    @pytest.mark.asyncio
+    async def test_from_record_of_db_rows_that_miss_model_fields(
+        self, client: AsyncClient, db: Database, test_user: UserInDB
+    ) -> None:
+        # neither access_token nor profile are columns of the query
+        record = await db.fetch_one(
+            query=users.GET_USER_WITH_PROFILE_BY_USER_NAME_QUERY,
+            values={"username": test_user.username},
+        )
+        for row in (record, RecordWithoutContains(record)):
+            user = UserPublic.from_record(row)
+            assert user.id == test_user.id
+            assert user.access_token is None and user.profile is None
+
+        record = await db.fetch_one(query=cleanings.GET_ALL_CLEANINGS)
+        if record is not None:
+            cleaning = CleaningInDB.from_record(RecordWithoutContains(record))
+            assert cleaning.id == record["id"]
+
+    def test_from_record_matches_validated_model(self) -> None:
+        now = datetime(2021, 1, 16, 17, 12, 20, 667046, tzinfo=timezone.utc)
+        record = {
+            "id": 1,
+            "name": "n",
+            "description": None,
+            "price": Decimal("9.99"),
+            "cleaning_type": "dust_up",
+            "owner": 1,
+            "created_at": now,
+            "updated_at": now,
+            "found": True,  # helper columns of the query are not fields
+        }
+        cleaning = CleaningInDB.from_record(record)
+
+        assert cleaning == CleaningInDB(**record)
+        assert cleaning.price == 9.99 and isinstance(cleaning.price, float)
+        assert cleaning.cleaning_type is CleaningType.dust_up
+        assert "found" not in cleaning.dict()
+
+    def test_from_record_fills_defaults_of_missing_columns(self) -> None:
+        profile = ProfilePublic.from_record({"id": 1, "user_id": 2})
+
+        assert profile.full_name is None
+        assert profile.__fields_set__ == {"id", "user_id"}
+
+    def test_trusted_response_renders_like_response_model(self) -> None:
+        now = datetime(2021, 1, 16, 17, 12, 20, 667046, tzinfo=timezone.utc)
+        cleanings = [
+            CleaningInDB.from_record(
+                {
+                    "id": i,
+                    "name": f"n{i}",
+                    "price": Decimal("9.99"),
+                    "cleaning_type": "full_clean",
+                    "owner": 1,
+                    "created_at": now,
+                    "updated_at": now,
+                }
+            )
+            for i in range(3)
+        ]
+        validated = parse_obj_as(List[CleaningPublic], [c.dict() for c in cleanings])
+
+        assert json.loads(trusted_response(cleanings).body) == json.loads(
+            json.dumps(jsonable_encoder(validated))
+        )
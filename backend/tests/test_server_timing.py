@@ -0,0 +1,126 @@
+import json
+import logging
+from typing import Dict
+
+import pytest
+from app.core import config
+from app.core.timing import RequestTimings, current_timings, timed
+from app.db.instrumentation import InstrumentedDatabase
+from app.db.repositories.cleanings import CleaningsRepository
+from app.models.cleaning import CleaningInDB
+from app.models.user import UserInDB
+from databases import Database
+from fastapi import FastAPI
+from httpx import AsyncClient
+from starlette.status import HTTP_200_OK
+
+pytestmark = pytest.mark.asyncio
+
+
+@pytest.fixture
+def app(apply_migrations: None, monkeypatch: pytest.MonkeyPatch) -> FastAPI:
+    monkeypatch.setattr(config, "SERVER_TIMING_HEADER", True)
+    monkeypatch.setattr(config, "REQUEST_TIMING_LOG", True)
+    from app.api.server import get_application
+
+    return get_application()
+
+
+def parse_server_timing(value: str) -> Dict[str, Dict[str, str]]:
+    """
+    'db;dur=1.2;desc="2 queries", total;dur=3'
+        -> {"db": {"dur": "1.2", "desc": "2 queries"}, "total": {"dur": "3"}}
+    """
+    metrics = {}
+    for metric in value.split(","):
+        name, *params = metric.strip().split(";")
+        metrics[name] = {
+            key: param_value.strip('"')
+            for key, _, param_value in (param.partition("=") for param in params)
+        }
+    return metrics
+
+
+class TestRequestTimings:
+    async def test_timed_does_nothing_outside_of_a_request(self) -> None:
+        assert current_timings.get() is None
+        with timed("auth"):
+            pass
+
+    async def test_server_timing_header_format(self) -> None:
+        timings = RequestTimings()
+        timings.add_query("SELECT 1", 0.0015)
+        timings.add_query("SELECT 1", 0.0005)
+        timings.add("auth", 0.25)
+        metrics = parse_server_timing(timings.server_timing())
+        assert list(metrics) == ["db", "auth", "serialize", "total"]
+        assert metrics["db"] == {"dur": "2.0", "desc": "2 queries"}
+        assert metrics["auth"] == {"dur": "250.0"}
+        assert float(metrics["total"]["dur"]) >= 0
+
+    async def test_repositories_are_instrumented_only_when_enabled(
+        self, client: AsyncClient, db: Database, monkeypatch: pytest.MonkeyPatch
+    ) -> None:
+        assert isinstance(CleaningsRepository(db).db, InstrumentedDatabase)
+        monkeypatch.setattr(config, "SERVER_TIMING_HEADER", False)
+        monkeypatch.setattr(config, "REQUEST_TIMING_LOG", False)
+        monkeypatch.setattr(config, "SLOW_QUERY_MS", 0)
+        monkeypatch.setattr(config, "REPEATED_QUERY_LIMIT", 0)
+        assert CleaningsRepository(db).db is db
+
+
+class TestServerTimingMiddleware:
+    async def test_response_reports_db_and_serialization_time(
+        self,
+        app: FastAPI,
+        authorized_client: AsyncClient,
+        test_cleaning: CleaningInDB,
+    ) -> None:
+        res = await authorized_client.get(
+            app.url_path_for("cleanings:get-cleaning-by-id", id=str(test_cleaning.id))
+        )
+        assert res.status_code == HTTP_200_OK
+        metrics = parse_server_timing(res.headers["Server-Timing"])
+        queries = int(metrics["db"]["desc"].split()[0])
+        assert queries >= 1
+        assert float(metrics["db"]["dur"]) > 0
+        assert "serialize" in metrics
+        assert float(metrics["total"]["dur"]) >= float(metrics["db"]["dur"])
+
+    async def test_login_reports_auth_time(
+        self, app: FastAPI, client: AsyncClient, test_user: UserInDB
+    ) -> None:
+        client.headers["content-type"] = "application/x-www-form-urlencoded"
+        res = await client.post(
+            app.url_path_for("users:login-email-and-password"),
+            data={"username": test_user.email, "password": "czechoslowacja"},
+        )
+        assert res.status_code == HTTP_200_OK
+        metrics = parse_server_timing(res.headers["Server-Timing"])
+        # bcrypt alone takes milliseconds
+        assert float(metrics["auth"]["dur"]) >= 1
+
+    async def test_every_request_is_logged_as_one_json_line(
+        self,
+        app: FastAPI,
+        authorized_client: AsyncClient,
+        test_cleaning: CleaningInDB,
+        caplog: pytest.LogCaptureFixture,
+    ) -> None:
+        with caplog.at_level(logging.INFO, logger="app.api.middleware.timing"):
+            await authorized_client.get(
+                app.url_path_for("cleanings:get-cleaning-by-id", id=str(test_cleaning.id))
+            )
+            await authorized_client.get("/api/does-not-exist/")
+        found, not_found = [
+            json.loads(r.getMessage())
+            for r in caplog.records
+            if r.name == "app.api.middleware.timing"
+        ]
+        assert found["route"] == "cleanings:get-cleaning-by-id"
+        assert found["status"] == HTTP_200_OK
+        assert found["method"] == "GET"
+        assert found["db_queries"] >= 1
+        assert found["total_ms"] >= found["db_ms"]
+        assert not_found["route"] is None
+        assert not_found["status"] == 404
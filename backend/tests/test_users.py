@@ -12,7 +12,8 @@ from app.core.config import (
 from app.db.repositories.users import UsersRepository
 from app.models.token import JWTCreds, JWTMeta, JWTPayload
 from app.models.user import UserCreate, UserInDB, UserPublic
-from app.services import auth_service
+from app.services import auth_service, principal_cache
+from app.services.principal_cache import PrincipalCache
 from databases import Database
 from fastapi import FastAPI, HTTPException, status
 from httpx import AsyncClient
@@ -385,3 +386,94 @@ class TestUserMe:
             headers={"Authorization": f"{jwt_prefix} {token}"},
         )
         assert res.status_code == HTTP_401_UNAUTHORIZED
+
+
+class TestUserPopulate:
+    async def test_populated_user_is_loaded_with_profile(
+        self, app: FastAPI, client: AsyncClient, db: Database, test_user: UserInDB
+    ) -> None:
+        user_repo = UsersRepository(db)
+
+        by_email = await user_repo.get_user_by_email(email=test_user.email)
+        by_user_name = await user_repo.get_user_by_user_name(username=test_user.username)
+        for user in (by_email, by_user_name):
+            assert isinstance(user, UserPublic)
+            assert user.id == test_user.id
+            assert user.profile is not None
+            assert user.profile.user_id == test_user.id
+
+        assert by_email == by_user_name
+
+    async def test_missing_user_is_not_populated(
+        self, app: FastAPI, client: AsyncClient, db: Database
+    ) -> None:
+        user_repo = UsersRepository(db)
+        assert await user_repo.get_user_by_email(email="nobody@nowhere.io") is None
+        assert await user_repo.get_user_by_user_name(username="nobody_here") is None
+
+
+class TestPrincipalCache:
+    async def test_cache_evicts_least_recently_used_and_expired_users(
+        self, client: AsyncClient, test_user: UserInDB, test_user2: UserInDB
+    ) -> None:
+        cache = PrincipalCache(ttl=60, max_size=1)
+        cache.set(username=test_user.username, user=test_user)
+        assert cache.get(username=test_user.username) == test_user
+        cache.set(username=test_user2.username, user=test_user2)
+        assert cache.get(username=test_user.username) is None
+        assert cache.stats()["evictions"] == 1
+
+        expired_cache = PrincipalCache(ttl=0.000001, max_size=10)
+        expired_cache.set(username=test_user.username, user=test_user)
+        assert expired_cache.get(username=test_user.username) is None
+        assert expired_cache.stats()["misses"] == 1
+
+    async def test_user_read_before_invalidation_is_not_cached(
+        self, client: AsyncClient, test_user: UserInDB
+    ) -> None:
+        cache = PrincipalCache(ttl=60, max_size=1)
+        generation = cache.generation(username=test_user.username)
+        # a profile update lands while the user is being read from the db
+        cache.invalidate(username=test_user.username)
+        cache.set(username=test_user.username, user=test_user, generation=generation)
+        assert cache.get(username=test_user.username) is None
+
+        # also when the invalidation was pushed out of the bounded generations
+        generation = cache.generation(username=test_user.username)
+        cache.invalidate(username=test_user.username)
+        cache.invalidate(username="somebody_else")
+        cache.set(username=test_user.username, user=test_user, generation=generation)
+        assert cache.get(username=test_user.username) is None
+
+        generation = cache.generation(username=test_user.username)
+        cache.set(username=test_user.username, user=test_user, generation=generation)
+        assert cache.get(username=test_user.username) == test_user
+
+    async def test_repeated_token_is_served_from_cache(
+        self, app: FastAPI, authorized_client: AsyncClient, test_user: UserInDB
+    ) -> None:
+        principal_cache.invalidate(username=test_user.username)
+        res = await authorized_client.get(app.url_path_for("users:get-current-user"))
+        assert res.status_code == HTTP_200_OK
+
+        hits = principal_cache.hits
+        res = await authorized_client.get(app.url_path_for("users:get-current-user"))
+        assert res.status_code == HTTP_200_OK
+        assert principal_cache.hits == hits + 1
+
+    async def test_profile_update_invalidates_cached_user(
+        self, app: FastAPI, authorized_client: AsyncClient, test_user: UserInDB
+    ) -> None:
+        res = await authorized_client.get(app.url_path_for("users:get-current-user"))
+        assert res.status_code == HTTP_200_OK
+        assert principal_cache.get(username=test_user.username) is not None
+
+        res = await authorized_client.put(
+            app.url_path_for("profiles:update-own-profile"),
+            json={"profile_update": {"bio": "cached bio"}},
+        )
+        assert res.status_code == HTTP_200_OK
+        assert principal_cache.get(username=test_user.username) is None
+
+        res = await authorized_client.get(app.url_path_for("users:get-current-user"))
+        assert UserPublic(**res.json()).profile.bio == "cached bio"